@@ -0,0 +1 @@
+"""Benchmarks of the sos4py parsers and requests, run with ``python -m benchmarks.run``."""
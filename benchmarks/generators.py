@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Generators of synthetic SOS 2.0 documents (O&M 2.0, WaterML 2.0, GetDataAvailability, GetFeatureOfInterest)
+
+The documents are written in blocks to a file object, so responses with millions of values can be
+generated without holding them in memory. The values are deterministic for a given size.
+"""
+
+import os
+
+SITE = 'http://example.org/site/%d'
+PROCEDURE = 'http://example.org/procedure/1'
+PHENOMENON = 'http://example.org/phenomenon/%d'
+OFFERING = 'http://example.org/offering/1'
+UNIT = 'degC'
+
+# Rows written per call of write()
+BLOCK = 10000
+
+NAMESPACES = ('xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:om="http://www.opengis.net/om/2.0" '
+              'xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xlink="http://www.w3.org/1999/xlink" '
+              'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:wml2="http://www.opengis.net/waterml/2.0" '
+              'xmlns:gda="http://www.opengis.net/sosgda/1.0" xmlns:sams="http://www.opengis.net/samplingSpatial/2.0" '
+              'xmlns:sf="http://www.opengis.net/sampling/2.0"')
+
+OM_OBSERVATION = '''  <sos:observationData>
+    <om:OM_Observation gml:id="o_%(i)d">
+      <om:type xlink:href="http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement"/>
+      <om:phenomenonTime>
+        <gml:TimeInstant gml:id="phenomenonTime_%(i)d">
+          <gml:timePosition>%(time)s</gml:timePosition>
+        </gml:TimeInstant>
+      </om:phenomenonTime>
+      <om:resultTime>
+        <gml:TimeInstant gml:id="resultTime_%(i)d">
+          <gml:timePosition>%(time)s</gml:timePosition>
+        </gml:TimeInstant>
+      </om:resultTime>
+      <om:procedure xlink:href="%(procedure)s"/>
+      <om:observedProperty xlink:href="%(phenomenon)s"/>
+      <om:featureOfInterest xlink:href="%(site)s"/>
+      <om:result xsi:type="gml:MeasureType" uom="%(unit)s">%(value)s</om:result>
+    </om:OM_Observation>
+  </sos:observationData>
+'''
+
+WATERML_HEADER = '''  <sos:observationData>
+    <om:OM_Observation gml:id="o_%(i)d">
+      <om:type xlink:href="http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement"/>
+      <om:phenomenonTime>
+        <gml:TimePeriod gml:id="phenomenonTime_%(i)d">
+          <gml:beginPosition>%(begin)s</gml:beginPosition>
+          <gml:endPosition>%(end)s</gml:endPosition>
+        </gml:TimePeriod>
+      </om:phenomenonTime>
+      <om:resultTime>
+        <gml:TimeInstant gml:id="resultTime_%(i)d">
+          <gml:timePosition>%(end)s</gml:timePosition>
+        </gml:TimeInstant>
+      </om:resultTime>
+      <om:procedure xlink:href="%(procedure)s"/>
+      <om:observedProperty xlink:href="%(phenomenon)s"/>
+      <om:featureOfInterest xlink:href="%(site)s"/>
+      <om:result>
+        <wml2:MeasurementTimeseries gml:id="timeseries_%(i)d">
+          <wml2:defaultPointMetadata>
+            <wml2:DefaultTVPMeasurementMetadata>
+              <wml2:uom code="%(unit)s"/>
+            </wml2:DefaultTVPMeasurementMetadata>
+          </wml2:defaultPointMetadata>
+'''
+
+WATERML_POINT = '''          <wml2:point>
+            <wml2:MeasurementTVP>
+              <wml2:time>%s</wml2:time>
+              <wml2:value>%s</wml2:value>
+            </wml2:MeasurementTVP>
+          </wml2:point>
+'''
+
+WATERML_FOOTER = '''        </wml2:MeasurementTimeseries>
+      </om:result>
+    </om:OM_Observation>
+  </sos:observationData>
+'''
+
+GDA_MEMBER = '''  <gda:dataAvailabilityMember gml:id="dam_%(i)d">
+    <gda:procedure xlink:href="%(procedure)s"/>
+    <gda:observedProperty xlink:href="%(phenomenon)s"/>
+    <gda:featureOfInterest xlink:href="%(site)s"/>
+    <gda:phenomenonTime>
+      <gml:TimePeriod gml:id="tp_%(i)d">
+        <gml:beginPosition>2020-01-01T00:00:00.000Z</gml:beginPosition>
+        <gml:endPosition>%(end)s</gml:endPosition>
+      </gml:TimePeriod>
+    </gda:phenomenonTime>
+    <gda:resultTime>
+      <gml:TimeInstant gml:id="rt_%(i)d">
+        <gml:timePosition>%(end)s</gml:timePosition>
+      </gml:TimeInstant>
+    </gda:resultTime>
+  </gda:dataAvailabilityMember>
+'''
+
+FOI_MEMBER = '''  <sos:featureMember>
+    <sams:SF_SpatialSamplingFeature gml:id="foi_%(i)d">
+      <gml:identifier codeSpace="http://www.opengis.net/def/nil/OGC/0/unknown">%(site)s</gml:identifier>
+      <gml:name codeSpace="http://www.opengis.net/def/nil/OGC/0/unknown">Site %(i)d</gml:name>
+      <sf:type xlink:href="http://www.opengis.net/def/samplingFeatureType/OGC-OM/2.0/SF_SamplingPoint"/>
+      <sf:sampledFeature xlink:href="http://www.opengis.net/def/nil/OGC/0/unknown"/>
+      <sams:shape>
+        <gml:Point gml:id="point_%(i)d">
+          <gml:pos srsName="http://www.opengis.net/def/crs/EPSG/0/4326">%(lat).6f %(lon).6f</gml:pos>
+        </gml:Point>
+      </sams:shape>
+    </sams:SF_SpatialSamplingFeature>
+  </sos:featureMember>
+'''
+
+CAPABILITIES = '''<?xml version="1.0" encoding="UTF-8"?>
+<sos:Capabilities xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:ows="http://www.opengis.net/ows/1.1" xmlns:swes="http://www.opengis.net/swes/2.0" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:gml="http://www.opengis.net/gml/3.2" version="2.0.0">
+  <ows:ServiceIdentification>
+    <ows:Title>Benchmark SOS</ows:Title>
+    <ows:ServiceType codeSpace="http://opengeospatial.net">OGC:SOS</ows:ServiceType>
+    <ows:ServiceTypeVersion>2.0.0</ows:ServiceTypeVersion>
+  </ows:ServiceIdentification>
+  <ows:ServiceProvider>
+    <ows:ProviderName>52North</ows:ProviderName>
+    <ows:ServiceContact>
+      <ows:IndividualName>TBA</ows:IndividualName>
+    </ows:ServiceContact>
+  </ows:ServiceProvider>
+  <ows:OperationsMetadata>
+%(operations)s  </ows:OperationsMetadata>
+  <sos:contents>
+    <sos:Contents>
+      <swes:offering>
+        <sos:ObservationOffering>
+          <swes:identifier>%(offering)s</swes:identifier>
+          <swes:procedure>%(procedure)s</swes:procedure>
+%(phenomena)s          <sos:responseFormat>http://www.opengis.net/om/2.0</sos:responseFormat>
+          <sos:observationType>http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement</sos:observationType>
+        </sos:ObservationOffering>
+      </swes:offering>
+    </sos:Contents>
+  </sos:contents>
+</sos:Capabilities>
+'''
+
+OPERATION = '''    <ows:Operation name="%s">
+      <ows:DCP>
+        <ows:HTTP>
+          <ows:Get xlink:href="%s?"/>
+          <ows:Post xlink:href="%s"/>
+        </ows:HTTP>
+      </ows:DCP>
+    </ows:Operation>
+'''
+
+def _time(i):
+    ''' Time stamp of the i-th hourly value (from 2020-01-01), formatted without datetime for speed '''
+    days, hour = divmod(i, 24)
+    # Years of twelve 28 day months keep the dates valid and cheap to compute
+    years, days = divmod(days, 336)
+    month, day = divmod(days, 28)
+    return '%04d-%02d-%02dT%02d:00:00.000Z' % (2020 + years, month + 1, day + 1, hour)
+
+def _value(i):
+    return '%.2f' % (10.0 + (i * 7919 % 2000) / 100.0)
+
+def write_om(f, values, sites=10, phenomena=1):
+    ''' Write an O&M 2.0 GetObservation response with values observations, spread over sites and phenomena '''
+    f.write(('<?xml version="1.0" encoding="UTF-8"?>\n<sos:GetObservationResponse %s>\n' % NAMESPACES).encode('utf-8'))
+    block = []
+    for i in range(values):
+        series = i % (sites * phenomena)
+        block.append(OM_OBSERVATION % {'i': i, 'time': _time(i // (sites * phenomena)), 'procedure': PROCEDURE,
+                                       'phenomenon': PHENOMENON % (series // sites), 'site': SITE % (series % sites),
+                                       'unit': UNIT, 'value': _value(i)})
+        if len(block) >= BLOCK:
+            f.write(''.join(block).encode('utf-8'))
+            block = []
+    f.write((''.join(block) + '</sos:GetObservationResponse>\n').encode('utf-8'))
+
+def write_waterml(f, values, series=10):
+    ''' Write a WaterML 2.0 GetObservation response with values points in series time series '''
+    f.write(('<?xml version="1.0" encoding="UTF-8"?>\n<sos:GetObservationResponse %s>\n' % NAMESPACES).encode('utf-8'))
+    per_series = [values // series + (1 if s < values % series else 0) for s in range(series)]
+    for s, points in enumerate(per_series):
+        f.write((WATERML_HEADER % {'i': s, 'begin': _time(0), 'end': _time(max(points - 1, 0)), 'procedure': PROCEDURE,
+                                   'phenomenon': PHENOMENON % 0, 'site': SITE % s, 'unit': UNIT}).encode('utf-8'))
+        for start in range(0, points, BLOCK):
+            f.write(''.join(WATERML_POINT % (_time(i), _value(i)) for i in range(start, min(start + BLOCK, points))).encode('utf-8'))
+        f.write(WATERML_FOOTER.encode('utf-8'))
+    f.write(b'</sos:GetObservationResponse>\n')
+
+def write_gda(f, members, phenomena=10):
+    ''' Write a GetDataAvailability response with members members (sites x phenomena) '''
+    f.write(('<?xml version="1.0" encoding="UTF-8"?>\n<gda:GetDataAvailabilityResponse %s>\n' % NAMESPACES).encode('utf-8'))
+    for start in range(0, members, BLOCK):
+        f.write(''.join(GDA_MEMBER % {'i': i, 'procedure': PROCEDURE, 'phenomenon': PHENOMENON % (i % phenomena),
+                                      'site': SITE % (i // phenomena), 'end': _time(1000 + i % 5000)}
+                        for i in range(start, min(start + BLOCK, members))).encode('utf-8'))
+    f.write(b'</gda:GetDataAvailabilityResponse>\n')
+
+def write_foi(f, features):
+    ''' Write a GetFeatureOfInterest response with features sampling points spread over Europe '''
+    f.write(('<?xml version="1.0" encoding="UTF-8"?>\n<sos:GetFeatureOfInterestResponse %s>\n' % NAMESPACES).encode('utf-8'))
+    for start in range(0, features, BLOCK):
+        f.write(''.join(FOI_MEMBER % {'i': i, 'site': SITE % i, 'lat': 35.0 + (i * 7919 % 30000) / 1000.0,
+                                      'lon': -10.0 + (i * 104729 % 40000) / 1000.0}
+                        for i in range(start, min(start + BLOCK, features))).encode('utf-8'))
+    f.write(b'</sos:GetFeatureOfInterestResponse>\n')
+
+def capabilities(url, phenomena=1):
+    ''' Capabilities document (bytes) of a SOS at url offering the generated data '''
+    operations = ''.join(OPERATION % (name, url, url) for name in ('GetObservation', 'GetFeatureOfInterest', 'GetDataAvailability'))
+    observed = ''.join('          <swes:observableProperty>%s</swes:observableProperty>\n' % (PHENOMENON % p) for p in range(phenomena))
+    return (CAPABILITIES % {'operations': operations, 'offering': OFFERING, 'procedure': PROCEDURE, 'phenomena': observed}).encode('utf-8')
+
+WRITERS = {'om': write_om, 'waterml': write_waterml, 'gda': write_gda, 'foi': write_foi}
+
+def generate(kind, size, directory):
+    ''' Path of a generated document (kind: om, waterml, gda or foi) of size values, written once per directory '''
+    path = os.path.join(directory, '%s-%d.xml' % (kind, size))
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            WRITERS[kind](f, size)
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Benchmarks of the parsing stages and requests of sos4py
+
+Every stage runs on generated documents of each scale (number of values, members or features) in a
+separate process. Reported are the latency (median and minimum of the repeats), the throughput (values
+per second and MB of XML per second) and the peak memory used by a run on top of the prepared input.
+
+    python -m benchmarks.run --scales 1000,10000,100000
+    python -m benchmarks.run --stages get_data,get_sites --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+from owslib.etree import etree
+from owslib.swe.observation.sos200 import SOSGetObservationResponse
+
+import sos4py
+from sos4py.sos_2_0_0 import sos_2_0_0, SOSGetFeatureOfInterestResponse
+from sos4py.util import nspv, gda_member
+from sos4py.decoders import decode_data_availability
+from .generators import generate, capabilities
+from .server import MockSOS
+
+# A stage: the kind of document it reads, a function preparing its input from the document path and
+# the sos_2_0_0 object (not measured) and the measured function returning the number of values
+Stage = namedtuple('Stage', ['kind', 'prepare', 'run'])
+
+def _read(path, sos):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _parsed_observations(path, sos):
+    return SOSGetObservationResponse(etree.fromstring(_read(path, sos)))
+
+def _gda_members(path, sos):
+    return etree.fromstring(_read(path, sos)).findall(nspv("gda:dataAvailabilityMember"))
+
+def _get_sites(path, sos):
+    return len(sos.get_sites())
+
+def _get_data(path, sos):
+    return len(sos.get_data())
+
+STAGES = OrderedDict([
+    ('om_parse', Stage('om', _read, lambda data, sos: len(SOSGetObservationResponse(etree.fromstring(data)).observations))),
+    ('create_df_om', Stage('om', _parsed_observations, lambda parsed, sos: len(sos._create_df_om(parsed)))),
+    ('waterml_decode', Stage('waterml', _read, lambda data, sos: len(sos._parse_observations(data)))),
+    ('create_df_waterml', Stage('waterml', _parsed_observations, lambda parsed, sos: len(sos._create_df_waterml(parsed)))),
+    ('gda_member', Stage('gda', _gda_members, lambda members, sos: len(list(map(gda_member, members))))),
+    ('gda_frame', Stage('gda', _read, lambda data, sos: len(decode_data_availability(etree.fromstring(data))))),
+    ('foi_parse', Stage('foi', _read, lambda data, sos: len(SOSGetFeatureOfInterestResponse(etree.fromstring(data)).features))),
+    ('get_sites', Stage('foi', None, _get_sites)),
+    ('get_data', Stage('om', None, _get_data)),
+])
+
+# Import of sos4py.main in a new interpreter, measured once per run instead of per scale
+IMPORT_STAGE = 'import'
+IMPORT_SCALE = 'startup'
+IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import sos4py.main
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+except ImportError:
+    peak = 0
+print(elapsed, len(sys.modules), peak)
+'''
+
+# Operations answered with the document of a request stage
+OPERATIONS = {'foi': 'GetFeatureOfInterest', 'om': 'GetObservation'}
+
+def _reset_peak():
+    ''' Reset the peak resident memory of this process (Linux), True if that is supported '''
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _memory(field):
+    ''' Resident memory (VmRSS) or its peak (VmHWM) of this process in bytes, from /proc/self/status '''
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise OSError(field)
+
+def measure(name, path, repeat):
+    """
+    Run a stage on a document repeat times and return its measurements.
+    Runs in a child process, so that the memory of one stage does not change the measurements of the next.
+    """
+
+    stage = STAGES[name]
+    server = None
+    if stage.prepare is None:
+        # Requests go to a local SOS answering with the document
+        server = MockSOS({OPERATIONS[stage.kind]: path}).__enter__()
+    url = server.url if server is not None else 'http://127.0.0.1/sos/kvp'
+    sos = sos_2_0_0.__new__(sos_2_0_0, url, '2.0.0', capabilities(url))
+
+    try:
+        data = stage.prepare(path, sos) if stage.prepare is not None else None
+        # Peak memory of a first, not timed run (later runs reuse the memory already taken from the system):
+        # resident memory on Linux, else the Python allocations (tracemalloc)
+        if _reset_peak():
+            before = _memory('VmRSS')
+            stage.run(data, sos)
+            peak = max(0, _memory('VmHWM') - before)
+            peak_method = 'rss'
+        else:
+            tracemalloc.start()
+            stage.run(data, sos)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            peak_method = 'tracemalloc'
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            values = stage.run(data, sos)
+            times.append(time.perf_counter() - start)
+    finally:
+        sos.close()
+        if server is not None:
+            server.__exit__()
+
+    times.sort()
+    median = times[len(times) // 2]
+    size = os.path.getsize(path)
+    return OrderedDict([('values', values), ('bytes', size), ('median_s', median), ('min_s', times[0]),
+                        ('values_per_s', values / median if median > 0 else None),
+                        ('mb_per_s', size / 1e6 / median if median > 0 else None),
+                        ('peak_mb', peak / 1e6), ('peak_method', peak_method)])
+
+def measure_import(repeat):
+    """
+    Time to import sos4py.main in new interpreters. values is the number of modules loaded afterwards,
+    so that a module pulling in a heavy dependency at import time shows up even if the machine is fast.
+    """
+
+    times = []
+    for _ in range(repeat + 1):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout.split()
+        times.append(float(output[0]))
+        modules, peak = int(output[1]), int(output[2])
+    # The first run writes the bytecode caches, it is not counted
+    times = sorted(times[1:])
+    return OrderedDict([('values', modules), ('bytes', 0), ('median_s', times[len(times) // 2]), ('min_s', times[0]),
+                        ('values_per_s', None), ('mb_per_s', None), ('peak_mb', peak / 1e6), ('peak_method', 'maxrss')])
+
+def _measure_in_child(queue, name, path, repeat):
+    try:
+        queue.put(('ok', measure(name, path, repeat)))
+    except BaseException as e:
+        queue.put(('error', '%s: %s' % (type(e).__name__, e)))
+
+def run_stage(name, path, repeat):
+    ''' Measurements of a stage, taken in a new process '''
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure_in_child, args=(queue, name, path, repeat))
+    process.start()
+    status, result = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError('Stage %s failed: %s' % (name, result))
+    return result
+
+def run(stages, scales, repeat=3, directory=None, log=None):
+    """
+    Run the stages at the scales. Documents are generated into directory (kept for later runs).
+
+    Returns
+    -------
+    dict with the environment and the results by stage and scale
+    """
+
+    directory = directory or os.path.join(tempfile.gettempdir(), 'sos4py-benchmarks')
+    os.makedirs(directory, exist_ok=True)
+    results = OrderedDict()
+    for name in stages:
+        assert (name in STAGES or name == IMPORT_STAGE),("Unknown stage %s!" % name)
+        results[name] = OrderedDict()
+        if name == IMPORT_STAGE:
+            results[name][IMPORT_SCALE] = measure_import(repeat)
+            if log is not None:
+                log(format_row(name, IMPORT_SCALE, results[name][IMPORT_SCALE]))
+            continue
+        for scale in scales:
+            path = generate(STAGES[name].kind, scale, directory)
+            results[name][str(scale)] = run_stage(name, path, repeat)
+            if log is not None:
+                log(format_row(name, scale, results[name][str(scale)]))
+    return OrderedDict([('sos4py', sos4py.__version__), ('python', platform.python_version()),
+                        ('machine', platform.machine()), ('repeat', repeat), ('results', results)])
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Compare the median latencies of a report with a baseline report.
+
+    Returns
+    -------
+    list of (stage, scale, baseline seconds, seconds, ratio, regressed) for the stages and scales in both
+    """
+
+    rows = []
+    for name, scales in report['results'].items():
+        for scale, result in scales.items():
+            reference = baseline.get('results', {}).get(name, {}).get(scale)
+            if reference is None or not reference['median_s']:
+                continue
+            ratio = result['median_s'] / reference['median_s']
+            rows.append((name, scale, reference['median_s'], result['median_s'], ratio, ratio > 1 + tolerance))
+    return rows
+
+def format_row(name, scale, result):
+    return '%-18s %10s %12.4f %12.4f %14.0f %10.1f %10.1f' % (name, scale, result['median_s'], result['min_s'],
+                                                                result['values_per_s'] or 0, result['mb_per_s'] or 0,
+                                                                result['peak_mb'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the sos4py parsers and requests')
+    names = [IMPORT_STAGE] + list(STAGES)
+    parser.add_argument('--stages', default=','.join(names), help='comma separated stages (default: all): ' + ', '.join(names))
+    parser.add_argument('--scales', default='1000,10000,100000', help='comma separated numbers of values, e.g. 1000,1e6')
+    parser.add_argument('--repeat', type=int, default=3, help='measured runs per stage and scale')
+    parser.add_argument('--data-dir', help='directory of the generated documents')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    parser.add_argument('--baseline', help='compare with this report')
+    parser.add_argument('--save-baseline', help='write the report as new baseline to this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slow down against the baseline (default 0.25)')
+    args = parser.parse_args(argv)
+
+    scales = [int(float(s)) for s in args.scales.split(',')]
+    print('%-18s %10s %12s %12s %14s %10s %10s' % ('stage', 'scale', 'median s', 'min s', 'values/s', 'MB/s', 'peak MB'))
+    report = run(args.stages.split(','), scales, args.repeat, args.data_dir, log=print)
+
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=1)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print('\n%-18s %10s %12s %12s %8s' % ('stage', 'scale', 'baseline s', 'median s', 'ratio'))
+        for name, scale, reference, median, ratio, regressed in rows:
+            print('%-18s %10s %12.4f %12.4f %8.2f%s' % (name, scale, reference, median, ratio, '  REGRESSION' if regressed else ''))
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
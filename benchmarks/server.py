@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Local stand-in SOS serving generated documents over HTTP
+"""
+
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+from .generators import capabilities
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+class MockSOS(object):
+    """
+    SOS on localhost answering KVP requests with files, one per operation, e.g.
+    {'GetObservation': 'om-100000.xml', 'GetFeatureOfInterest': 'foi-1000.xml'}.
+
+    The capabilities are generated. latency (seconds) delays every response, to stand in for the
+    processing time of a real server. Use as context manager, url is the service URL.
+    """
+
+    def __init__(self, documents, latency=0.0, phenomena=1):
+        self.documents = dict(documents)
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                query = dict((k.lower(), v[0]) for k, v in parse_qs(urlparse(self.path).query).items())
+                server.requests += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                operation = query.get('request', 'GetCapabilities')
+                if operation == 'GetCapabilities':
+                    body = capabilities(server.url, phenomena)
+                    self._headers(len(body))
+                    self.wfile.write(body)
+                elif operation in server.documents:
+                    path = server.documents[operation]
+                    self._headers(os.path.getsize(path))
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, self.wfile, 1 << 20)
+                else:
+                    self.send_error(400, 'Operation %s not supported' % operation)
+
+            def _headers(self, length):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/xml')
+                self.send_header('Content-Length', str(length))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _ThreadingServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/sos/kvp' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
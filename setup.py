@@ -10,7 +10,13 @@ with open('README.md') as readme_file:
 with open('HISTORY.rst') as history_file:
     history = history_file.read()
 
-requirements = ['OWSLib','pandas','geopandas','shapely','pyproj']
+requirements = ['OWSLib','requests','numpy','pandas','geopandas','shapely','pyproj']
+
+# Optional features
+extras_requirements = {
+    'async': ['aiohttp'],
+    'store': ['pyarrow'],
+}
 
 setup_requirements = [ ]
 
@@ -19,20 +25,24 @@ test_requirements = [ ]
 setup(
     author="Alfredo Chavarria Vargas",
     author_email='alchav06@gmail.com',
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: Apache Software License',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
     ],
     description="sos4py is a convenience layer for Python environment to access services from SOS instances.",
+    entry_points={
+        'console_scripts': [
+            'sos4py=sos4py.cli:main',
+        ],
+    },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="Apache Software License 2.0",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+
+"""python -m sos4py, see sos4py.cli"""
+
+import sys
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+asyncio client of the SOS requests of sos_2_0_0
+"""
+
+import asyncio
+from functools import partial
+from owslib.util import clean_ows_url, ServiceException
+from owslib.swe.observation.sos200 import SosCapabilitiesReader
+from .sos_2_0_0 import sos_2_0_0, check_service_exception, check_exception_report, data_windows, clip_window, \
+    combine_frames, SERVICE_EXCEPTION_STATUSES, HTTP_ERROR_STATUSES
+from .util import event_time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncSOS(object):
+    """
+    asyncio client of a SOS with awaitable versions of the request functions of sos_2_0_0.
+
+    The requests are sent with aiohttp, at most max_concurrency of them at the same time, so that
+    many get_data() calls can be awaited together on one event loop (e.g. with asyncio.gather()).
+    Requests and parsing are taken from the wrapped sos_2_0_0 object. The responses are parsed
+    on the default executor of the event loop, so parsing does not block other requests.
+    The response cache of the wrapped object (see sos_2_0_0.set_response_cache()) is used for the responses.
+
+    Requires aiohttp (pip install sos4py[async]).
+    """
+
+    def __init__(self, sos, max_concurrency=20, timeout=30):
+        """Initialize.
+
+        Parameters
+        ----------
+        sos : sos_2_0_0
+           SOS connection providing the capabilities, e.g. from connection_sos()
+        max_concurrency : int, optional
+           maximum number of requests sent at the same time (default is 20)
+        timeout : int, optional
+           timeout of a request in seconds (default is 30)
+        """
+
+        if aiohttp is None:
+            raise ImportError("AsyncSOS requires aiohttp, install it with 'pip install sos4py[async]'")
+        assert (max_concurrency > 0),("max_concurrency has to be positive!")
+        self.sos = sos
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+
+    @classmethod
+    async def connect(cls, url, username=None, password=None, max_concurrency=20, timeout=30):
+        """Requests the capabilities of a SOS and returns an AsyncSOS for it
+
+        Parameters
+        ----------
+        url : str
+           url of the SOS
+        username : str, optional
+           username allowed to handle with SOS
+        password : str, optional
+           password for the username
+        max_concurrency : int, optional
+           maximum number of requests sent at the same time (default is 20)
+        timeout : int, optional
+           timeout of a request in seconds (default is 30)
+
+        Returns
+        -------
+        an AsyncSOS object
+        """
+
+        clean_url = clean_ows_url(url)
+        client = cls(None, max_concurrency=max_concurrency, timeout=timeout)
+        capabilities_url = SosCapabilitiesReader(version='2.0.0').capabilities_url(clean_url)
+        try:
+            xml = await client._request(capabilities_url, None, auth=_auth(username, password))
+            client.sos = await client._run(sos_2_0_0.__new__, sos_2_0_0, clean_url, '2.0.0', xml, username, password)
+        except BaseException:
+            await client.close()
+            raise
+        return client
+
+    async def close(self):
+        """Closes the HTTP session and all its connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _open(self):
+        ''' The aiohttp session and the semaphore limiting the requests, created on the running event loop '''
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, headers={'Accept-Encoding': 'gzip, deflate'},
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _run(self, function, *args):
+        ''' Run a blocking function (e.g. a parser) on the default executor '''
+        return await asyncio.get_running_loop().run_in_executor(None, partial(function, *args))
+
+    async def _request(self, base_url, request, method='Get', auth=None, timeout=None):
+        """
+        Send a KVP request and return its checked body
+        """
+
+        session = self._open()
+        rkwargs = {'auth': auth}
+        if timeout is not None:
+            rkwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        if request is not None:
+            request = dict((k, str(v)) for k, v in request.items())
+            if method.lower() == 'post':
+                rkwargs['data'] = request
+            else:
+                rkwargs['params'] = request
+
+        async with self._semaphore:
+            async with session.request(method.upper(), base_url, **rkwargs) as response:
+                content = await response.read()
+                # Same checks as check_http_response()
+                if response.status in SERVICE_EXCEPTION_STATUSES:
+                    raise ServiceException(content.decode('utf-8', 'replace'))
+                if response.status in HTTP_ERROR_STATUSES:
+                    response.raise_for_status()
+                check_service_exception(response.headers.get('Content-Type'), content)
+        return content
+
+    async def _fetch(self, operation, base_url, request, method='Get', **url_kwargs):
+        """
+        Send a request and return its body, from the response cache if possible. Raises ExceptionReport for exception responses.
+        """
+
+        key = self.sos._cache_key(base_url, method, request)
+        if key is not None:
+            content = self.sos.response_cache.get(key, operation)
+            if content is not None:
+                return content
+
+        content = await self._request(base_url, request, method, auth=_auth(self.sos.username, self.sos.password), **url_kwargs)
+        check_exception_report(content)
+        if key is not None:
+            self.sos.response_cache.set(key, content, operation)
+        return content
+
+    async def get_observation(self, responseFormat=None, offerings=None, observedProperties=None, featuresOfInterest=None, procedures=None, eventTime=None, method=None, **kwargs):
+        """Performs "GetObservation" request, see sos_2_0_0.get_observation()
+
+        Returns
+        -------
+        response of the request as <class 'bytes'>
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self.sos._observation_request(responseFormat, offerings, observedProperties, featuresOfInterest,
+                                                                      procedures, eventTime, method, **kwargs)
+        return await self._fetch('GetObservation', base_url, request, method, **url_kwargs)
+
+    async def get_feature_of_interest(self, featuresOfInterest=None, observedProperties=None, procedures=None, responseFormat=None, method=None, **kwargs):
+        """Performs "GetFeatureOfInterest" request, see sos_2_0_0.get_feature_of_interest()
+
+        Returns
+        -------
+        response of the request as <class 'bytes'>
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self.sos._feature_of_interest_request(featuresOfInterest, observedProperties, procedures,
+                                                                              responseFormat, method, **kwargs)
+        return await self._fetch('GetFeatureOfInterest', base_url, request, method, **url_kwargs)
+
+    async def get_data_availability(self, procedures=None, observedProperties=None, featuresOfInterest=None, offerings=None, method=None, as_frame=False, **kwargs):
+        """Performs "GetDataAvailability" request, see sos_2_0_0.get_data_availability()
+
+        Returns
+        -------
+        list of GetDataAvailability members, or a DataFrame with one row per member if as_frame is True
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self.sos._data_availability_request(procedures, observedProperties, featuresOfInterest,
+                                                                            offerings, method, **kwargs)
+        response = await self._fetch('GetDataAvailability', base_url, request, method, **url_kwargs)
+        return await self._run(self.sos._parse_data_availability, response, as_frame)
+
+    async def get_data(self, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None, values_per_chunk=None, sampling_interval=None, typed=False):
+        """Gets the observations of the SOS, see sos_2_0_0.get_data()
+
+        The time windows of chunked requests (chunk_size or values_per_chunk) are requested concurrently,
+        limited by max_concurrency.
+
+        Returns
+        -------
+        observations as DataFrame
+        """
+
+        windows = data_windows(begin, end, chunk_size, values_per_chunk, sampling_interval)
+        if windows is None:
+            eventTime = 'om:resultTime,' + begin + '/' + end if begin is not None else None
+            response = await self.get_observation(featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures, eventTime=eventTime)
+            return await self._run(self.sos._parse_observations, response, typed)
+
+        async def fetch(window):
+            response = await self.get_observation(featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures,
+                                                  eventTime=event_time(*window))
+            df = await self._run(self.sos._parse_observations, response, typed)
+            return clip_window(df, window, windows)
+
+        frames = await asyncio.gather(*[fetch(window) for window in windows])
+        return combine_frames(list(frames), typed)
+
+    async def get_sites(self, include_phenomena=False):
+        """Gets the registered sites of the SOS, see sos_2_0_0.get_sites()
+
+        Returns
+        -------
+        sites as GeoDataFrame
+        """
+
+        if not include_phenomena:
+            return await self._run(self.sos._parse_sites, await self.get_feature_of_interest())
+
+        phenomena = self.sos.sosPhenomena()
+        responses = await asyncio.gather(self.get_feature_of_interest(),
+                                         *[self.get_feature_of_interest(observedProperties=[phenomenon]) for phenomenon in phenomena])
+        sites = await self._run(self.sos._parse_sites, responses[0])
+        return await self._run(self.sos._add_phenomena, sites, phenomena, responses[1:])
+
+
+def _auth(username, password):
+    ''' aiohttp basic authentication if username and password are given '''
+    return aiohttp.BasicAuth(username, password) if username and password else None
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Packing of many observation series into few GetObservation requests, see sos_2_0_0.get_data_batch()
+"""
+
+from collections import OrderedDict
+from owslib.etree import etree
+from .util import get_namespaces
+
+namespaces = get_namespaces()
+
+def normalize_target(target):
+    ''' (site, phenomenon, procedure) tuple of a target, the procedure is None if it is not given '''
+    assert (isinstance(target, (tuple, list)) and len(target) in (2, 3)),("A target is a tuple (site, phenomenon) or (site, phenomenon, procedure)!")
+    return (target[0], target[1], target[2] if len(target) == 3 else None)
+
+def pack_targets(targets, fits, max_series=50):
+    """
+    Pack (site, phenomenon, procedure) targets into requests, as few as possible.
+
+    Requests ask for the cross product of their sites, phenomena and procedures, so the sites of one
+    phenomenon and procedure are packed together and phenomena with the same sites are merged afterwards.
+    Every request holds at most max_series series and fits(sites, phenomena, procedure) has to be True
+    for it (e.g. URL length limits). A single series is always requested, even if it does not fit.
+
+    Returns
+    -------
+    list of (sites, phenomena, procedure) tuples
+    """
+
+    assert (max_series > 0),("max_series has to be positive!")
+    by_series = OrderedDict()
+    for site, phenomenon, procedure in targets:
+        sites = by_series.setdefault((phenomenon, procedure), [])
+        if site not in sites:
+            sites.append(site)
+
+    # Sites of one phenomenon and procedure
+    batches = []
+    for (phenomenon, procedure), sites in by_series.items():
+        batch = []
+        for site in sites:
+            if len(batch) > 0 and (len(batch) + 1 > max_series or not fits(batch + [site], [phenomenon], procedure)):
+                batches.append((batch, [phenomenon], procedure))
+                batch = []
+            batch.append(site)
+        batches.append((batch, [phenomenon], procedure))
+
+    # Phenomena observed at the same sites with the same procedure
+    merged = OrderedDict()
+    for sites, phenomena, procedure in batches:
+        key = (tuple(sites), procedure)
+        if key in merged:
+            candidate = merged[key][-1]
+            if len(sites) * (len(candidate) + 1) <= max_series and fits(list(sites), candidate + phenomena, procedure):
+                candidate.extend(phenomena)
+                continue
+        merged.setdefault(key, []).append(list(phenomena))
+    return [(list(sites), phenomena, procedure) for (sites, procedure), groups in merged.items() for phenomena in groups]
+
+def observation_request_xml(request):
+    """
+    XML (POX) GetObservation request with the parameters of a KVP request (dict), for HTTP POST
+    """
+
+    sos = '{%s}' % namespaces['sos']
+    E = lambda name, text=None, **attributes: _element(sos + name, text, **attributes)
+    root = etree.Element(sos + 'GetObservation', nsmap={'sos': namespaces['sos'], 'fes': namespaces['fes'],
+                                                        'gml': namespaces['gml32'], 'swes': namespaces['swes']},
+                         service='SOS', version=request.get('version', '2.0.0'))
+    # Order of the elements given by the schema
+    for name, parameter in (('procedure', 'procedure'), ('offering', 'offering'), ('observedProperty', 'observedProperty')):
+        for value in _values(request, parameter):
+            root.append(E(name, value))
+    if request.get('temporalFilter'):
+        reference, period = request['temporalFilter'].split(',', 1)
+        fes = '{%s}' % namespaces['fes']
+        gml = '{%s}' % namespaces['gml32']
+        temporal_filter = E('temporalFilter')
+        during = _element(fes + 'During')
+        during.append(_element(fes + 'ValueReference', reference))
+        time_period = _element(gml + 'TimePeriod', **{gml + 'id': 'tp_1'})
+        begin, end = period.split('/')
+        time_period.append(_element(gml + 'beginPosition', begin))
+        time_period.append(_element(gml + 'endPosition', end))
+        during.append(time_period)
+        temporal_filter.append(during)
+        root.append(temporal_filter)
+    for value in _values(request, 'featureOfInterest'):
+        root.append(E('featureOfInterest', value))
+    if request.get('responseFormat'):
+        root.append(E('responseFormat', request['responseFormat']))
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8')
+
+def _values(request, parameter):
+    ''' Values of a comma separated KVP parameter '''
+    return request[parameter].split(',') if request.get(parameter) else []
+
+def _element(tag, text=None, **attributes):
+    element = etree.Element(tag, **attributes)
+    element.text = text
+    return element
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Response caches for GetObservation, GetFeatureOfInterest and GetDataAvailability requests
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from .util import lazy_import
+
+pd = lazy_import('pandas')
+
+# KVP parameters holding comma separated lists whose order does not change the result
+LIST_PARAMETERS = ('procedure', 'offering', 'observedProperty', 'featureOfInterest')
+
+def make_key(base_url, method, request, *extra):
+    ''' Cache key of a request: hash of the URL, the HTTP method and the normalized KVP parameters '''
+    normalized = {}
+    for name, value in request.items():
+        if name in LIST_PARAMETERS and isinstance(value, str):
+            value = ','.join(sorted(value.split(',')))
+        normalized[name] = value
+    text = json.dumps([base_url.rstrip('?'), method.lower(), normalized, [str(e) for e in extra]], sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def size_of(value):
+    ''' Approximate size of a cached value in bytes '''
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # deep=True includes the strings of object columns
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, list):
+        return sum(size_of(v) for v in value) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+def copy_value(value):
+    ''' Copy of mutable cached results, so callers cannot change the cache '''
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, list):
+        return [copy_value(v) for v in value]
+    return value
+
+
+class ResponseCache(object):
+    """
+    Base class of the response caches.
+
+    Entries are evicted in least recently used order as soon as max_entries or max_bytes is exceeded.
+    ttl is the default time to live in seconds (None: no expiry), ttls maps operation names
+    (e.g. 'GetObservation') to their own time to live.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, ttls=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._operation_stats = {}
+        self._lock = threading.RLock()
+
+    def _expires(self, operation):
+        ttl = self.ttls.get(operation, self.ttl)
+        return None if ttl is None else time.time() + ttl
+
+    def _count(self, operation, hit):
+        stats = self._operation_stats.setdefault(operation, {'hits': 0, 'misses': 0})
+        if hit:
+            self.hits += 1
+            stats['hits'] += 1
+        else:
+            self.misses += 1
+            stats['misses'] += 1
+
+    def get(self, key, operation=None):
+        """Returns the cached value of key or None"""
+        with self._lock:
+            value = self._get(key)
+            self._count(operation, value is not None)
+            return value
+
+    def set(self, key, value, operation=None):
+        """Stores value under key, using the time to live of operation"""
+        with self._lock:
+            self._set(key, value, size_of(value), self._expires(operation))
+            self._evict()
+
+    def _evict(self):
+        while (self.max_entries is not None and len(self) > self.max_entries) or \
+                (self.max_bytes is not None and self.size > self.max_bytes and len(self) > 0):
+            self._pop_oldest()
+            self.evictions += 1
+
+    def stats(self):
+        """Returns hits, misses, evictions, number of entries and size in bytes, and hits/misses per operation"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self), 'bytes': self.size,
+                    'operations': dict((k, dict(v)) for k, v in self._operation_stats.items())}
+
+
+class MemoryCache(ResponseCache):
+    """
+    Response cache in memory
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None, ttl=None, ttls=None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, ttls=ttls)
+        self._entries = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires = entry
+        if expires is not None and expires < time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return copy_value(value)
+
+    def _set(self, key, value, size, expires):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (copy_value(value), size, expires)
+        self.size += size
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def _pop_oldest(self):
+        self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class DiskCache(ResponseCache):
+    """
+    Response cache on disk, every entry is a pickle file in directory.
+    The least recently used order is kept in the modification times of the files.
+    """
+
+    def __init__(self, directory, max_entries=None, max_bytes=1024 ** 3, ttl=None, ttls=None):
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, ttls=ttls)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._entries = OrderedDict()
+        self.size = 0
+        files = [name for name in os.listdir(directory) if name.endswith('.pickle')]
+        files.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+        for name in files:
+            size = os.path.getsize(os.path.join(directory, name))
+            self._entries[name[:-len('.pickle')]] = size
+            self.size += size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def _get(self, key):
+        if key not in self._entries:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except Exception:
+            self._remove(key)
+            return None
+        if expires is not None and expires < time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        os.utime(self._path(key))
+        return value
+
+    def _set(self, key, value, size, expires):
+        if key in self._entries:
+            self._remove(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        size = os.path.getsize(self._path(key))
+        self._entries[key] = size
+        self.size += size
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def _pop_oldest(self):
+        self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
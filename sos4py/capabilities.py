@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Persistent cache of capabilities documents
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from io import BytesIO
+import owslib
+import requests
+from owslib.etree import etree
+from owslib.swe.observation.sos200 import SosCapabilitiesReader
+from . import __version__
+from .sos_2_0_0 import sos_2_0_0, check_http_response
+from .util import write_atomic
+
+
+class _ObjectPickler(pickle.Pickler):
+    ''' Pickler leaving out the lxml elements owslib keeps next to its parsed metadata '''
+
+    def persistent_id(self, obj):
+        if isinstance(obj, etree._Element):
+            return 'element'
+        return None
+
+
+class _ObjectUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid):
+        return None
+
+
+class CapabilitiesCache(object):
+    """
+    On-disk cache of SOS capabilities, keyed by the cleaned service URL and the username
+    (servers may return different capabilities per user). Passwords are never stored.
+
+    Every entry keeps the capabilities document, its ETag/Last-Modified headers and the
+    pickled sos_2_0_0 object built from it. Within ttl seconds the object is restored
+    from the pickle without any request or XML parsing. After ttl seconds the document is
+    revalidated with a conditional request and only downloaded and parsed again if it changed.
+    """
+
+    def __init__(self, directory, ttl=3600, timeout=30):
+        self.directory = directory
+        self.ttl = ttl
+        self.timeout = timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, username, extension):
+        key = hashlib.sha1((url + '\n' + (username or '')).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + extension)
+
+    def _read_meta(self, url, username):
+        try:
+            with open(self._path(url, username, '.json'), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or meta.get('username') != username or \
+                not os.path.exists(self._path(url, username, '.xml')):
+            return None
+        return meta
+
+    def _write_meta(self, url, username, meta):
+        write_atomic(self._path(url, username, '.json'), json.dumps(meta).encode('utf-8'))
+
+    def _load_object(self, url, username, meta):
+        ''' Restore the pickled object if it was written by the same sos4py and owslib versions '''
+        if meta.get('sos4py') != __version__ or meta.get('owslib') != owslib.__version__:
+            return None
+        try:
+            with open(self._path(url, username, '.pickle'), 'rb') as f:
+                return _ObjectUnpickler(f).load()
+        except Exception:
+            return None
+
+    def _save(self, url, username, obj, meta, xml=None):
+        ''' Save the document (if given), the pickled object (without credentials) and the meta data of an entry '''
+        if xml is not None:
+            write_atomic(self._path(url, username, '.xml'), xml)
+        buffer = BytesIO()
+        try:
+            _ObjectPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+            write_atomic(self._path(url, username, '.pickle'), buffer.getvalue())
+        except Exception:
+            # The object can still be rebuilt from the document
+            if os.path.exists(self._path(url, username, '.pickle')):
+                os.remove(self._path(url, username, '.pickle'))
+        meta.update({'url': url, 'username': username, 'sos4py': __version__, 'owslib': owslib.__version__})
+        self._write_meta(url, username, meta)
+
+    def _restore(self, url, meta, username=None, password=None):
+        obj = self._load_object(url, username, meta)
+        if obj is None:
+            with open(self._path(url, username, '.xml'), 'rb') as f:
+                obj = sos_2_0_0.__new__(sos_2_0_0, url, '2.0.0', f.read(), username, password)
+            self._save(url, username, obj, meta)
+            return obj
+        obj.username = username
+        obj.password = password
+        return obj
+
+    def get(self, url, username=None, password=None):
+        """Returns the sos_2_0_0 object of a (cleaned) SOS URL, from the cache if possible
+
+        Parameters
+        ----------
+        url : str
+           cleaned url of the SOS
+        username : str, optional
+           username allowed to handle with SOS
+        password : str, optional
+           password for the username
+
+        Returns
+        -------
+        a sos_2_0_0 object
+        """
+
+        meta = self._read_meta(url, username)
+        if meta is not None and time.time() - meta['fetched'] < self.ttl:
+            return self._restore(url, meta, username, password)
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        capabilities_url = SosCapabilitiesReader(version='2.0.0').capabilities_url(url)
+        auth = (username, password) if username and password else None
+        response = requests.get(capabilities_url, headers=headers, auth=auth, timeout=self.timeout)
+
+        if meta is not None and response.status_code == 304:
+            # Not modified, the cached entry is valid for another ttl seconds
+            meta['fetched'] = time.time()
+            self._write_meta(url, username, meta)
+            return self._restore(url, meta, username, password)
+
+        check_http_response(response)
+        xml = response.content
+        obj = sos_2_0_0.__new__(sos_2_0_0, url, '2.0.0', xml, username, password)
+        meta = {'fetched': time.time(), 'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+        self._save(url, username, obj, meta, xml)
+        return obj
+
+    def clear(self, url=None, username=None):
+        """Removes the entry of one url (and username) or all entries"""
+        if url is not None:
+            paths = [self._path(url, username, extension) for extension in ('.json', '.xml', '.pickle')]
+        else:
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if os.path.splitext(name)[1] in ('.json', '.xml', '.pickle')]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
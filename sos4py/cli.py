@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Command line interface of sos4py (the sos4py command, or python -m sos4py)
+
+    sos4py export URL DIRECTORY [--sites ...] [--phenomena ...] [--begin ... --end ...] [--chunk-size 30D] [--workers 8]
+"""
+
+import argparse
+import sys
+from .main import connection_sos
+from .scheduler import AdaptiveScheduler
+from .export import export, SINKS
+
+def build_parser():
+    ''' Argument parser of the sos4py command '''
+    parser = argparse.ArgumentParser(prog='sos4py', description='Command line tools of sos4py')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    command = commands.add_parser('export', help='download observations to Parquet or CSV files, resumable',
+                                  description='Download observations to part files of a directory. Progress is kept in the '
+                                              'directory, running the same command again resumes an interrupted export.')
+    command.add_argument('url', help='URL of the SOS')
+    command.add_argument('directory', help='output directory for the part files and the checkpoint')
+    command.add_argument('--sites', nargs='+', metavar='SITE', help='features of interest (default: all)')
+    command.add_argument('--phenomena', nargs='+', metavar='PHENOMENON', help='observed properties (default: all)')
+    command.add_argument('--procedures', nargs='+', metavar='PROCEDURE', help='procedures (default: all)')
+    command.add_argument('--begin', help="begin of the period, e.g. '2020-01-01T00:00:00Z'")
+    command.add_argument('--end', help="end of the period, e.g. '2021-01-01T00:00:00Z'")
+    command.add_argument('--chunk-size', help="size of the time windows requested one by one, e.g. '30D'")
+    command.add_argument('--values-per-chunk', type=int, help='size the time windows to hold about this many values (requires --sampling-interval)')
+    command.add_argument('--sampling-interval', help="sampling interval of the time series, e.g. '10min'")
+    command.add_argument('--plan', action='store_true', help='plan the requests with GetDataAvailability, leaving out series without data')
+    command.add_argument('--format', choices=sorted(SINKS), default='parquet', help='format of the part files (default: parquet)')
+    command.add_argument('--workers', type=int, default=4, help='number of parallel requests (default: 4)')
+    command.add_argument('--adaptive', action='store_true', help='adjust the parallel requests (up to --workers) to the server and retry failed requests')
+    command.add_argument('--retries', type=int, default=3, help='retries of failed requests with --adaptive (default: 3)')
+    command.add_argument('--parse-processes', type=int, help='parse the responses in this many worker processes')
+    command.add_argument('--username', help='user name for HTTP basic authentication')
+    command.add_argument('--password', help='password for HTTP basic authentication')
+    command.add_argument('--cache-dir', help='directory of the capabilities cache')
+    command.add_argument('--quiet', action='store_true', help='print the summary only')
+    return parser
+
+def format_summary(summary, scheduler=None):
+    ''' Text of the throughput summary of an export '''
+    lines = ['Exported %d rows of %d requests in %.1f s (%d requests finished before, %d rows in total)'
+             % (summary['rows'], summary['fetched'], summary['elapsed'], summary['resumed'], summary['total_rows'])]
+    if summary['elapsed'] > 0:
+        lines.append('Throughput: %.1f rows/s, %.2f MB/s, %.2f requests/s (%d bytes received)'
+                     % (summary['rows_per_s'], summary['bytes_per_s'] / 1e6, summary['requests_per_s'], summary['bytes']))
+    if scheduler is not None:
+        report = scheduler.report()
+        lines.append('Scheduler: %d retries, concurrency %d (highest %d), %d decreases'
+                     % (report['retries'], report['concurrency'], report['max_concurrency'], report['decreases']))
+    return '\n'.join(lines)
+
+def _print_progress(finished, total, unit, rows):
+    period = '%s/%s' % (unit['begin'], unit['end']) if unit['begin'] is not None else 'all times'
+    print('[%d/%d] %s: %d rows' % (finished, total, period, rows), file=sys.stderr, flush=True)
+
+def run_export(args):
+    ''' The export command, returns the exit status '''
+    sos = connection_sos(args.url, username=args.username, password=args.password, cache_dir=args.cache_dir)
+    # One keep-alive connection per worker
+    sos.open_session(pool_maxsize=max(10, args.workers))
+    if args.parse_processes is not None:
+        sos.set_parse_processes(args.parse_processes)
+    scheduler = None
+    if args.adaptive:
+        scheduler = AdaptiveScheduler(max_workers=args.workers, initial_workers=min(2, args.workers), retries=args.retries)
+    try:
+        summary = export(sos, args.directory, args.sites, args.phenomena, args.procedures, args.begin, args.end, args.chunk_size,
+                         args.values_per_chunk, args.sampling_interval, args.plan, args.format, args.workers, scheduler,
+                         None if args.quiet else _print_progress)
+    except KeyboardInterrupt:
+        print('Interrupted, run the same command again to resume the export', file=sys.stderr)
+        return 130
+    except Exception as e:
+        print('Export failed: %s: %s\nThe finished requests are kept, run the same command again to resume the export'
+              % (type(e).__name__, e), file=sys.stderr)
+        return 1
+    finally:
+        sos.close()
+    print(format_summary(summary, scheduler))
+    return 0
+
+def main(argv=None):
+    """
+    Entry point of the sos4py command
+
+    Returns
+    -------
+    exit status
+    """
+
+    args = build_parser().parse_args(argv)
+    if args.command == 'export':
+        return run_export(args)
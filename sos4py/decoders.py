@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Fast decoders turning SOS responses directly into columns
+"""
+
+from collections import namedtuple
+from io import StringIO
+from owslib.etree import etree
+from .util import get_namespaces, lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+namespaces = get_namespaces()
+
+IDENTIFIER_COLUMNS = ('site', 'procedure', 'phenomenon', 'unit')
+TIME_COLUMNS = ('phenomenon_time', 'result_time', 'time_stamp')
+
+# Columns of the observation DataFrames per response format
+OM_COLUMNS = ['site', 'procedure', 'phenomenon', 'phenomenon_time', 'result_time', 'value', 'unit']
+WATERML_COLUMNS = ['site', 'procedure', 'phenomenon', 'time_stamp', 'value', 'unit']
+
+def _xpath(path):
+    ''' Precompiled XPath using the sos4py namespace prefixes '''
+    return etree.XPath(path, namespaces=namespaces)
+
+# WaterML 2.0
+_wml_observations = _xpath("sos:observationData/om20:OM_Observation[om20:result/wml2:MeasurementTimeseries]")
+_wml_first = _xpath("boolean(sos:observationData[1]/om20:OM_Observation/om20:result/wml2:MeasurementTimeseries)")
+_wml_site = _xpath("string(om20:featureOfInterest/@xlink:href)")
+_wml_procedure = _xpath("string(om20:procedure/@xlink:href)")
+_wml_phenomenon = _xpath("string(om20:observedProperty/@xlink:href)")
+_wml_uom = _xpath("string(om20:result/wml2:MeasurementTimeseries/wml2:defaultPointMetadata/wml2:DefaultTVPMeasurementMetadata/wml2:uom/@code)")
+_wml_times = _xpath("om20:result/wml2:MeasurementTimeseries/wml2:point/wml2:MeasurementTVP/wml2:time/text()")
+_wml_values = _xpath("om20:result/wml2:MeasurementTimeseries/wml2:point/wml2:MeasurementTVP/wml2:value")
+
+# GetDataAvailability
+_gda_members = _xpath("gda:dataAvailabilityMember")
+_gda_procedure = _xpath("string(gda:procedure/@xlink:href)")
+_gda_observed_property = _xpath("string(gda:observedProperty/@xlink:href)")
+_gda_feature = _xpath("string(gda:featureOfInterest/@xlink:href)")
+_gda_time_reference = _xpath("string(gda:phenomenonTime/@xlink:href)")
+_gda_instant = _xpath("string(gda:phenomenonTime/gml32:TimeInstant/gml32:timePosition)")
+_gda_begin = _xpath("string(gda:phenomenonTime/gml32:TimePeriod/gml32:beginPosition)")
+_gda_end = _xpath("string(gda:phenomenonTime/gml32:TimePeriod/gml32:endPosition)")
+_gda_result_time = _xpath("string(gda:resultTime/gml32:TimeInstant/gml32:timePosition)")
+_gda_periods = _xpath("gda:dataAvailabilityMember/gda:phenomenonTime/gml32:TimePeriod[@gml32:id]")
+_period_begin = _xpath("string(gml32:beginPosition)")
+_period_end = _xpath("string(gml32:endPosition)")
+
+# GetFeatureOfInterest
+_foi_monitoring_points = _xpath("sos:featureMember/wml2:MonitoringPoint")
+_foi_sampling_features = _xpath("sos:featureMember/sams:SF_SpatialSamplingFeature")
+_foi_identifier = _xpath("string(gml32:identifier)")
+_foi_name = _xpath("string(gml32:name)")
+_foi_pos = _xpath("string(sams:shape/gml32:Point/gml32:pos)")
+_foi_srs = _xpath("string(sams:shape/gml32:Point/gml32:pos/@srsName)")
+
+# Result handling (GetResultTemplate/GetResult)
+_template_fields = _xpath("sos:resultStructure//swe20:DataRecord/swe20:field")
+_template_encoding = _xpath("sos:resultEncoding/swe20:TextEncoding")
+_field_component = _xpath("*[1]")
+_component_uom = _xpath("string(swe20:uom/@code)")
+_result_values = _xpath("string(sos:resultValues)")
+
+# Fields (name, type, definition and unit code per field) and the text encoding of GetResult responses
+ResultTemplate = namedtuple('ResultTemplate', ['names', 'types', 'definitions', 'uoms', 'token_separator', 'block_separator', 'decimal_separator'])
+
+AVAILABILITY_COLUMNS = ['Procedure', 'ObservedProperty', 'FeatureOfInterest', 'StartTime', 'EndTime', 'ResultTime']
+
+def _none_if_empty(value):
+    return value if value != '' else None
+
+def to_float_array(texts):
+    ''' Convert a list of str (or None) to a float64 array, values that cannot be parsed become NaN '''
+    try:
+        return np.array(texts, dtype=np.float64)
+    except (TypeError, ValueError):
+        values = np.empty(len(texts), dtype=np.float64)
+        for i, text in enumerate(texts):
+            try:
+                values[i] = float(text)
+            except (TypeError, ValueError):
+                values[i] = np.nan
+        return values
+
+def to_datetime_array(texts):
+    ''' Convert a list of ISO 8601 str to a datetime64[ns] array in UTC '''
+    if len(texts) == 0:
+        return np.array([], dtype='datetime64[ns]')
+    return pd.to_datetime(pd.Index(texts, dtype=object), utc=True).tz_localize(None).values.astype('datetime64[ns]')
+
+def decode_waterml_columns(element):
+    """
+    Decode the wml2:MeasurementTimeseries of a GetObservation response (lxml element).
+
+    Returns a dict with the per series metadata ('site', 'procedure', 'phenomenon', 'unit' as lists),
+    the number of points per series ('lengths') and the points of all series ('time_stamp' as
+    datetime64[ns] in UTC and 'value' as float64 arrays).
+    """
+
+    series = {'site': [], 'procedure': [], 'phenomenon': [], 'unit': []}
+    points = []
+
+    for observation in _wml_observations(element):
+        series['site'].append(_none_if_empty(_wml_site(observation)))
+        series['procedure'].append(_none_if_empty(_wml_procedure(observation)))
+        series['phenomenon'].append(_none_if_empty(_wml_phenomenon(observation)))
+        series['unit'].append(_none_if_empty(_wml_uom(observation)))
+
+        series_times = _wml_times(observation)
+        series_values = _wml_values(observation)
+        if len(series_times) != len(series_values):
+            raise ValueError("Error parsing WaterML 2.0 time series: number of times and values differ")
+        points.append((series_times, series_values))
+
+    lengths = np.array([len(series_times) for series_times, _ in points], dtype=np.int64)
+    total = int(lengths.sum())
+
+    # Fill preallocated columns series by series
+    time_stamps = np.empty(total, dtype='datetime64[ns]')
+    values = np.empty(total, dtype=np.float64)
+    start = 0
+    for (series_times, series_values), length in zip(points, lengths):
+        time_stamps[start:start + length] = to_datetime_array(series_times)
+        values[start:start + length] = to_float_array([e.text for e in series_values])
+        start += length
+
+    series['lengths'] = lengths
+    series['time_stamp'] = time_stamps
+    series['value'] = values
+    return series
+
+def decode_waterml(element, columns=None, typed=False):
+    """
+    Decode a WaterML 2.0 GetObservation response (lxml element) into a DataFrame with one row per point.
+    With typed=True the identifier columns are categorical (see to_typed()).
+    """
+
+    decoded = decode_waterml_columns(element)
+    lengths = decoded['lengths']
+
+    data = {}
+    for name in IDENTIFIER_COLUMNS:
+        # The metadata is stored once per series and repeated to the length of its series
+        if typed:
+            categories, codes = _factorize(decoded[name])
+            data[name] = pd.Categorical.from_codes(np.repeat(codes, lengths), categories=categories)
+        else:
+            data[name] = np.repeat(np.array(decoded[name], dtype=object), lengths)
+    data['time_stamp'] = pd.DatetimeIndex(decoded['time_stamp']).tz_localize('UTC')
+    data['value'] = decoded['value']
+
+    df = pd.DataFrame(data, columns=columns or ['site', 'procedure', 'phenomenon', 'time_stamp', 'value', 'unit'])
+    if typed:
+        df['value'] = _typed_values(df['value'])
+    return df
+
+def _factorize(values):
+    ''' Categories (without None) and codes (-1 for None) of a list of identifiers '''
+    categories = sorted(set(v for v in values if v is not None))
+    index = dict((c, i) for i, c in enumerate(categories))
+    codes = np.array([index.get(v, -1) if v is not None else -1 for v in values], dtype=np.int32)
+    return categories, codes
+
+def _typed_values(values):
+    ''' float64 values, nullable Float64 if values are missing '''
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.isna().sum() > values.isna().sum():
+        # Not a numeric result (e.g. category or text observations), keep the values as they are
+        return values
+    numeric = numeric.astype('float64')
+    if numeric.isna().any():
+        return numeric.astype('Float64')
+    return numeric
+
+def to_typed(df):
+    """
+    Compact, typed version of an observation DataFrame:
+    categorical identifier columns (site, procedure, phenomenon, unit), timezone aware
+    datetime64[ns, UTC] time columns and float64 values (nullable Float64 if values are missing).
+    """
+
+    df = df.copy()
+    for name in IDENTIFIER_COLUMNS:
+        if name in df.columns and not isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype('category')
+    for name in TIME_COLUMNS:
+        if name in df.columns and str(df[name].dtype) != 'datetime64[ns, UTC]':
+            try:
+                df[name] = pd.to_datetime(df[name], utc=True).astype('datetime64[ns, UTC]')
+            except (TypeError, ValueError):
+                # e.g. phenomenon times which are time periods
+                pass
+    if 'value' in df.columns:
+        df['value'] = _typed_values(df['value'])
+    return df
+
+def empty_frame(columns, typed=False):
+    ''' Observation DataFrame without rows, with the dtypes of to_typed() if typed is True '''
+    if not typed:
+        return pd.DataFrame(columns=columns)
+    data = {}
+    for name in columns:
+        if name in IDENTIFIER_COLUMNS:
+            data[name] = pd.Categorical([])
+        elif name in TIME_COLUMNS:
+            data[name] = pd.Series([], dtype='datetime64[ns, UTC]')
+        elif name == 'value':
+            data[name] = pd.Series([], dtype='float64')
+        else:
+            data[name] = pd.Series([], dtype=object)
+    return pd.DataFrame(data, columns=columns)
+
+def decode_data_availability(element):
+    """
+    Decode a GetDataAvailability response (lxml element) into a DataFrame with one row per member.
+
+    The columns are Procedure, ObservedProperty, FeatureOfInterest and the datetime64[ns, UTC] columns
+    StartTime, EndTime (the phenomenon time, both equal for time instants) and ResultTime. Phenomenon times
+    referencing the time period of another member (xlink:href="#id") are resolved. Indexed by
+    FeatureOfInterest, ObservedProperty and Procedure the result can be used as a lookup table.
+    """
+
+    # Time periods by gml:id, for members referencing them
+    periods = {}
+    for period in _gda_periods(element):
+        periods['#' + period.get('{%s}id' % namespaces['gml32'])] = (_period_begin(period), _period_end(period))
+
+    columns = dict((name, []) for name in AVAILABILITY_COLUMNS)
+    for member in _gda_members(element):
+        columns['Procedure'].append(_none_if_empty(_gda_procedure(member)))
+        columns['ObservedProperty'].append(_none_if_empty(_gda_observed_property(member)))
+        columns['FeatureOfInterest'].append(_none_if_empty(_gda_feature(member)))
+        instant = _gda_instant(member)
+        if instant != '':
+            begin = end = instant
+        else:
+            begin, end = periods.get(_gda_time_reference(member), (_gda_begin(member), _gda_end(member)))
+        columns['StartTime'].append(_none_if_empty(begin))
+        columns['EndTime'].append(_none_if_empty(end))
+        columns['ResultTime'].append(_none_if_empty(_gda_result_time(member)))
+
+    for name in ('StartTime', 'EndTime', 'ResultTime'):
+        columns[name] = pd.DatetimeIndex(to_datetime_array(columns[name])).tz_localize('UTC')
+    return pd.DataFrame(columns, columns=AVAILABILITY_COLUMNS)
+
+def decode_features(element):
+    """
+    Decode the point features of a GetFeatureOfInterest response (lxml element) into columns.
+
+    Returns a dict with the lists 'id', 'name' and 'srs' and the (n, 2) float64 array 'coordinates' in the
+    axis order of gml:pos (e.g. latitude, longitude). Features without a point geometry are left out.
+    """
+
+    columns = {'id': [], 'name': [], 'srs': []}
+    positions = []
+    for feature in _foi_monitoring_points(element) + _foi_sampling_features(element):
+        pos = _foi_pos(feature).split()
+        if len(pos) < 2:
+            continue
+        columns['id'].append(_none_if_empty(_foi_identifier(feature).strip()))
+        columns['name'].append(_none_if_empty(_foi_name(feature).strip()))
+        columns['srs'].append(_none_if_empty(_foi_srs(feature)))
+        positions.append(pos[:2])
+    try:
+        columns['coordinates'] = np.array(positions, dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        raise ValueError("Error parsing coordinates value")
+    return columns
+
+def decode_feature_names(element):
+    ''' Names (gml:name, None if missing) of all features of a GetFeatureOfInterest response (lxml element) '''
+    return [_none_if_empty(_foi_name(feature).strip()) for feature in _foi_monitoring_points(element) + _foi_sampling_features(element)]
+
+def decode_result_template(element):
+    """
+    Decode a GetResultTemplate response (lxml element) with a swe:DataRecord structure and swe:TextEncoding into a ResultTemplate
+    """
+
+    names, types, definitions, uoms = [], [], [], []
+    for field in _template_fields(element):
+        component = _field_component(field)[0]
+        names.append(field.get('name'))
+        types.append(etree.QName(component).localname)
+        definitions.append(component.get('definition'))
+        uoms.append(_none_if_empty(_component_uom(component)))
+    encodings = _template_encoding(element)
+    if len(names) == 0 or len(encodings) == 0:
+        raise ValueError("Only result templates with a swe:DataRecord and a swe:TextEncoding are supported")
+    encoding = encodings[0]
+    return ResultTemplate(names, types, definitions, uoms, encoding.get('tokenSeparator', ','),
+                          encoding.get('blockSeparator', '\n'), encoding.get('decimalSeparator', '.'))
+
+def decode_result_values(element, template):
+    """
+    Decode the text block of a GetResult response (lxml element) into a DataFrame with one column per template field.
+    Quantity and Count fields become float64, Time fields datetime64[ns, UTC], all other fields str.
+    """
+
+    text = _result_values(element).strip()
+    blocks = text.split(template.block_separator, 1)
+    if len(blocks) > 1 and template.token_separator not in blocks[0] and blocks[0].strip().isdigit():
+        # Text encoded data arrays start with the number of blocks
+        text = blocks[1]
+    if text.strip() == '':
+        return pd.DataFrame(dict((name, pd.Series([], dtype=object)) for name in template.names), columns=template.names)
+
+    if template.block_separator != '\n':
+        text = text.replace('\n', ' ').replace(template.block_separator, '\n')
+    # The C parser only handles single character separators
+    engine = 'c' if len(template.token_separator) == 1 else 'python'
+    df = pd.read_csv(StringIO(text), sep=template.token_separator, header=None, names=template.names, dtype=str,
+                     skipinitialspace=True, engine=engine, keep_default_na=False, na_values=[''])
+
+    for name, field_type in zip(template.names, template.types):
+        if field_type in ('Quantity', 'Count'):
+            values = df[name].str.strip()
+            if template.decimal_separator != '.':
+                values = values.str.replace(template.decimal_separator, '.', regex=False)
+            df[name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif field_type == 'Time':
+            df[name] = pd.DatetimeIndex(to_datetime_array(list(df[name].str.strip()))).tz_localize('UTC')
+    return df
+
+def is_waterml(element):
+    ''' Whether a GetObservation response (lxml element) contains WaterML 2.0 time series '''
+    return _wml_first(element)
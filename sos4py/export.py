@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Resumable bulk export of observations to Parquet or CSV files, used by the ``sos4py export`` command (sos4py.cli)
+
+An export directory holds one part file per request with observations (part-000000.parquet, ...) and the
+checkpoint: job.json with the parameters and the requests of the export, written once, and done.jsonl with
+one line per finished request. Running the same export again only sends the requests not finished yet.
+"""
+
+import json
+import os
+import threading
+import time
+from .sos_2_0_0 import data_windows, prefetch_map
+from .sync import time_column
+from .util import format_time, event_time, to_timestamp
+from .sinks import CsvSink, ParquetSink, write_frames
+
+JOB_FILE = 'job.json'
+DONE_FILE = 'done.jsonl'
+
+SINKS = {'parquet': ParquetSink, 'csv': CsvSink}
+
+def _time(value):
+    return format_time(value) if value is not None else None
+
+def _unit(sites, phenomena, procedures, begin, end, keep_before):
+    ''' Request of an export as JSON compatible dict, times as text '''
+    return {'sites': list(sites) if sites is not None else None, 'phenomena': list(phenomena) if phenomena is not None else None,
+            'procedures': list(procedures) if procedures is not None else None, 'begin': _time(begin), 'end': _time(end),
+            'keep_before': _time(keep_before)}
+
+def job_units(sos, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None, values_per_chunk=None,
+              sampling_interval=None, plan=False):
+    """
+    Requests of an export: the time windows of get_data() (one request without chunk_size and values_per_chunk)
+    or, with plan, the requests of plan_data()
+
+    Returns
+    -------
+    list of dicts with sites, phenomena, procedures, begin, end and keep_before (observations at or after it
+    belong to the next request), times as 'YYYY-MM-DDThh:mm:ssZ'
+    """
+
+    if plan:
+        planned = sos.plan_data(sites, phenomena, procedures, begin, end, chunk_size, values_per_chunk, sampling_interval)
+        return [_unit(r.sites, r.phenomena, r.procedures, r.begin, r.end, r.keep_before) for r in planned]
+    windows = data_windows(begin, end, chunk_size, values_per_chunk, sampling_interval)
+    if windows is None:
+        return [_unit(sites, phenomena, procedures, begin, end, None)]
+    # Like clip_window(), observations on a shared boundary belong to the later window
+    return [_unit(sites, phenomena, procedures, b, e, e if e < windows[-1][1] else None) for b, e in windows]
+
+def unit_frame(sos, unit):
+    ''' Observations of one of the requests of job_units() as typed DataFrame (see get_data()) '''
+    eventTime = event_time(unit['begin'], unit['end']) if unit['begin'] is not None else None
+    df = sos._observation_frame(True, featuresOfInterest=unit['sites'], observedProperties=unit['phenomena'],
+                                procedures=unit['procedures'], eventTime=eventTime)
+    if unit['keep_before'] is not None and len(df) > 0:
+        df = df[df[time_column(df)] < to_timestamp(unit['keep_before'])]
+    return df
+
+def read_checkpoint(directory):
+    """
+    Checkpoint of an export directory
+
+    Returns
+    -------
+    tuple of the job (dict with the parameters and the requests as 'units') and a dict of the finished requests
+    (index -> {'part': file name or None, 'rows': row count}), (None, {}) if the export did not start yet
+    """
+
+    path = os.path.join(directory, JOB_FILE)
+    if not os.path.exists(path):
+        return None, {}
+    with open(path, encoding='utf-8') as f:
+        job = json.load(f)
+    done = {}
+    path = os.path.join(directory, DONE_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line of an interrupted export may be incomplete
+                    continue
+                done[entry['index']] = entry
+    return job, done
+
+def _write_json(path, document):
+    ''' Write a JSON file atomically '''
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+class _Totals(object):
+    ''' Hook summing the requests and bytes of an export '''
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.requests += 1
+            self.bytes += record.bytes
+
+
+def export(sos, directory, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None,
+           values_per_chunk=None, sampling_interval=None, plan=False, format='parquet', max_workers=4, scheduler=None,
+           progress=None):
+    """
+    Downloads observations into part files of directory, one per request with observations, and records the
+    progress in the directory (see the module documentation). Calling it again with the same arguments resumes
+    the export: the finished requests are not sent again. A directory holding another export raises ValueError.
+
+    The requests are sent on max_workers threads, at most max_workers of them ahead of the one written next, so
+    only max_workers responses are held in memory. Use chunk_size or values_per_chunk (or plan) to split large
+    exports into resumable parts.
+
+    Parameters
+    ----------
+    sos : sos_2_0_0
+       the service
+    directory : str
+       output directory, created if necessary
+    format : str, optional
+       'parquet' (default, requires pyarrow) or 'csv', see sos4py.sinks
+    max_workers : int, optional
+       number of parallel requests (default is 4)
+    scheduler : sos4py.scheduler.AdaptiveScheduler, optional
+       adjusts the number of parallel requests (up to max_workers) to the server and retries failed requests
+    progress : callable, optional
+       called with the number of finished requests, the number of requests, the request (see job_units())
+       and its row count after every request
+    others
+       see get_data()
+
+    Returns
+    -------
+    dict with the summary: requests of the export, requests finished before (resumed), requests sent by this
+    call (fetched), rows written by this call and in total, bytes received, elapsed seconds and the throughput
+    (rows_per_s, bytes_per_s, requests_per_s)
+    """
+
+    assert (format in SINKS),("The format has to be 'parquet' or 'csv'!")
+    assert (max_workers > 0),("max_workers has to be positive!")
+    os.makedirs(directory, exist_ok=True)
+    parameters = {'url': sos.url, 'sites': sites, 'phenomena': phenomena, 'procedures': procedures, 'begin': begin, 'end': end,
+                  'chunk_size': chunk_size, 'values_per_chunk': values_per_chunk, 'sampling_interval': sampling_interval,
+                  'plan': plan, 'format': format}
+    # Normalized like the stored parameters (e.g. tuples become lists)
+    parameters = json.loads(json.dumps(parameters))
+
+    job, done = read_checkpoint(directory)
+    if job is None:
+        # Planned requests depend on the data available at the start, they are kept for resuming
+        job = {'parameters': parameters, 'units': job_units(sos, sites, phenomena, procedures, begin, end, chunk_size,
+                                                            values_per_chunk, sampling_interval, plan)}
+        _write_json(os.path.join(directory, JOB_FILE), job)
+    elif job['parameters'] != parameters:
+        raise ValueError("%s holds another export, use another directory!" % directory)
+    units = job['units']
+    pending = [index for index in range(len(units)) if index not in done]
+    resumed = len(units) - len(pending)
+    total_rows = sum(entry['rows'] for entry in done.values())
+
+    if scheduler is not None:
+        fetch = lambda index: scheduler.call(lambda unit: unit_frame(sos, unit), units[index])
+    else:
+        fetch = lambda index: unit_frame(sos, units[index])
+
+    totals = sos.add_hook(_Totals())
+    rows = 0
+    start = time.perf_counter()
+    try:
+        with open(os.path.join(directory, DONE_FILE), 'a', encoding='utf-8') as log:
+            for index, df in zip(pending, prefetch_map(fetch, pending, max_workers)):
+                part = None
+                if len(df) > 0:
+                    part = 'part-%06d.%s' % (index, format)
+                    path = os.path.join(directory, part)
+                    # A part file exists completely or not at all
+                    write_frames([df], SINKS[format](path + '.tmp'))
+                    os.replace(path + '.tmp', path)
+                entry = {'index': index, 'part': part, 'rows': len(df)}
+                log.write(json.dumps(entry) + '\n')
+                log.flush()
+                os.fsync(log.fileno())
+                done[index] = entry
+                rows += len(df)
+                if progress is not None:
+                    progress(len(done), len(units), units[index], len(df))
+    finally:
+        sos.remove_hook(totals)
+    elapsed = time.perf_counter() - start
+
+    return {'requests': len(units), 'resumed': resumed, 'fetched': len(pending), 'rows': rows, 'total_rows': total_rows + rows,
+            'bytes': totals.bytes, 'elapsed': elapsed,
+            'rows_per_s': rows / elapsed if elapsed > 0 else None,
+            'bytes_per_s': totals.bytes / elapsed if elapsed > 0 else None,
+            'requests_per_s': totals.requests / elapsed if elapsed > 0 else None}
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Per-request instrumentation of sos_2_0_0, see sos_2_0_0.add_hook()
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from .util import lazy_import
+
+pd = lazy_import('pandas')
+
+# Record of the request processed by the current thread, None if no hook is registered
+_current = threading.local()
+
+RECORD_FIELDS = ['operation', 'method', 'url', 'parameters', 'status', 'cached', 'bytes', 'ttfb', 'download_time',
+                 'parse_time', 'build_time', 'rows', 'total_time', 'started', 'error']
+
+
+class RequestRecord(object):
+    """
+    Measurements of one request: operation, HTTP method, url and KVP parameters, HTTP status, whether it was
+    answered from the response cache, bytes received, time to first byte, download time, parse time (XML or
+    JSON to a tree/objects), frame build time (DataFrame construction), row count of the result and total time.
+    Times are in seconds, started is the wall clock time (seconds since the epoch) the request started.
+    """
+
+    def __init__(self, operation, parameters=None):
+        self.operation = operation
+        self.parameters = dict(parameters) if parameters is not None else {}
+        self.method = None
+        self.url = None
+        self.status = None
+        self.cached = False
+        self.bytes = 0
+        self.ttfb = 0.0
+        self.download_time = 0.0
+        self.parse_time = 0.0
+        self.build_time = 0.0
+        self.rows = None
+        self.total_time = 0.0
+        self.started = time.time()
+        self.error = None
+
+    def to_dict(self):
+        return dict((name, getattr(self, name)) for name in RECORD_FIELDS)
+
+    def __repr__(self):
+        return '<RequestRecord %s %d bytes %.3f s>' % (self.operation, self.bytes, self.total_time)
+
+def current_record():
+    ''' Record of the request processed by the current thread, None if the request is not instrumented '''
+    return getattr(_current, 'record', None)
+
+def add_time(name, start):
+    ''' Add the time since start (time.perf_counter()) to a time field of the current record, if there is one '''
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        setattr(record, name, getattr(record, name) + time.perf_counter() - start)
+
+def add_bytes(count):
+    ''' Add to the bytes received of the current record, if there is one '''
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        record.bytes += count
+
+def set_rows(rows):
+    ''' Set the row count of the current record, if there is one '''
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        record.rows = rows
+
+def set_cached():
+    ''' Mark the current record, if there is one, as answered from the response cache '''
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        record.cached = True
+
+@contextmanager
+def instrument(hooks, operation, parameters=None):
+    """
+    Context of an instrumented request: the record is filled while the request is processed by this thread
+    and handed to the hooks at the end. A request already instrumented by this thread is not recorded twice.
+    """
+
+    if len(hooks) == 0 or current_record() is not None:
+        yield current_record()
+        return
+    record = RequestRecord(operation, parameters)
+    _current.record = record
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = '%s: %s' % (type(e).__name__, e)
+        raise
+    finally:
+        record.total_time = time.perf_counter() - start
+        _current.record = None
+        for hook in hooks:
+            hook(record)
+
+
+class Stats(object):
+    """
+    Hook collecting the records of all requests (sos.add_hook(stats)), thread safe.
+    max_records limits the number of records kept (the oldest are dropped first).
+    """
+
+    def __init__(self, max_records=None):
+        self.max_records = max_records
+        self.records = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.records.append(record)
+            if self.max_records is not None and len(self.records) > self.max_records:
+                del self.records[0]
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    def to_frame(self):
+        """Returns the records as DataFrame, one row per request"""
+        with self._lock:
+            df = pd.DataFrame([record.to_dict() for record in self.records], columns=RECORD_FIELDS)
+        # Requests without DataFrame (e.g. get_observation()) have no row count
+        df['rows'] = df['rows'].astype('Int64')
+        return df
+
+    def summary(self):
+        """Returns the number of requests, cache hits, bytes, rows and the sums of the times per operation as DataFrame"""
+        df = self.to_frame()
+        df['requests'] = 1
+        df['cached'] = df['cached'].astype(int)
+        df['rows'] = df['rows'].fillna(0)
+        return df.groupby('operation')[['requests', 'cached', 'bytes', 'rows', 'ttfb', 'download_time', 'parse_time',
+                                        'build_time', 'total_time']].sum()
+
+
+class SpanAdapter(object):
+    """
+    Hook turning every record into a span of an OpenTelemetry style tracer (tracer.start_span(name, start_time=...,
+    attributes=...) returning a span with add_event(), set_attribute() and end(end_time=...), times in nanoseconds
+    since the epoch), e.g. SpanAdapter(opentelemetry.trace.get_tracer('sos4py')).
+
+    The span is named "sos4py <operation>", the measurements are attributes (sos4py.bytes, sos4py.ttfb, ...) and the
+    ends of the stages (first_byte, downloaded, parsed, built) are events.
+    """
+
+    def __init__(self, tracer, prefix='sos4py'):
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def __call__(self, record):
+        start = int(record.started * 1e9)
+        attributes = {'http.method': record.method or '', 'http.url': record.url or '', 'http.status_code': record.status or 0}
+        for name in ('operation', 'cached', 'bytes', 'ttfb', 'download_time', 'parse_time', 'build_time', 'total_time'):
+            attributes[self.prefix + '.' + name] = getattr(record, name)
+        if record.rows is not None:
+            attributes[self.prefix + '.rows'] = record.rows
+        span = self.tracer.start_span('%s %s' % (self.prefix, record.operation), start_time=start, attributes=attributes)
+
+        offset = 0.0
+        for event, duration in (('first_byte', record.ttfb), ('downloaded', record.download_time),
+                                ('parsed', record.parse_time), ('built', record.build_time)):
+            offset += duration
+            if duration > 0:
+                span.add_event(event, timestamp=start + int(offset * 1e9))
+        if record.error is not None:
+            span.set_attribute('error', True)
+            span.set_attribute('exception.message', record.error)
+        span.end(end_time=start + int(record.total_time * 1e9))
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+JSON binding of the 52°North SOS: requests and decoders producing the same results as the XML parsers
+"""
+
+import json
+from dateutil import parser
+from owslib.util import ServiceException
+from owslib.swe.observation.om import TimePeriod as OMTimePeriod
+from .util import TimePeriod, lazy_import
+from .decoders import AVAILABILITY_COLUMNS, to_datetime_array
+from .spool import SpooledResponse, lead_byte
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+JSON_CONTENT_TYPE = 'application/json'
+
+# KVP parameters holding comma separated lists
+LIST_PARAMETERS = ('procedure', 'offering', 'observedProperty', 'featureOfInterest')
+
+def json_operation_url(operation):
+    ''' URL of the HTTP POST method of an owslib operation that accepts JSON requests, None if there is none '''
+    for method in operation.methods:
+        if method['type'].lower() != 'post':
+            continue
+        for constraint in method.get('constraints', []):
+            if constraint.name == 'Content-Type' and JSON_CONTENT_TYPE in constraint.values:
+                return method['url']
+    return None
+
+def encode_request(request):
+    ''' JSON request (bytes) with the parameters of a KVP request (dict) '''
+    document = {}
+    for name, value in request.items():
+        if name in LIST_PARAMETERS:
+            document[name] = str(value).split(',')
+        elif name == 'spatialFilter':
+            # BBOX with the corners in the axis order of the reference system, as in the KVP request
+            parts = value.split(',')
+            lower_a, lower_b, upper_a, upper_b = [float(c) for c in parts[1:5]]
+            ring = [[lower_a, lower_b], [lower_a, upper_b], [upper_a, upper_b], [upper_a, lower_b], [lower_a, lower_b]]
+            polygon = {'type': 'Polygon', 'coordinates': [ring]}
+            if len(parts) > 5:
+                polygon['crs'] = {'type': 'link', 'properties': {'href': parts[5]}}
+            document[name] = {'bbox': {'ref': parts[0], 'value': polygon}}
+        elif name == 'temporalFilter':
+            reference, period = value.split(',', 1)
+            if '/' in period:
+                document[name] = [{'during': {'ref': reference, 'value': period.split('/')}}]
+            else:
+                document[name] = [{'equals': {'ref': reference, 'value': period}}]
+        else:
+            document[name] = value
+    return json.dumps(document).encode('utf-8')
+
+def decode_response(content):
+    ''' Decoded JSON response (bytes or SpooledResponse), None if content is no JSON document. Raises ServiceException for exception responses. '''
+    if lead_byte(content) not in (b'{', b'['):
+        return None
+    try:
+        if isinstance(content, SpooledResponse):
+            with content.open() as f:
+                document = json.load(f)
+        else:
+            document = json.loads(content)
+    except ValueError:
+        return None
+    text = exception_text(document)
+    if text is not None:
+        raise ServiceException(text)
+    return document
+
+def exception_text(document):
+    ''' Text of the exceptions of a decoded JSON exception response, None if it is no exception response '''
+    if not isinstance(document, dict) or 'exceptions' not in document:
+        return None
+    return '\n'.join('%s: %s' % (e.get('code'), e.get('text', e.get('locator'))) for e in document['exceptions'])
+
+def _reference(value):
+    ''' Identifier of a referenced object (str, {"href": ...}, {"value": ...} or a feature with an identifier) '''
+    if isinstance(value, dict):
+        if 'identifier' in value:
+            return _reference(value['identifier'])
+        return value.get('href', value.get('value'))
+    if isinstance(value, list):
+        return _reference(value[0]) if len(value) > 0 else None
+    return value
+
+def _time(value):
+    ''' datetime of a JSON time (parsed like owslib's extract_time()) '''
+    return parser.parse(value) if value else None
+
+def _phenomenon_time(value):
+    ''' Phenomenon time as datetime or owslib TimePeriod, like the O&M parser of owslib '''
+    if isinstance(value, list):
+        if len(value) == 1:
+            return _time(value[0])
+        return OMTimePeriod(_time(value[0]), _time(value[1]))
+    return _time(value)
+
+def _value(value):
+    ''' Measured value as float if possible '''
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def _result_rows(observation):
+    ''' (phenomenon time, value, unit) tuples of the result of an observation '''
+    result = observation.get('result')
+    if isinstance(result, dict) and 'values' in result and 'fields' in result:
+        # SWE array: one row per block, the time and first value field are used
+        fields = result['fields']
+        names = [f.get('type') for f in fields]
+        time_index = names.index('time') if 'time' in names else None
+        value_index = next((i for i, f in enumerate(fields) if i != time_index), None)
+        unit = fields[value_index].get('uom') if value_index is not None else None
+        for block in result['values']:
+            yield (_time(block[time_index]) if time_index is not None else _phenomenon_time(observation.get('phenomenonTime')),
+                   _value(block[value_index]) if value_index is not None else None, unit)
+        return
+    if isinstance(result, dict):
+        yield _phenomenon_time(observation.get('phenomenonTime')), _value(result.get('value')), result.get('uom')
+    else:
+        yield _phenomenon_time(observation.get('phenomenonTime')), _value(result), None
+
+def decode_observations(document, columns):
+    """
+    Decode a JSON GetObservation response into a DataFrame with the columns of the O&M 2.0 parser
+    (site, procedure, phenomenon, phenomenon_time, result_time, value, unit)
+    """
+
+    rows = []
+    for observation in document.get('observations', []):
+        site = _reference(observation.get('featureOfInterest'))
+        procedure = _reference(observation.get('procedure'))
+        phenomenon = _reference(observation.get('observableProperty', observation.get('observedProperty')))
+        result_time = _time(observation.get('resultTime'))
+        for phenomenon_time, value, unit in _result_rows(observation):
+            rows.append((site, procedure, phenomenon, phenomenon_time, result_time, value, unit))
+    # Built from lists like the XML parser, so that pandas infers the same dtypes. Phenomenon times
+    # can be instants and periods and stay objects.
+    data = dict((name, [row[i] for row in rows]) for i, name in enumerate(columns))
+    data['phenomenon_time'] = pd.Series(data['phenomenon_time'], dtype=object)
+    return pd.DataFrame(data, columns=columns)
+
+
+class JsonFeature(object):
+    ''' Feature of interest of a JSON response, same interface as sos_2_0_0.FeatureOfInterest '''
+
+    def __init__(self, feature):
+        self.id = _reference(feature.get('identifier'))
+        self.name = _reference(feature.get('name'))
+        self.sampledFeature = _reference(feature.get('sampledFeature'))
+        geometry = feature.get('geometry')
+        if geometry is not None and geometry.get('type') == 'Point':
+            # Coordinates are in the axis order of the reference system, like gml:pos
+            self.geometry = (float(geometry['coordinates'][0]), float(geometry['coordinates'][1]))
+            crs = geometry.get('crs', {}).get('properties', {})
+            self.srs = crs.get('href', crs.get('name'))
+        else:
+            self.geometry = None
+            self.srs = None
+
+    def get_geometry(self):
+        return self.geometry
+
+    def get_srs(self):
+        return self.srs
+
+def decode_features(document):
+    ''' Features of interest (JsonFeature) of a JSON GetFeatureOfInterest response '''
+    features = document.get('featureOfInterest', [])
+    if isinstance(features, dict):
+        features = [features]
+    return [JsonFeature(feature) for feature in features]
+
+def feature_columns(features):
+    ''' Columns of the point features (JsonFeature), see decoders.decode_features() '''
+    points = [f for f in features if f.get_geometry() is not None]
+    return {'id': [f.id for f in points], 'name': [f.name for f in points], 'srs': [f.get_srs() for f in points],
+            'coordinates': np.array([f.get_geometry() for f in points], dtype=np.float64).reshape(-1, 2)}
+
+def decode_data_availability(document, as_frame=False):
+    """
+    Decode a JSON GetDataAvailability response into a list of members (see util.gda_member())
+    or a DataFrame (see decoders.decode_data_availability())
+    """
+
+    rows = []
+    for member in document.get('dataAvailability', []):
+        phenomenon_time = member.get('phenomenonTime')
+        if isinstance(phenomenon_time, list) and len(phenomenon_time) > 1:
+            begin, end = phenomenon_time[0], phenomenon_time[1]
+        else:
+            begin = end = phenomenon_time[0] if isinstance(phenomenon_time, list) else phenomenon_time
+        rows.append((_reference(member.get('procedure')), _reference(member.get('observedProperty')),
+                     _reference(member.get('featureOfInterest')), begin, end, member.get('resultTime'),
+                     isinstance(phenomenon_time, list) and len(phenomenon_time) > 1))
+
+    if as_frame:
+        columns = dict((name, [row[i] for row in rows]) for i, name in enumerate(AVAILABILITY_COLUMNS))
+        for name in ('StartTime', 'EndTime', 'ResultTime'):
+            columns[name] = pd.DatetimeIndex(to_datetime_array(columns[name])).tz_localize('UTC')
+        return pd.DataFrame(columns, columns=AVAILABILITY_COLUMNS)
+
+    members = []
+    for procedure, observed_property, feature, begin, end, result_time, period in rows:
+        start, end = _time(begin), _time(end)
+        members.append(pd.Series([procedure, observed_property, feature, TimePeriod(start, end) if period else start, start, end, _time(result_time)],
+                                 index=['Procedure', 'ObservedProperty', 'FeatureOfInterest', 'PhenomenonTime', 'StartTime', 'EndTime', 'ResultTime'],
+                                 name="gda_member"))
+    return members
@@ -12,21 +12,28 @@
 # Import functions from other libraries
 from owslib.util import clean_ows_url
 from .sos_2_0_0 import sos_2_0_0
+from .capabilities import CapabilitiesCache
 
 def connection_sos(url,
              xml=None,
              username=None,
-             password=None,):
+             password=None,
+             cache_dir=None,
+             cache_ttl=3600,):
     """
     SOS GetDataAvailability function
     :param url: url of capabilities document
     :param xml: elementtree object
     :param username: username allowed to handle with SOS
     :param password: password for the username
+    :param cache_dir: directory of the capabilities cache, no cache is used if None
+    :param cache_ttl: seconds after which cached capabilities are revalidated with the server
     :return: a sos_2_0_0 object
     """
     clean_url = clean_ows_url(url) # Clean an OWS URL of basic service elements
     version = "2.0.0"
+    if cache_dir is not None and xml is None:
+        return CapabilitiesCache(cache_dir, ttl=cache_ttl).get(clean_url, username, password)
     return sos_2_0_0.__new__(sos_2_0_0, clean_url, version, xml, username, password)
 
 
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Parsing of GetObservation responses in worker processes, see sos_2_0_0.set_parse_processes()
+
+The workers return compact columns (numpy arrays, identifiers as categories and int32 codes) instead of
+pickled owslib objects or DataFrames, the DataFrame is built from them in the calling process.
+"""
+
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from owslib.etree import etree
+from owslib.swe.observation.sos200 import SOSGetObservationResponse
+from owslib.swe.observation.om import TimePeriod as OMTimePeriod
+from .util import get_namespaces, lazy_import
+from .decoders import IDENTIFIER_COLUMNS, OM_COLUMNS, WATERML_COLUMNS, decode_waterml_columns, is_waterml, empty_frame, \
+    _factorize, _typed_values
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+namespaces = get_namespaces()
+
+# Kinds of O&M phenomenon times
+NO_TIME, INSTANT, PERIOD = 0, 1, 2
+
+def create_pool(processes):
+    ''' Pool of worker processes for parse_columns(), started with spawn as the calling process runs download threads '''
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+def _datetime64(times):
+    ''' datetime64[ns] array (UTC, NaT for None) of datetimes '''
+    return np.array([t.astimezone(datetime.timezone.utc).replace(tzinfo=None) if t is not None and t.tzinfo is not None else t
+                     for t in times], dtype='datetime64[ns]')
+
+def _datetimes(times):
+    ''' datetime objects (UTC, None for NaT) of a datetime64[ns] array '''
+    return [None if t is pd.NaT else t for t in pd.DatetimeIndex(times).tz_localize('UTC').to_pydatetime()]
+
+def parse_columns(source):
+    """
+    Parse a GetObservation response (bytes, or the path of a file holding it) into columns, run in the workers
+
+    Returns
+    -------
+    dict with 'format' ('om' or 'waterml'), 'rows' and the columns: WaterML 2.0 metadata per series with the
+    series lengths and the time_stamp and value arrays of decode_waterml_columns(); O&M 2.0 identifiers as
+    (categories, codes), result_time as datetime64[ns] array, value as float64 array and the phenomenon times
+    as kind (none, instant or period), begin and end arrays
+    """
+
+    xml_tree = etree.parse(source).getroot() if isinstance(source, str) else etree.fromstring(source)
+    if is_waterml(xml_tree):
+        columns = decode_waterml_columns(xml_tree)
+        columns.update({'format': 'waterml', 'rows': len(columns['value'])})
+        return columns
+
+    observations = SOSGetObservationResponse(xml_tree).observations
+    if len(observations) == 0:
+        # Without observations the format can only be told from the namespaces declared by the response
+        return {'format': 'waterml' if namespaces['wml2'] in xml_tree.nsmap.values() else 'om', 'rows': 0}
+
+    columns = {'format': 'om', 'rows': len(observations)}
+    results = [observation.get_result() for observation in observations]
+    for name, values in (('site', [o.featureOfInterest for o in observations]), ('procedure', [o.procedure for o in observations]),
+                         ('phenomenon', [o.observedProperty for o in observations]), ('unit', [r.uom for r in results])):
+        columns[name] = _factorize(values)
+    columns['result_time'] = _datetime64([o.resultTime for o in observations])
+    columns['value'] = np.array([r.value if r.value is not None else np.nan for r in results], dtype=np.float64)
+
+    times = [o.phenomenonTime for o in observations]
+    columns['phenomenon_kind'] = np.array([PERIOD if isinstance(t, OMTimePeriod) else NO_TIME if t is None else INSTANT
+                                           for t in times], dtype=np.int8)
+    columns['phenomenon_begin'] = _datetime64([t.start if isinstance(t, OMTimePeriod) else t for t in times])
+    columns['phenomenon_end'] = _datetime64([t.end if isinstance(t, OMTimePeriod) else None for t in times])
+    return columns
+
+def frame_from_columns(columns, typed=False):
+    ''' Observation DataFrame (like sos_2_0_0._parse_observations()) of the columns of parse_columns() '''
+    if columns['format'] == 'waterml':
+        if columns['rows'] == 0 and 'lengths' not in columns:
+            return empty_frame(WATERML_COLUMNS, typed)
+        lengths = columns['lengths']
+        data = {}
+        for name in IDENTIFIER_COLUMNS:
+            if typed:
+                categories, codes = _factorize(columns[name])
+                data[name] = pd.Categorical.from_codes(np.repeat(codes, lengths), categories=categories)
+            else:
+                data[name] = np.repeat(np.array(columns[name], dtype=object), lengths)
+        data['time_stamp'] = pd.DatetimeIndex(columns['time_stamp']).tz_localize('UTC')
+        data['value'] = columns['value']
+        df = pd.DataFrame(data, columns=WATERML_COLUMNS)
+    else:
+        if columns['rows'] == 0:
+            return empty_frame(OM_COLUMNS, typed)
+        data = {}
+        for name in IDENTIFIER_COLUMNS:
+            categories, codes = columns[name]
+            if typed:
+                data[name] = pd.Categorical.from_codes(codes, categories=categories)
+            else:
+                # Code -1 (missing) picks the None at the end
+                data[name] = np.array(list(categories) + [None], dtype=object)[codes]
+        kind = columns['phenomenon_kind']
+        begins = _datetimes(columns['phenomenon_begin'])
+        ends = _datetimes(columns['phenomenon_end'])
+        data['phenomenon_time'] = [OMTimePeriod(b, e) if k == PERIOD else b if k == INSTANT else None
+                                   for k, b, e in zip(kind, begins, ends)]
+        if typed:
+            data['result_time'] = pd.DatetimeIndex(columns['result_time']).tz_localize('UTC')
+        else:
+            data['result_time'] = _datetimes(columns['result_time'])
+        data['value'] = columns['value']
+        df = pd.DataFrame(data, columns=OM_COLUMNS)
+        if typed and (kind != PERIOD).all():
+            # Like to_typed(): instants (or missing times) become a time column
+            df['phenomenon_time'] = pd.to_datetime(df['phenomenon_time'], utc=True).astype('datetime64[ns, UTC]')
+
+    if typed:
+        df['value'] = _typed_values(df['value'])
+    return df
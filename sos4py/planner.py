@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Planning of GetObservation requests from the results of GetDataAvailability
+"""
+
+from collections import namedtuple, OrderedDict
+from .util import to_timestamp, time_windows, lazy_import
+
+pd = lazy_import('pandas')
+
+# One planned GetObservation request: the sites, phenomena and procedures to request for the period
+# begin/end, observations at or after keep_before belong to the next window (None: keep all)
+PlannedRequest = namedtuple('PlannedRequest', ['sites', 'phenomena', 'procedures', 'begin', 'end', 'keep_before', 'values'])
+
+def availability_extents(members):
+    ''' DataFrame with site, phenomenon, procedure, begin and end (UTC) of GetDataAvailability members
+    (list of members or DataFrame, see get_data_availability())
+    '''
+    if isinstance(members, pd.DataFrame):
+        extents = members.rename(columns={'FeatureOfInterest': 'site', 'ObservedProperty': 'phenomenon', 'Procedure': 'procedure',
+                                          'StartTime': 'begin', 'EndTime': 'end'})
+        extents = extents[['site', 'phenomenon', 'procedure', 'begin', 'end']]
+        return extents[extents['begin'].notna() & extents['end'].notna()].reset_index(drop=True)
+    rows = []
+    for member in members:
+        if member['StartTime'] is None or member['EndTime'] is None:
+            continue
+        rows.append((member['FeatureOfInterest'], member['ObservedProperty'], member['Procedure'],
+                     to_timestamp(member['StartTime']), to_timestamp(member['EndTime'])))
+    return pd.DataFrame(rows, columns=['site', 'phenomenon', 'procedure', 'begin', 'end'])
+
+def _pack(items, capacity):
+    ''' Group (name, values) items into bins of at most capacity values (first fit decreasing) '''
+    bins = []
+    for name, values in sorted(items, key=lambda item: -item[1]):
+        for b in bins:
+            if b[1] + values <= capacity:
+                b[0].append(name)
+                b[1] += values
+                break
+        else:
+            bins.append([[name], values])
+    return bins
+
+def plan_requests(extents, begin=None, end=None, window=None, values_per_request=None, sampling_interval=None):
+    """
+    Plan the GetObservation requests for the data described by availability extents (see availability_extents()).
+
+    Combinations of site, phenomenon and procedure without data between begin and end are left out and the
+    period of every request is clipped to the data available. The period is split into windows (window, or
+    sized to hold values_per_request values of one series if sampling_interval is given). Within a window the
+    sites observing the same phenomenon with the same procedure are requested together, in groups of at most
+    about values_per_request values, so that the responses have similar sizes.
+
+    Returns
+    -------
+    list of PlannedRequest
+    """
+
+    if values_per_request is not None:
+        assert (sampling_interval is not None),("values_per_request requires sampling_interval!")
+        interval = pd.Timedelta(sampling_interval)
+        if window is None:
+            window = interval * values_per_request
+    if len(extents) == 0:
+        return []
+
+    begin = to_timestamp(begin) if begin is not None else extents['begin'].min()
+    end = to_timestamp(end) if end is not None else extents['end'].max()
+    # Only the combinations with data in the requested period, clipped to it
+    extents = extents[(extents['end'] >= begin) & (extents['begin'] <= end)].copy()
+    extents['begin'] = extents['begin'].clip(lower=begin)
+    extents['end'] = extents['end'].clip(upper=end)
+
+    windows = time_windows(begin, end, window) if window is not None else [(begin, end)]
+
+    plan = []
+    for window_begin, window_end in windows:
+        last = window_end >= windows[-1][1]
+        # Observations on the end of a window belong to the next window
+        starts_in_time = (extents['begin'] <= window_end) if last else (extents['begin'] < window_end)
+        in_window = extents[(extents['end'] >= window_begin) & starts_in_time]
+        groups = OrderedDict()
+        for row in in_window.itertuples(index=False):
+            row_begin = max(row.begin, window_begin)
+            row_end = min(row.end, window_end)
+            values = (row_end - row_begin) / interval + 1 if values_per_request is not None else 0
+            groups.setdefault((row.phenomenon, row.procedure), []).append((row.site, row_begin, row_end, values))
+
+        for (phenomenon, procedure), rows in groups.items():
+            if values_per_request is not None:
+                bins = _pack([(site, values) for site, _, _, values in rows], values_per_request)
+            else:
+                bins = [[[site for site, _, _, _ in rows], None]]
+            periods = dict((site, (row_begin, row_end)) for site, row_begin, row_end, _ in rows)
+            for sites, values in bins:
+                plan.append(PlannedRequest(sorted(set(sites)), [phenomenon], [procedure],
+                                           min(periods[s][0] for s in sites), max(periods[s][1] for s in sites),
+                                           None if last else window_end, values))
+    return plan
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Adaptive concurrency for bulk downloads, see sos_2_0_0.set_scheduler()
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import requests
+
+# HTTP status codes of overloaded or temporarily unavailable servers, requests answered with them are retried
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def retry_after(error):
+    ''' Seconds to wait given by the Retry-After header (seconds or HTTP date) of a failed response, None if there is none '''
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    ''' Whether a request failed for a temporary reason: connection errors, timeouts and the HTTP status codes of RETRY_STATUSES '''
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class AdaptiveScheduler(object):
+    """
+    Runs the requests of bulk operations (get_data(), get_data_batch(), get_result(), get_sites()) with a
+    concurrency limit adjusted to the server (AIMD: additive increase, multiplicative decrease).
+
+    Every completed round of requests raises the limit by one, up to max_workers. A request failing with a
+    temporary error (connection error, timeout, HTTP 429/5xx) or taking longer than the target latency
+    multiplies the limit by decrease, down to min_workers; a limit is cut once per round only. The target
+    latency is target_latency if given, else latency_factor times the lowest latency seen so far (None
+    switches the latency signal off).
+
+    Failed requests are retried up to retries times after a jittered exponential backoff (a random time
+    up to backoff * 2**attempt seconds, at most max_backoff). A Retry-After header pauses all requests for
+    the given time instead.
+    """
+
+    def __init__(self, max_workers=16, min_workers=1, initial_workers=2, target_latency=None, latency_factor=4.0,
+                 decrease=0.5, retries=3, backoff=0.5, max_backoff=60.0):
+        assert (1 <= min_workers <= initial_workers <= max_workers),("The workers have to satisfy 1 <= min_workers <= initial_workers <= max_workers!")
+        assert (0 < decrease < 1),("decrease has to be between 0 and 1!")
+        assert (retries >= 0),("retries must not be negative!")
+        self.max_workers = max_workers
+        self.min_workers = min_workers
+        self.initial_workers = initial_workers
+        self.target_latency = target_latency
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._condition = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        """Starts again from initial_workers and clears the counters of report()"""
+        with self._condition:
+            self.limit = float(self.initial_workers)
+            self._active = 0
+            self._paused_until = 0.0
+            self._last_decrease = 0.0
+            self._lowest_latency = None
+            self._requests = 0
+            self._retries = 0
+            self._failures = 0
+            self._decreases = 0
+            self._values = 0
+            self._latency = 0.0
+            self._elapsed = 0.0
+            self._max_active = 0
+
+    @property
+    def concurrency(self):
+        ''' Number of requests currently allowed at the same time '''
+        return int(self.limit)
+
+    def map(self, function, items):
+        """
+        Call function for every item on a pool of threads, at most concurrency of them at the same time.
+
+        Returns
+        -------
+        list of the results in the order of items, the exception of a request failing after all retries is raised
+        """
+
+        items = list(items)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(lambda item: self.call(function, item), items))
+        finally:
+            with self._condition:
+                self._elapsed += time.perf_counter() - start
+
+    def report(self):
+        """Throughput achieved so far: requests, retries, failures, values (length of the results), elapsed seconds
+        of map(), requests and values per second, mean latency of the successful requests, the current and the
+        highest concurrency and the number of decreases"""
+        with self._condition:
+            elapsed = self._elapsed
+            return {'requests': self._requests, 'retries': self._retries, 'failures': self._failures,
+                    'values': self._values, 'elapsed': elapsed,
+                    'requests_per_s': self._requests / elapsed if elapsed > 0 else None,
+                    'values_per_s': self._values / elapsed if elapsed > 0 else None,
+                    'mean_latency': self._latency / self._requests if self._requests > 0 else None,
+                    'concurrency': self.concurrency, 'max_concurrency': self._max_active, 'decreases': self._decreases}
+
+    def call(self, function, item):
+        """Call function for one item within the concurrency limit, with retries, for callers running their own
+        threads (e.g. sos4py.export). Failing after all retries raises the exception of the last attempt."""
+        attempt = 0
+        while True:
+            self._acquire()
+            start = time.perf_counter()
+            try:
+                result = function(item)
+            except Exception as e:
+                self._release()
+                if not is_retryable(e) or attempt >= self.retries:
+                    with self._condition:
+                        self._failures += 1
+                    raise
+                wait = retry_after(e)
+                self._congested(start, wait)
+                if wait is None:
+                    time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+                attempt += 1
+                continue
+            self._release()
+            self._completed(start, time.perf_counter() - start, result)
+            return result
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.perf_counter()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self._active >= self.concurrency:
+                    self._condition.wait()
+                else:
+                    break
+            self._active += 1
+            self._max_active = max(self._max_active, self._active)
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def _completed(self, start, latency, result):
+        ''' Count a successful request and raise the limit, or lower it if the request was too slow '''
+        with self._condition:
+            self._requests += 1
+            self._latency += latency
+            if hasattr(result, '__len__'):
+                self._values += len(result)
+            target = self.target_latency
+            if target is None and self.latency_factor is not None and self._lowest_latency is not None:
+                target = self.latency_factor * self._lowest_latency
+            self._lowest_latency = latency if self._lowest_latency is None else min(self._lowest_latency, latency)
+            if target is not None and latency > target:
+                self._decrease(start)
+            else:
+                # One more request per round of limit requests
+                self.limit = min(float(self.max_workers), self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+
+    def _congested(self, start, wait):
+        ''' Lower the limit after a temporary error, pause all requests for the Retry-After time '''
+        with self._condition:
+            self._retries += 1
+            self._decrease(start)
+            if wait is not None:
+                self._paused_until = max(self._paused_until, time.perf_counter() + wait)
+
+    def _decrease(self, start):
+        # Requests started before the last cut saw the old limit, they do not cut it again
+        if start > self._last_decrease:
+            self.limit = max(float(self.min_workers), self.limit * self.decrease)
+            self._last_decrease = time.perf_counter()
+            self._decreases += 1
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+CSV and Parquet sinks for the DataFrames of get_data_iter()
+"""
+
+import pandas as pd
+from .store import FORMATS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+def write_frames(frames, sink):
+    """
+    Write a sequence of DataFrames (e.g. from get_data_iter()) to a sink and close it.
+    Only one DataFrame is held in memory at a time.
+
+    Returns
+    -------
+    number of rows written
+    """
+
+    with sink:
+        for df in frames:
+            sink.write(df)
+    return sink.rows
+
+
+class Sink(object):
+    """
+    Base class of the sinks: write() DataFrames, close() when done. Use as context manager.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.frames = 0
+
+    def write(self, df):
+        """Appends the rows of a DataFrame"""
+        if len(df) == 0:
+            return
+        self._write(df)
+        self.rows += len(df)
+        self.frames += 1
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CsvSink(Sink):
+    """
+    Writes the DataFrames to one CSV file with a header line, **kwargs are passed on to DataFrame.to_csv()
+    (e.g. sep=';'). Times are written in ISO 8601, phenomenon times (instants or periods) as text.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path)
+        self.kwargs = kwargs
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+
+    def _write(self, df):
+        df.to_csv(self._file, header=self.frames == 0, index=False, **self.kwargs)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Writes the DataFrames to one Parquet file, one row group per DataFrame. The schema is fixed by the first
+    DataFrame's response format: UTC timestamps for the time column, float64 values and text for the other
+    columns, so DataFrames of different requests (typed or not) fit together. Without rows no file is written.
+
+    Requires pyarrow (pip install sos4py[store]).
+    """
+
+    def __init__(self, path, compression='snappy'):
+        if pa is None:
+            raise ImportError("ParquetSink requires pyarrow, install it with 'pip install sos4py[store]'")
+        super().__init__(path)
+        self.compression = compression
+        self._writer = None
+
+    def _write(self, df):
+        columns, time_column = FORMATS['waterml' if 'time_stamp' in df.columns else 'om']
+        data = {}
+        for column in columns:
+            values = df[column]
+            if column in (time_column, 'result_time'):
+                data[column] = pd.to_datetime(values, utc=True).astype('datetime64[ns, UTC]')
+            elif column == 'value':
+                data[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+            else:
+                data[column] = values.astype(object).map(lambda v: None if v is None or v is pd.NA or v != v else str(v))
+        if self._writer is None:
+            schema = pa.schema([(column, pa.timestamp('ns', tz='UTC') if column in (time_column, 'result_time') else
+                                 pa.float64() if column == 'value' else pa.string()) for column in columns])
+            self._writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+        self._writer.write_table(pa.Table.from_pandas(pd.DataFrame(data), schema=self._writer.schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Spatial helpers of get_sites(): reference systems, spatial filters and the site index
+"""
+
+from functools import lru_cache
+from .util import lazy_import
+
+np = lazy_import('numpy')
+pyproj = lazy_import('pyproj')
+shapely = lazy_import('shapely')
+
+@lru_cache(maxsize=64)
+def crs_from_srs(srs):
+    ''' pyproj CRS of an srsName as URL (.../EPSG/0/4326), URN or code (EPSG:4326), created once per srsName '''
+    return pyproj.CRS.from_user_input(int(srs.replace(":", "/").split("/")[-1]))
+
+@lru_cache(maxsize=64)
+def _crs(crs):
+    ''' pyproj CRS of a user input (e.g. 'EPSG:4326' or 4326), created once per input '''
+    return pyproj.CRS.from_user_input(crs)
+
+def northing_first(crs):
+    ''' Whether the first axis of a reference system points north or south (e.g. latitude/longitude of EPSG:4326) '''
+    axes = _crs(crs).axis_info
+    return len(axes) > 0 and axes[0].direction.lower() in ('north', 'south')
+
+def spatial_filter(bounds, crs='EPSG:4326', value_reference='om:featureOfInterest/*/sams:shape'):
+    ''' KVP spatialFilter (BBOX) for the bounds (minx, miny, maxx, maxy) in x/y order, e.g. longitude/latitude.
+    The corners are written in the axis order of the reference system as required by SOS 2.0.
+    '''
+    minx, miny, maxx, maxy = [float(b) for b in bounds]
+    assert (minx <= maxx and miny <= maxy),("The bounding box has to be given as (minx, miny, maxx, maxy)!")
+    corners = (miny, minx, maxy, maxx) if northing_first(crs) else (minx, miny, maxx, maxy)
+    epsg = _crs(crs).to_epsg()
+    assert (epsg is not None),("The bounding box needs a reference system with an EPSG code!")
+    return ','.join([value_reference] + [repr(c) for c in corners] + ['http://www.opengis.net/def/crs/EPSG/0/%d' % epsg])
+
+def _geometries(geometries):
+    ''' Array of shapely geometries from a geometry, an (x, y) tuple, a GeoSeries or a sequence of geometries '''
+    if isinstance(geometries, tuple) and len(geometries) == 2 and all(isinstance(c, (int, float)) for c in geometries):
+        return np.array([shapely.Point(geometries)], dtype=object)
+    if isinstance(geometries, shapely.Geometry):
+        return np.array([geometries], dtype=object)
+    return np.asarray(getattr(geometries, 'values', geometries), dtype=object)
+
+
+class SiteIndex(object):
+    """
+    Spatial index of sites (a GeoDataFrame from get_sites()) for repeated nearest site and distance queries.
+
+    The sites are kept in a shapely STRtree, so a query costs about log(number of sites) instead of a
+    comparison with every site. Distances are in the units of the reference system of the sites, project
+    the sites first (e.g. sites.to_crs(3035)) for distances in metres.
+    """
+
+    def __init__(self, sites):
+        self.sites = sites.reset_index(drop=True)
+        self._geometries = np.asarray(self.sites.geometry.values, dtype=object)
+        self.tree = shapely.STRtree(self._geometries)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def nearest(self, geometries, max_distance=None):
+        """Returns the nearest site of each geometry
+
+        Parameters
+        ----------
+        geometries : shapely geometry, (x, y) tuple or sequence of geometries
+           query locations, in the reference system of the sites
+        max_distance : float, optional
+           only sites within this distance are returned
+
+        Returns
+        -------
+        GeoDataFrame of the nearest sites with a distance column, indexed by the position of the query geometry
+        (queries without a site within max_distance are left out)
+        """
+
+        (query, site), distance = self.tree.query_nearest(_geometries(geometries), max_distance=max_distance,
+                                                          return_distance=True, all_matches=False)
+        result = self.sites.iloc[site].copy()
+        result['distance'] = distance
+        result.index = query
+        return result
+
+    def within_distance(self, geometry, distance):
+        """Returns the sites within distance of a geometry (shapely geometry or (x, y) tuple), nearest first
+
+        Returns
+        -------
+        GeoDataFrame of the sites with a distance column
+        """
+
+        geometry = _geometries(geometry)[0]
+        index = self.tree.query(geometry, predicate='dwithin', distance=distance)
+        distances = shapely.distance(self._geometries[index], geometry)
+        order = np.argsort(distances, kind='stable')
+        result = self.sites.iloc[index[order]].copy()
+        result['distance'] = distances[order]
+        return result
@@ -9,34 +9,596 @@
 
 #Class function
 # Import functions from other libraries
-from owslib.util import testXMLValue, testXMLAttribute, nspath_eval, openURL
+from owslib.util import testXMLValue, testXMLAttribute, nspath_eval, ServiceException
 from owslib.swe.observation.sos200 import SensorObservationService_2_0_0
-from owslib.swe.observation.sos200 import SOSGetObservationResponse
-from owslib.swe.observation.waterml2 import MeasurementTimeseriesObservation
+from owslib.swe.observation.sos200 import SOSGetObservationResponse, ObservationDecoder
+from owslib.swe.observation.waterml2 import MeasurementTimeseriesObservation, TimeValuePair
 from owslib.swe.observation.om import MeasurementObservation
 from owslib.etree import etree
 from owslib import ows
-from urllib.parse import urlencode
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point
-import pyproj
 import inspect
-from .util import get_namespaces, nspv, TimePeriod, parseGDAReferencedElement, gda_member, check_list_param
+import threading
+import time
+import requests
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from copy import deepcopy
+from itertools import islice, product
+from concurrent.futures import ThreadPoolExecutor
+from .util import lazy_import, get_namespaces, nspv, TimePeriod, parseGDAReferencedElement, gda_member, check_list_param, \
+    event_time, time_windows, window_from_density, create_session, to_timestamp, format_time
+from .decoders import decode_waterml, decode_data_availability, decode_result_template, decode_result_values, \
+    is_waterml, to_typed, empty_frame, decode_features as decode_feature_columns, decode_feature_names, OM_COLUMNS, WATERML_COLUMNS
+from .cache import make_key
+from .planner import availability_extents, plan_requests
+from .batch import normalize_target, pack_targets, observation_request_xml
+from .sync import time_column
+from .json_binding import JSON_CONTENT_TYPE, json_operation_url, encode_request, decode_response, exception_text, \
+    decode_observations, decode_features, feature_columns, decode_data_availability as decode_json_availability
+from .sites import crs_from_srs, spatial_filter, SiteIndex
+from .instrumentation import instrument, current_record, add_time, add_bytes, set_rows, set_cached
+from .spool import SpooledResponse, read_body, xml_root, xml_source
+from .parsing import create_pool, parse_columns, frame_from_columns
+
+# Imported when they are used first, get_observation() and friends do not need them
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+gpd = lazy_import('geopandas')
+shapely = lazy_import('shapely')
 
 namespaces = get_namespaces()
 
+# HTTP status codes of responses raising ServiceException (with the body as text) and HTTPError, respectively
+SERVICE_EXCEPTION_STATUSES = [400, 401, 403]
+HTTP_ERROR_STATUSES = [404, 429, 500, 502, 503, 504]
+
+def check_http_response(response, stream=False):
+    ''' Check a response like owslib's openURL does, raises ServiceException or HTTPError '''
+    if response.status_code in SERVICE_EXCEPTION_STATUSES:
+        text = None
+        if JSON_CONTENT_TYPE in response.headers.get('Content-Type', ''):
+            # Exceptions of the JSON binding
+            try:
+                text = exception_text(response.json())
+            except ValueError:
+                pass
+        raise ServiceException(text or response.text)
+    if response.status_code in HTTP_ERROR_STATUSES:
+        response.raise_for_status()
+
+    # Check for service exceptions without the http header set, streamed bodies are checked while they are parsed
+    if not stream:
+        check_service_exception(response.headers.get('Content-Type'), response.content)
+
+def check_service_exception(content_type, content):
+    ''' Raise ServiceException if an XML response body (bytes or SpooledResponse) contains a service exception '''
+    if content_type in ['text/xml', 'application/xml', 'application/vnd.ogc.se_xml']:
+        try:
+            if isinstance(content, SpooledResponse):
+                # Only the (small) exception reports are parsed completely
+                _, root = next(etree.iterparse(content.path, events=('start',)))
+                if not root.tag.endswith('ExceptionReport'):
+                    return
+            se_tree = xml_root(content)
+        except (etree.XMLSyntaxError, StopIteration):
+            return
+        for possible_error in ['{http://www.opengis.net/ows}Exception', '{http://www.opengis.net/ows/1.1}Exception',
+                               '{http://www.opengis.net/ogc}ServiceException', 'ServiceException']:
+            service_exception = se_tree.find(possible_error)
+            if service_exception is not None:
+                raise ServiceException('\n'.join([t.strip() for t in service_exception.itertext() if t.strip()]))
+
+def check_exception_report(response):
+    ''' Raise ows.ExceptionReport if a response (bytes or SpooledResponse) is an exception report, only the root element is parsed for that '''
+    try:
+        _, root = next(etree.iterparse(xml_source(response), events=('start',)))
+    except (etree.XMLSyntaxError, StopIteration):
+        return
+    if root.tag == nspath_eval("ows:ExceptionReport", namespaces):
+        raise ows.ExceptionReport(xml_root(response))
+
+def iter_observation_elements(source, points_per_chunk=10000):
+    ''' Incrementally parse the om:OM_Observation elements of a GetObservation response (file-like object or path).
+    Every element is decoded by owslib and then removed from the tree. WaterML 2.0 time series are handed out
+    in parts of at most points_per_chunk points, each part is an observation with the metadata of its series.
+    '''
+    decoder = ObservationDecoder()
+    observation_tag = nspath_eval("om20:OM_Observation", namespaces)
+    point_tag = nspath_eval("wml2:point", namespaces)
+    exception_tag = nspath_eval("ows:ExceptionReport", namespaces)
+
+    def timeseries_part(header, points):
+        observation = decoder.decode_observation(header)
+        observation.get_result().points = points
+        return observation
+
+    context = etree.iterparse(source, events=('start', 'end'))
+    root = None
+    # Copy of the current time series observation without points and the points not handed out yet
+    header = None
+    points = []
+    for event, element in context:
+        if root is None:
+            root = element
+            if root.tag == exception_tag:
+                # Read the complete (small) exception report
+                for _ in context:
+                    pass
+                raise ows.ExceptionReport(root)
+        if event != 'end':
+            continue
+        if element.tag == point_tag:
+            if header is None:
+                # point -> wml2:MeasurementTimeseries -> om:result -> om:OM_Observation. The parser may already
+                # have added further points to the tree, they are removed from the copy
+                header = deepcopy(element.getparent().getparent().getparent())
+                for timeseries in header.findall(nspath_eval("om20:result/wml2:MeasurementTimeseries", namespaces)):
+                    for point in timeseries.findall(point_tag):
+                        timeseries.remove(point)
+            points.append(TimeValuePair(element))
+            # Free the point and the points before it
+            element.clear()
+            while element.getprevious() is not None and element.getprevious().tag == point_tag:
+                del element.getparent()[element.getparent().index(element) - 1]
+            if len(points) >= points_per_chunk:
+                yield timeseries_part(header, points)
+                points = []
+        elif element.tag == observation_tag:
+            if header is None:
+                yield decoder.decode_observation(element)
+            elif len(points) > 0:
+                yield timeseries_part(header, points)
+            header = None
+            points = []
+            # Free the observation and all already processed observations (and their sos:observationData)
+            element.clear()
+            for node in (element, element.getparent()):
+                if node is not None and node is not root:
+                    while node.getprevious() is not None:
+                        del node.getparent()[0]
+
+# Per thread flag telling that a parsed result is being computed for the response cache
+_caching = threading.local()
+
+def _unpickle_sos(cls, state):
+    ''' Restore a pickled sos_2_0_0 object without requesting its capabilities '''
+    obj = object.__new__(cls)
+    obj.__setstate__(state)
+    return obj
+
+def _time_column(df):
+    ''' Times of the observations in a DataFrame as UTC timestamps '''
+    column = 'time_stamp' if 'time_stamp' in df.columns else 'result_time'
+    return pd.to_datetime(df[column], utc=True)
+
+def data_windows(begin, end, chunk_size=None, values_per_chunk=None, sampling_interval=None):
+    ''' Check the time arguments of get_data() and return its time windows, None if the period is not split '''
+    assert ((begin is not None) and (end is not None) or (begin is None) and (end is None)),("If begin/end is provided, end/begin has to be provided as well!")
+
+    if values_per_chunk is not None:
+        assert (chunk_size is None),("Either chunk_size or values_per_chunk can be provided, not both!")
+        assert (sampling_interval is not None),("values_per_chunk requires sampling_interval!")
+        chunk_size = window_from_density(values_per_chunk, sampling_interval)
+
+    if chunk_size is None:
+        return None
+    assert (begin is not None),("Chunked requests require begin and end!")
+    return time_windows(begin, end, chunk_size)
+
+def clip_window(df, window, windows):
+    ''' Drop the observations of a window's DataFrame that lie on the boundary it shares with the next window '''
+    # Temporal filters include both ends of a window, so observations exactly on a shared
+    # boundary are only kept in the later window
+    if window[1] < windows[-1][1] and len(df) > 0:
+        df = df[_time_column(df) < window[1]]
+    return df
+
+def combine_frames(frames, typed=False):
+    ''' Concatenate the observation DataFrames of several requests '''
+    non_empty = [df for df in frames if len(df) > 0]
+    if len(non_empty) == 0:
+        # Keeps the columns of the response format and the dtypes of typed results
+        return frames[0]
+    df = pd.concat(non_empty, ignore_index=True)
+    # Categories of the frames may differ, which makes concat fall back to object columns
+    return to_typed(df) if typed else df
+
+def rechunk_frames(frames, rows, typed=False):
+    ''' Regroup observation DataFrames into DataFrames of rows rows each (the last one may be smaller), empty frames are dropped '''
+    buffered = []
+    count = 0
+    for df in frames:
+        start = 0
+        while start < len(df):
+            part = df.iloc[start:start + rows - count]
+            buffered.append(part)
+            count += len(part)
+            start += len(part)
+            if count == rows:
+                yield combine_frames(buffered, typed)
+                buffered = []
+                count = 0
+    if count > 0:
+        yield combine_frames(buffered, typed)
+
+def prefetch_map(function, items, max_workers):
+    ''' Results of function for the items in their order, computed on max_workers threads at most max_workers items ahead '''
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(executor.submit(function, item) for item in islice(items, max_workers))
+        try:
+            while len(pending) > 0:
+                result = pending.popleft().result()
+                for item in islice(items, 1):
+                    pending.append(executor.submit(function, item))
+                yield result
+        finally:
+            # The consumer stopped early
+            for future in pending:
+                future.cancel()
+
 class sos_2_0_0(SensorObservationService_2_0_0):
     """
         Abstraction for OGC Sensor Observation Service (SOS).
         Implements sos4py.
     """
 
+    # Cache for responses and parsed results, see set_response_cache()
+    response_cache = None
+
+    # Encoding of the requests of get_data(), get_sites() and get_data_availability(), see set_encoding()
+    encoding = 'auto'
+
+    # Scheduler of the requests of bulk operations, see set_scheduler()
+    scheduler = None
+
+    # Number of worker processes parsing GetObservation responses and their pool, see set_parse_processes()
+    parse_processes = None
+    _parse_pool = None
+
+    # Callables receiving a sos4py.instrumentation.RequestRecord per request, see add_hook()
+    _hooks = ()
+
+    # Size in bytes above which response bodies are spooled to temporary files and their directory, see set_spooling()
+    spool_threshold = None
+    spool_directory = None
+
     def __init__(self, url, version, xml=None, username=None, password=None):
         """Initialize."""
 
+        self._session = None
+        self._session_options = {}
+        self._session_lock = threading.Lock()
         super().__init__(url=url, version="2.0.0", xml=xml, username=username, password=password)
 
+    def __reduce__(self):
+        # owslib's __new__ would request the capabilities again
+        return (_unpickle_sos, (self.__class__, self.__getstate__()))
+
+    def __getstate__(self):
+        ''' Pickle support: the capabilities are kept as XML, credentials, the HTTP session and the response cache are not kept '''
+        state = self.__dict__.copy()
+        state['_session'] = None
+        state.pop('_session_lock', None)
+        state.pop('response_cache', None)
+        state.pop('_hooks', None)
+        state.pop('scheduler', None)
+        state.pop('_parse_pool', None)
+        # Credentials must not end up in files
+        state['username'] = None
+        state['password'] = None
+        if '_capabilities' in state:
+            state['_capabilities_xml'] = etree.tostring(state.pop('_capabilities'))
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._session_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Capabilities restored from a pickle are only parsed when they are needed
+        if name == '_capabilities' and '_capabilities_xml' in self.__dict__:
+            self._capabilities = etree.fromstring(self.__dict__.pop('_capabilities_xml'))
+            return self._capabilities
+        raise AttributeError(name)
+
+    # HTTP session
+    def open_session(self, pool_connections=10, pool_maxsize=10, max_retries=0, headers=None):
+        """Opens the pooled HTTP session used by all requests of this object.
+        An already open session is closed first. Without calling this function a session with the
+        default settings is opened on the first request.
+
+        Parameters
+        ----------
+        pool_connections : int, optional
+           number of hosts for which connection pools are kept (default is 10)
+        pool_maxsize : int, optional
+           maximum number of keep-alive connections per host, should be at least the number of
+           parallel requests, e.g. max_workers of get_data() (default is 10)
+        max_retries : int, optional
+           number of retries for failed connections (default is 0)
+        headers : dict, optional
+           additional HTTP headers sent with every request
+
+        Returns
+        -------
+        the session as requests.Session
+        """
+
+        self.close()
+        self._session_options = {'pool_connections': pool_connections, 'pool_maxsize': pool_maxsize,
+                                 'max_retries': max_retries, 'headers': headers}
+        self._session = create_session(**self._session_options)
+        return self._session
+
+    @property
+    def session(self):
+        ''' The pooled HTTP session, opened with the last used settings if necessary '''
+        with self._session_lock:
+            if self._session is None:
+                self._session = create_session(**self._session_options)
+            return self._session
+
+    def close(self):
+        """Closes the HTTP session and all its connections and stops the parse processes. A later request opens a new session."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Response cache
+    def set_response_cache(self, cache=None):
+        """Sets the cache for the responses of GetObservation, GetFeatureOfInterest and GetDataAvailability requests
+        and the results parsed from them (get_data(), get_sites(), get_data_availability())
+
+        Parameters
+        ----------
+        cache : sos4py.cache.MemoryCache or sos4py.cache.DiskCache, optional
+           the cache, None switches caching off (default)
+        """
+
+        self.response_cache = cache
+
+    # Scheduling
+    def set_scheduler(self, scheduler=None):
+        """Sets the scheduler of the concurrent requests of get_data() (chunk_size, values_per_chunk or plan),
+        get_data_batch(), get_result() and get_sites(include_phenomena=True)
+
+        Parameters
+        ----------
+        scheduler : sos4py.scheduler.AdaptiveScheduler, optional
+           adjusts the number of parallel requests to the latency and errors of the server and retries failed
+           requests, max_workers of the functions is ignored then. scheduler.report() tells the achieved
+           throughput. None (default) uses max_workers threads without retries.
+        """
+
+        self.scheduler = scheduler
+
+    def _map(self, function, items, max_workers):
+        ''' Results of function for all items in their order, computed by the scheduler or on a pool of max_workers threads '''
+        if self.scheduler is not None:
+            return self.scheduler.map(function, items)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(function, items))
+
+    # Parsing
+    def set_parse_processes(self, processes=None):
+        """Parses GetObservation responses in a pool of worker processes, so that parsing the responses of
+        parallel requests (get_data() with chunk_size, values_per_chunk or plan, get_data_batch(), get_data_iter())
+        uses several cores. The workers send back compact columns (numpy arrays and categories), the DataFrames
+        are built from them in this process. The pool is started with the first response, its processes are
+        spawned, so scripts using it need an ``if __name__ == '__main__':`` guard.
+
+        Parameters
+        ----------
+        processes : int, optional
+           number of worker processes, e.g. os.cpu_count() or max_workers of get_data(); None (default) parses
+           in the requesting threads
+        """
+
+        assert (processes is None or processes > 0),("processes has to be positive!")
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        self.parse_processes = processes
+
+    def _parse_executor(self):
+        ''' Pool of the parse processes, started if necessary '''
+        with self._session_lock:
+            if self._parse_pool is None:
+                self._parse_pool = create_pool(self.parse_processes)
+            return self._parse_pool
+
+    # Spooling
+    def set_spooling(self, threshold=64 * 1024 ** 2, directory=None):
+        """Spools large response bodies to temporary files while they are downloaded instead of holding them in
+        memory. get_observation() and get_feature_of_interest() return responses larger than threshold bytes as
+        sos4py.spool.SpooledResponse, a memory-mapped file that can be sliced like bytes. The parsers of get_data(),
+        get_sites(), get_data_availability() and get_result() read such responses from the file, the parse processes
+        of set_parse_processes() get its path instead of a copy of the body. Spooled responses are not stored in the
+        response cache, the results parsed from them are.
+
+        Parameters
+        ----------
+        threshold : int, optional
+           size in bytes above which bodies are spooled (default is 64 MiB), None switches spooling off
+        directory : str, optional
+           directory of the temporary files (default is the system's temporary directory)
+        """
+
+        assert (threshold is None or threshold >= 0),("threshold must not be negative!")
+        self.spool_threshold = threshold
+        self.spool_directory = directory
+
+    # Encoding
+    def set_encoding(self, encoding='auto'):
+        """Sets the encoding used by get_data(), get_sites() and get_data_availability()
+
+        Parameters
+        ----------
+        encoding : str, optional
+           'auto' (default) uses the JSON binding for the operations whose capabilities advertise it (HTTP POST
+           with Content-Type application/json, e.g. 52°North SOS) and XML otherwise, 'xml' always uses XML.
+           Both encodings return the same DataFrames.
+        """
+
+        assert (encoding in ('auto', 'xml')),("The encoding has to be 'auto' or 'xml'!")
+        self.encoding = encoding
+
+    # Instrumentation
+    def add_hook(self, hook):
+        """Registers a callable receiving the measurements of every request as sos4py.instrumentation.RequestRecord:
+        operation, parameters, bytes received, time to first byte, download time, parse time, DataFrame build time
+        and row count. The hook is called by the thread that performed the request, after the result is built.
+        Without hooks requests are not measured.
+
+        Parameters
+        ----------
+        hook : callable
+           e.g. sos4py.instrumentation.Stats() collecting the records or sos4py.instrumentation.SpanAdapter(tracer)
+           turning them into OpenTelemetry spans
+
+        Returns
+        -------
+        the hook
+        """
+
+        assert (callable(hook)),("The hook has to be callable!")
+        # Copied on write, requests running in other threads keep the list they started with
+        self._hooks = list(self._hooks) + [hook]
+        return hook
+
+    def remove_hook(self, hook):
+        """Unregisters a hook registered with add_hook()"""
+        self._hooks = [h for h in self._hooks if h is not hook]
+
+    def _instrument(self, operation, parameters=None):
+        ''' Context measuring a request for the hooks, nothing is measured without hooks '''
+        if len(self._hooks) == 0:
+            return nullcontext()
+        return instrument(self._hooks, operation, parameters)
+
+    def _json_url(self, operation):
+        ''' URL for JSON requests of an operation, None if the JSON binding is not used for it '''
+        if self.encoding != 'auto':
+            return None
+        try:
+            return json_operation_url(self.get_operation_by_name(operation))
+        except KeyError:
+            return None
+
+    def _fetch_json(self, operation, request, **url_kwargs):
+        """
+        Send a KVP request (dict) with the JSON binding if the SOS offers it for the operation and return the
+        decoded response. Returns None if the XML binding has to be used instead.
+        """
+
+        url = self._json_url(operation)
+        if url is None:
+            return None
+        # The marker keeps the cache key apart from XML requests to the same URL
+        content = self._fetch(operation, url, dict(request, encoding='json'), 'Post', body=encode_request(request),
+                              content_type=JSON_CONTENT_TYPE, **url_kwargs)
+        start = time.perf_counter()
+        document = decode_response(content)
+        add_time('parse_time', start)
+        return document
+
+    def _cache_key(self, base_url, method, request, *extra):
+        ''' Key of a request in the response cache, None if there is no cache '''
+        if self.response_cache is None:
+            return None
+        return make_key(base_url, method, request, *extra)
+
+    def _cached(self, operation, key, compute):
+        ''' Value of key from the response cache, computed and stored if it is missing.
+        Requests sent while computing a value are not cached themselves, so every call is cached on one level only.
+        '''
+        if key is None:
+            return compute()
+        value = self.response_cache.get(key, operation)
+        if value is not None:
+            set_cached()
+        else:
+            outer = getattr(_caching, 'active', False)
+            _caching.active = True
+            try:
+                value = compute()
+            finally:
+                _caching.active = outer
+            # Spooled bodies are too large for the cache, their files are deleted with them
+            if not isinstance(value, SpooledResponse):
+                self.response_cache.set(key, value, operation)
+        return value
+
+    def _fetch(self, operation, base_url, request, method='Get', body=None, **url_kwargs):
+        """
+        Send a request and return its body, from the response cache if possible. Raises ExceptionReport for exception responses.
+        body is an XML request sent instead of the KVP parameters of request (which are still used as cache key).
+        """
+
+        def download():
+            if self.spool_threshold is None:
+                content = self._send(base_url, request if body is None else body, method, **url_kwargs).content
+            else:
+                response = self._send(base_url, request if body is None else body, method, stream=True, **url_kwargs)
+                start = time.perf_counter()
+                content = read_body(response, self.spool_threshold, self.spool_directory)
+                add_time('download_time', start)
+                add_bytes(len(content))
+                check_service_exception(response.headers.get('Content-Type'), content)
+            check_exception_report(content)
+            return content
+
+        with self._instrument(operation, request):
+            if getattr(_caching, 'active', False):
+                # The result parsed from this response is cached already
+                return download()
+            return self._cached(operation, self._cache_key(base_url, method, request), download)
+
+    def _send(self, base_url, request, method='Get', stream=False, timeout=30, content_type='application/xml'):
+        """
+        Send a KVP request (or a request document as bytes with content_type) with the pooled session and check the response
+        """
+
+        rkwargs = {'timeout': timeout, 'stream': stream}
+        if self.username and self.password:
+            rkwargs['auth'] = (self.username, self.password)
+        if method.lower() == 'post':
+            rkwargs['data'] = request
+            if isinstance(request, bytes):
+                rkwargs['headers'] = {'Content-Type': content_type}
+        else:
+            rkwargs['params'] = request
+
+        record = current_record()
+        if record is not None:
+            # The body is read separately, to tell the time to the first byte from the download time
+            rkwargs['stream'] = True
+            start = time.perf_counter()
+        response = self.session.request(method.upper(), base_url, **rkwargs)
+        try:
+            if record is not None:
+                record.ttfb += time.perf_counter() - start
+                record.method, record.url, record.status = method.upper(), response.url, response.status_code
+                if not stream:
+                    start = time.perf_counter()
+                    record.bytes += len(response.content)
+                    record.download_time += time.perf_counter() - start
+            check_http_response(response, stream)
+        except BaseException:
+            response.close()
+            raise
+        return response
+
     # Summary functions
     def sosServiceIdentification(self):
         return(pd.Series((inspect.getmembers(self.identification)[2][1]), name='ServiceIdentification'))
@@ -79,7 +641,7 @@ class sos_2_0_0(SensorObservationService_2_0_0):
         return fois
 
     # Get data availability function
-    def get_data_availability(self, procedures=None, observedProperties=None, featuresOfInterest=None, offerings=None, method=None, **kwargs):
+    def get_data_availability(self, procedures=None, observedProperties=None, featuresOfInterest=None, offerings=None, method=None, as_frame=False, **kwargs):
         """Performs "GetDataAvailability" request
 
         Parameters
@@ -94,10 +656,36 @@ class sos_2_0_0(SensorObservationService_2_0_0):
             request only specific offerings
         method: str, optional
            http method (default is "Get")
+        as_frame : boolean, optional
+           whether or not to return all members as one DataFrame with datetime64[ns, UTC] StartTime, EndTime
+           and ResultTime columns (default is False), see sos4py.decoders.decode_data_availability()
 
         Returns
         -------
-        list of GetDataAvailability members
+        list of GetDataAvailability members, or a DataFrame with one row per member if as_frame is True
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self._data_availability_request(procedures, observedProperties, featuresOfInterest,
+                                                                        offerings, method, **kwargs)
+
+        def parse():
+            document = self._fetch_json('GetDataAvailability', request, **url_kwargs) if method.lower() == 'get' else None
+            if document is not None:
+                start = time.perf_counter()
+                members = decode_json_availability(document, as_frame)
+                add_time('build_time', start)
+                return members
+            return self._parse_data_availability(self._fetch('GetDataAvailability', base_url, request, method, **url_kwargs), as_frame)
+
+        with self._instrument('GetDataAvailability', request):
+            final = self._cached('GetDataAvailability', self._cache_key(base_url, method, request, 'frame' if as_frame else 'members'), parse)
+            set_rows(len(final))
+        return(final)
+
+    def _data_availability_request(self, procedures=None, observedProperties=None, featuresOfInterest=None, offerings=None, method=None, **kwargs):
+        """
+        Build the URL, the KVP parameters and the request arguments of a "GetDataAvailability" request
         """
 
         method = method or 'Get'
@@ -140,16 +728,24 @@ class sos_2_0_0(SensorObservationService_2_0_0):
             for kw in kwargs:
                 request[kw] = kwargs[kw]
 
-        data = urlencode(request)
-        request_gda = openURL(base_url, data, method, username=self.username, password=self.password, **url_kwargs).read()
-        gda = etree.fromstring(request_gda)
+        return base_url, request, url_kwargs
 
-        if gda.tag == nspath_eval("ows:ExceptionReport", namespaces):
-            raise ows.ExceptionReport(gda)
+    def _parse_data_availability(self, response, as_frame=False):
+        """
+        Parse a GetDataAvailability response into a list of members or a DataFrame
+        """
 
-        gdaMembers = gda.findall(nspath_eval("gda:dataAvailabilityMember", namespaces))
-        final = list(map(gda_member, gdaMembers))
-        return(final)
+        start = time.perf_counter()
+        gda = xml_root(response)
+        add_time('parse_time', start)
+        start = time.perf_counter()
+        if as_frame:
+            members = decode_data_availability(gda)
+        else:
+            gdaMembers = gda.findall(nspath_eval("gda:dataAvailabilityMember", namespaces))
+            members = list(map(gda_member, gdaMembers))
+        add_time('build_time', start)
+        return members
 
     def get_feature_of_interest(self, featuresOfInterest=None, observedProperties=None, procedures=None, responseFormat=None, method=None, **kwargs):
         """Performs "GetFeatureOfInterest" request
@@ -169,7 +765,19 @@ class sos_2_0_0(SensorObservationService_2_0_0):
 
         Returns
         -------
-        response of the request as <class 'bytes'>
+        response of the request as <class 'bytes'>, as sos4py.spool.SpooledResponse if it is larger than the
+        spooling threshold (see set_spooling())
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self._feature_of_interest_request(featuresOfInterest, observedProperties, procedures,
+                                                                          responseFormat, method, **kwargs)
+
+        return self._fetch('GetFeatureOfInterest', base_url, request, method, **url_kwargs)
+
+    def _feature_of_interest_request(self, featuresOfInterest=None, observedProperties=None, procedures=None, responseFormat=None, method=None, **kwargs):
+        """
+        Build the URL, the KVP parameters and the request arguments of a "GetFeatureOfInterest" request
         """
 
         method = method or 'Get'
@@ -205,63 +813,137 @@ class sos_2_0_0(SensorObservationService_2_0_0):
             for kw in kwargs:
                 request[kw] = kwargs[kw]
 
-        data = urlencode(request)
-        response = openURL(base_url, data, method,
-                               username=self.username, password=self.password, **url_kwargs).read()
-        try:
-            tr = etree.fromstring(response)
-            if tr.tag == nspath_eval("ows:ExceptionReport", namespaces):
-                raise ows.ExceptionReport(tr)
-            else:
-                return response
-        except ows.ExceptionReport:
-            raise
-        except BaseException:
-            return response
+        return base_url, request, url_kwargs
 
-    def get_sites(self, include_phenomena=False):
+    def get_sites(self, include_phenomena=False, bbox=None, crs='EPSG:4326', max_workers=4):
         """Gets the registered sites of the SOS
 
         Parameters
         ----------
         include_phenomena : boolean, optional
            whether or not flags for the existance of phenomenona (e.g. water temperature) should be included (default is False)
+        bbox : tuple or shapely geometry, optional
+           request only the sites within the bounding box (minx, miny, maxx, maxy) in x/y order, e.g.
+           (longitude, latitude), sent to the SOS as spatialFilter. For a geometry its bounds are sent and
+           the sites outside of the geometry are dropped afterwards.
+        crs : str or int, optional
+           reference system of bbox (default is 'EPSG:4326')
+        max_workers : int, optional
+           maximum number of phenomena requested at the same time for include_phenomena (default is 4)
 
         Returns
         -------
         sites as GeoDataFrame
         """
 
-        # Get and parse response
-        response = self.get_feature_of_interest()
-        xml_tree = etree.fromstring(response)
-        parsed_response = SOSGetFeatureOfInterestResponse(xml_tree)
+        extra = bbox.wkt if isinstance(bbox, shapely.Geometry) else (tuple(bbox) if bbox is not None else None)
+        with self._instrument('GetFeatureOfInterest', {'request': 'GetFeatureOfInterest', 'bbox': extra, 'crs': str(crs)}):
+            sites = self._cached('GetFeatureOfInterest', self._cache_key(self.url, 'Get', {'request': 'GetFeatureOfInterest'}, 'sites', include_phenomena, extra, str(crs)),
+                                 lambda: self._get_sites(include_phenomena, bbox, crs, max_workers))
+            set_rows(len(sites))
+        return sites
 
-        # Save features of interest with their geometry in a GeoDataFrame
-        fois = []
-        points = []
-        for foi in parsed_response.features:
-            if foi.get_geometry() is not None:
-                fois.append(foi.name if foi.name is not None else foi.id)
-                points.append(Point(foi.get_geometry()[1],foi.get_geometry()[0])) # Point expects (x, y)
+    def get_site_index(self, bbox=None, crs='EPSG:4326'):
+        """Gets the sites of the SOS (see get_sites()) in a spatial index for nearest site and distance queries
+
+        Returns
+        -------
+        sites as sos4py.sites.SiteIndex
+        """
+
+        return SiteIndex(self.get_sites(bbox=bbox, crs=crs))
 
-        crs = pyproj.CRS.from_user_input(int(parsed_response.features[0].get_srs().split("/")[-1]))
-        sites = gpd.GeoDataFrame({'site_name': fois, 'geometry': gpd.GeoSeries(points)},  crs=crs)
+    def _get_sites(self, include_phenomena=False, bbox=None, crs='EPSG:4326', max_workers=4):
+
+        filters = {}
+        if bbox is not None:
+            bounds = bbox.bounds if isinstance(bbox, shapely.Geometry) else bbox
+            filters['spatialFilter'] = spatial_filter(bounds, crs)
+
+        _, request, _ = self._feature_of_interest_request(**filters)
+        document = self._fetch_json('GetFeatureOfInterest', request)
+        if document is not None:
+            start = time.perf_counter()
+            sites = self._sites_frame(feature_columns(decode_features(document)))
+            add_time('build_time', start)
+        else:
+            sites = self._parse_sites(self.get_feature_of_interest(**filters))
+
+        if isinstance(bbox, shapely.Geometry) and len(sites) > 0:
+            # Only the bounds were sent
+            area = gpd.GeoSeries([bbox], crs=crs).to_crs(sites.crs).iloc[0] if sites.crs is not None else bbox
+            sites = sites[sites.intersects(area)].reset_index(drop=True)
 
         # Add columns to GeoDataFrame indicating whether or not a specific phenomenon is available for a specific foi
         if include_phenomena==True:
-            for phenomenon in self.sosPhenomena():
-                response = self.get_feature_of_interest(observedProperties=[phenomenon])
-                xml_tree = etree.fromstring(response)
-                parsed_response = SOSGetFeatureOfInterestResponse(xml_tree)
-                fois = [foi.name for foi in parsed_response.features]
-                sites_sub = pd.DataFrame({'site_name': fois, phenomenon: True})
-                sites = sites.join(sites_sub.set_index('site_name'), on='site_name')
+            phenomena = self.sosPhenomena()
+            # Responses requested while the sites are computed for the cache are not cached themselves
+            caching = getattr(_caching, 'active', False)
+
+            def site_names(phenomenon):
+                _caching.active = caching
+                if document is not None:
+                    _, phenomenon_request, _ = self._feature_of_interest_request(observedProperties=[phenomenon], **filters)
+                    phenomenon_document = self._fetch_json('GetFeatureOfInterest', phenomenon_request)
+                    if phenomenon_document is not None:
+                        return [foi.name for foi in decode_features(phenomenon_document)]
+                return decode_feature_names(xml_root(self.get_feature_of_interest(observedProperties=[phenomenon], **filters)))
+
+            # One request per phenomenon, sent concurrently
+            names = self._map(site_names, phenomena, max_workers)
+            sites = self._add_phenomenon_names(sites, phenomena, names)
+
+        return sites
+
+    def _parse_sites(self, response):
+        """
+        Parse a GetFeatureOfInterest response into a GeoDataFrame of sites
+        """
+
+        start = time.perf_counter()
+        element = xml_root(response)
+        add_time('parse_time', start)
+        start = time.perf_counter()
+        sites = self._sites_frame(decode_feature_columns(element))
+        add_time('build_time', start)
+        return sites
 
-            sites = sites.fillna(False)
+    def _sites_frame(self, features):
+        """
+        GeoDataFrame of sites from the columns of point features (see sos4py.decoders.decode_features())
+        """
 
+        fois = [name if name is not None else identifier for name, identifier in zip(features['name'], features['id'])]
+        srs = next((s for s in features['srs'] if s is not None), None)
+        crs = crs_from_srs(srs) if srs is not None else None
+        # Coordinates are (y, x) or (latitude, longitude), respectively, the points are built in one go
+        coordinates = features['coordinates']
+        points = gpd.points_from_xy(coordinates[:, 1], coordinates[:, 0], crs=crs)
+        sites = gpd.GeoDataFrame({'site_name': fois, 'geometry': points},  crs=crs)
         return sites
 
+    def _add_phenomena(self, sites, phenomena, responses):
+        """
+        Add one column per phenomenon to the sites telling whether the phenomenon is observed at a site,
+        responses are the GetFeatureOfInterest responses filtered by each of the phenomena
+        """
+
+        names = [decode_feature_names(xml_root(response)) for response in responses]
+        return self._add_phenomenon_names(sites, phenomena, names)
+
+    def _add_phenomenon_names(self, sites, phenomena, names):
+        """
+        Add one column per phenomenon to the sites, names are the lists of site names observing each of the phenomena
+        """
+
+        # Site x phenomenon presence matrix, built as one boolean block and added with a single join
+        site_names = sites['site_name']
+        flags = np.zeros((len(sites), len(phenomena)), dtype=bool)
+        for column, fois in enumerate(names):
+            flags[:, column] = site_names.isin(fois).values
+
+        return sites.join(pd.DataFrame(flags, columns=list(phenomena), index=sites.index))
+
     def get_observation(self, responseFormat=None, offerings=None, observedProperties=None, featuresOfInterest=None, procedures=None, eventTime=None, method=None, **kwargs):
         """Overrides parent function get_observation()
         Performs "GetObservation" request
@@ -289,7 +971,19 @@ class sos_2_0_0(SensorObservationService_2_0_0):
 
         Returns
         -------
-        response of the request as <class 'bytes'>
+        response of the request as <class 'bytes'>, as sos4py.spool.SpooledResponse if it is larger than the
+        spooling threshold (see set_spooling())
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self._observation_request(responseFormat, offerings, observedProperties, featuresOfInterest,
+                                                                  procedures, eventTime, method, **kwargs)
+
+        return self._fetch('GetObservation', base_url, request, method, **url_kwargs)
+
+    def _observation_request(self, responseFormat=None, offerings=None, observedProperties=None, featuresOfInterest=None, procedures=None, eventTime=None, method=None, **kwargs):
+        """
+        Build the URL, the KVP parameters and the openURL arguments of a "GetObservation" request
         """
 
         method = method or 'Get'
@@ -334,21 +1028,36 @@ class sos_2_0_0(SensorObservationService_2_0_0):
             for kw in kwargs:
                 request[kw] = kwargs[kw]
 
-        data = urlencode(request)
-        response = openURL(base_url, data, method, username=self.username, password=self.password, **url_kwargs).read()
+        return base_url, request, url_kwargs
+
+    def iter_observations(self, responseFormat=None, offerings=None, observedProperties=None, featuresOfInterest=None, procedures=None, eventTime=None, method=None, points_per_chunk=10000, **kwargs):
+        """Performs "GetObservation" request and parses the response while it is downloaded
+
+        Takes the same parameters as get_observation(). Every om:OM_Observation is parsed as soon
+        as it has been received and is cleared afterwards. WaterML 2.0 time series are handed out in
+        parts of at most points_per_chunk points (each part is an observation with the metadata of
+        its series), so the memory needed grows neither with the size of the response nor with the
+        length of a series.
+
+        Returns
+        -------
+        generator of observations (owslib MeasurementObservation or MeasurementTimeseriesObservation)
+        """
+
+        method = method or 'Get'
+        base_url, request, url_kwargs = self._observation_request(responseFormat, offerings, observedProperties, featuresOfInterest,
+                                                                  procedures, eventTime, method, **kwargs)
 
+        response = self._send(base_url, request, method, stream=True, **url_kwargs)
+        # Let urllib3 undo gzip/deflate content encodings while reading
+        response.raw.decode_content = True
         try:
-            tr = etree.fromstring(response)
-            if tr.tag == nspath_eval("ows:ExceptionReport", namespaces):
-                raise ows.ExceptionReport(tr)
-            else:
-                return response
-        except ows.ExceptionReport:
-            raise
-        except BaseException:
-            return response
+            for observation in iter_observation_elements(response.raw, points_per_chunk):
+                yield observation
+        finally:
+            response.close()
 
-    def get_data(self, sites=None, phenomena=None, procedures=None, begin=None, end=None):
+    def get_data(self, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None, values_per_chunk=None, sampling_interval=None, max_workers=4, typed=False, plan=False, store=None):
         """Gets the observations of the SOS
 
         Parameters
@@ -363,26 +1072,521 @@ class sos_2_0_0(SensorObservationService_2_0_0):
            begin of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-01T10:00:00Z'
         end : str, optional if begin is not provided
            end of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-02T10:00:00Z'
+        chunk_size : timedelta or str, optional
+           split the time period into windows of this size, e.g. '30D', and request them in parallel (requires begin and end)
+        values_per_chunk : int, optional
+           size the windows so that each one holds about this many values per requested series (requires sampling_interval)
+        sampling_interval : timedelta or str, optional
+           expected time between two values of a series, e.g. '10min'
+        max_workers : int, optional
+           maximum number of windows requested at the same time (default is 4)
+        typed : boolean, optional
+           whether or not to return compact, typed columns: categorical site, procedure, phenomenon and unit,
+           datetime64[ns, UTC] times and float64 values (default is False)
+        plan : boolean, optional
+           whether or not to plan the requests with GetDataAvailability first, see plan_data() (default is False).
+           With values_per_chunk each request then holds about values_per_chunk values in total.
+        store : sos4py.store.ObservationStore, optional
+           local store answering the request (requires begin and end). Only the periods not downloaded
+           before are requested from the SOS (with the other arguments) and written to the store.
 
         It is recommended to provide at least one of sites, phenomena or procedures. Otherwise the request may take very long.
 
         Returns
         -------
-        observations as DataFrame
+        observations as DataFrame (time stamps of WaterML 2.0 responses are converted to UTC)
         """
 
         # Set event time
         # TODO: Improve (check format, support different formats, support using only end or begin)
-        assert ((begin is not None) and (end is not None) or (begin is None) and (end is None)),("If begin/end is provided, end/begin has to be provided as well!")
+        if store is not None:
+            return self._get_data_stored(store, sites, phenomena, procedures, begin, end, chunk_size=chunk_size,
+                                         values_per_chunk=values_per_chunk, sampling_interval=sampling_interval,
+                                         max_workers=max_workers, typed=typed, plan=plan)
+
+        if plan:
+            planned = self.plan_data(sites, phenomena, procedures, begin, end, chunk_size, values_per_chunk, sampling_interval)
+            return self._get_data_planned(planned, max_workers, typed)
+
+        windows = data_windows(begin, end, chunk_size, values_per_chunk, sampling_interval)
+        if windows is not None:
+            return self._get_data_chunked(sites, phenomena, procedures, windows, max_workers, typed)
+
         if (begin is not None) and (end is not None):
             eventTime = 'om:resultTime,' + begin + '/' + end
         else:
             eventTime = None
 
         # Get and parse response
-        response = self.get_observation(featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures, eventTime=eventTime)
-        xml_tree = etree.fromstring(response)
+        return self._observation_frame(typed, featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures, eventTime=eventTime)
+
+    def get_data_iter(self, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None, values_per_chunk=None, sampling_interval=None, rows_per_frame=None, max_workers=4, typed=False, plan=False):
+        """Gets the observations of the SOS as a sequence of DataFrames, so that pulls larger than the memory are possible
+
+        With chunk_size or values_per_chunk (or plan) one DataFrame per time window is returned, the windows are
+        requested in parallel (by the scheduler of set_scheduler() if there is one) but at most max_workers of
+        them ahead of the consumer, so the memory needed is bounded by max_workers windows. Without windows the
+        one response is parsed like by get_data() and its DataFrame is handed out in parts of rows_per_frame rows
+        (see set_spooling() to keep large responses out of memory). The DataFrames are the same as those of
+        get_data(). See sos4py.sinks to write the DataFrames to CSV or Parquet files.
+
+        Parameters
+        ----------
+        rows_per_frame : int, optional
+           number of rows of the returned DataFrames (the last one may be smaller), required without
+           time windows (default is None: one DataFrame per window)
+        max_workers : int, optional
+           maximum number of windows requested at the same time and kept in memory (default is 4)
+        others
+           see get_data()
+
+        Returns
+        -------
+        generator of DataFrames with the columns of get_data(), empty windows are left out
+        """
+
+        assert (rows_per_frame is None or rows_per_frame > 0),("rows_per_frame has to be positive!")
+
+        def scheduled(function):
+            # The scheduler limits the concurrency and retries, the read-ahead is bounded by max_workers
+            if self.scheduler is None:
+                return function
+            return lambda item: self.scheduler.call(function, item)
+
+        if plan:
+            planned = self.plan_data(sites, phenomena, procedures, begin, end, chunk_size, values_per_chunk, sampling_interval)
+            frames = prefetch_map(scheduled(lambda request: self._planned_frame(request, typed)), planned, max_workers)
+        else:
+            windows = data_windows(begin, end, chunk_size, values_per_chunk, sampling_interval)
+            if windows is not None:
+                frames = prefetch_map(scheduled(lambda window: self._window_frame(sites, phenomena, procedures, window, windows, typed)),
+                                      windows, max_workers)
+            else:
+                assert (rows_per_frame is not None),("Without time windows (chunk_size, values_per_chunk or plan) rows_per_frame has to be provided!")
+                eventTime = 'om:resultTime,' + begin + '/' + end if (begin is not None) and (end is not None) else None
+                frames = [self._observation_frame(typed, featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures,
+                                                  eventTime=eventTime)]
+
+        if rows_per_frame is not None:
+            frames = rechunk_frames(frames, rows_per_frame, typed)
+        for df in frames:
+            if len(df) > 0:
+                yield df.reset_index(drop=True)
+
+    def _get_data_chunked(self, sites, phenomena, procedures, windows, max_workers, typed=False):
+        """
+        Request the time windows (see data_windows()) on a pool of threads and combine the results
+        """
+
+        frames = self._map(lambda window: self._window_frame(sites, phenomena, procedures, window, windows, typed), windows, max_workers)
+
+        return combine_frames(frames, typed)
+
+    def _window_frame(self, sites, phenomena, procedures, window, windows, typed=False):
+        ''' Observations of one of the time windows '''
+        df = self._observation_frame(typed, featuresOfInterest=sites, observedProperties=phenomena, procedures=procedures,
+                                     eventTime=event_time(*window))
+        return clip_window(df, window, windows)
+
+    def _get_data_stored(self, store, sites, phenomena, procedures, begin, end, typed=False, **kwargs):
+        """
+        Download the periods missing in the store, then read the requested observations from the store
+        """
+
+        assert ((begin is not None) and (end is not None)),("Reading through a store requires begin and end!")
+        # Periods in the future are not complete yet
+        end_covered = min(to_timestamp(end), pd.Timestamp.now(tz='UTC'))
+        for missing_begin, missing_end in store.missing(sites, phenomena, procedures, begin, end):
+            df = self.get_data(sites, phenomena, procedures, format_time(missing_begin), format_time(missing_end), **kwargs)
+            store.write(df)
+            if missing_begin < end_covered:
+                store.add_coverage(sites, phenomena, procedures, missing_begin, min(missing_end, end_covered))
+
+        df = store.read(sites, phenomena, procedures, begin, end, typed=typed)
+        if df is None:
+            # Nothing stored yet, e.g. no observations in the period
+            return empty_frame(OM_COLUMNS, typed)
+        return df
+
+    def get_result(self, offering, observedProperty, featuresOfInterest=None, begin=None, end=None, max_workers=4, typed=False, **kwargs):
+        """Gets observations with the result handling extension of SOS 2.0 (GetResultTemplate and GetResult)
+
+        The values are sent as compact delimited text instead of O&M XML. The result template is requested
+        once per offering and observed property and kept with this object. Only templates with a
+        swe:DataRecord structure and a swe:TextEncoding are supported.
+
+        Parameters
+        ----------
+        offering : str
+           offering of the observations
+        observedProperty : str
+           observed property (phenomenon) of the observations
+        featuresOfInterest : non-empty list of str, optional
+           sites, requested one by one and added as site column (default is all sites, without site column values)
+        begin : str, optional if end is not provided
+           begin of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-01T10:00:00Z'
+        end : str, optional if begin is not provided
+           end of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-02T10:00:00Z'
+        max_workers : int, optional
+           maximum number of sites requested at the same time (default is 4)
+        typed : boolean, optional
+           whether or not to return compact, typed columns, see get_data()
+        **kwargs : extra arguments
+           anything else e.g. vendor specific parameters
+
+        Returns
+        -------
+        observations as DataFrame with the columns of get_data()
+        """
+
+        assert ((begin is not None) and (end is not None) or (begin is None) and (end is None)),("If begin/end is provided, end/begin has to be provided as well!")
+        template = self.get_result_template(offering, observedProperty)
+        procedures = [o.procedures for o in self.offerings if o.id == offering]
+        procedure = procedures[0][0] if len(procedures) > 0 and len(procedures[0]) == 1 else None
+
+        base_url = self._operation_url('GetResult')
+        request = {'service': 'SOS', 'version': self.version, 'request': 'GetResult', 'offering': offering,
+                   'observedProperty': observedProperty}
+        if begin is not None:
+            request['temporalFilter'] = event_time(begin, end)
+        request.update(kwargs)
+
+        def fetch(site):
+            site_request = dict(request)
+            if site is not None:
+                site_request['featureOfInterest'] = site
+            with self._instrument('GetResult', site_request):
+                response = self._fetch('GetResult', base_url, site_request)
+                start = time.perf_counter()
+                element = xml_root(response)
+                add_time('parse_time', start)
+                start = time.perf_counter()
+                df = self._result_frame(decode_result_values(element, template), template, site, procedure, observedProperty, typed)
+                add_time('build_time', start)
+                set_rows(len(df))
+            return df
+
+        if featuresOfInterest is None:
+            return fetch(None)
+        check_list_param(featuresOfInterest)
+        frames = self._map(fetch, featuresOfInterest, max_workers)
+        return combine_frames(frames, typed)
+
+    def get_result_template(self, offering, observedProperty):
+        """Performs "GetResultTemplate" request, the decoded template is kept with this object
+
+        Returns
+        -------
+        the template as sos4py.decoders.ResultTemplate
+        """
+
+        templates = self.__dict__.setdefault('_result_templates', {})
+        if (offering, observedProperty) not in templates:
+            request = {'service': 'SOS', 'version': self.version, 'request': 'GetResultTemplate', 'offering': offering,
+                       'observedProperty': observedProperty}
+            response = self._fetch('GetResultTemplate', self._operation_url('GetResultTemplate'), request)
+            templates[(offering, observedProperty)] = decode_result_template(xml_root(response))
+        return templates[(offering, observedProperty)]
+
+    def _operation_url(self, name, method='Get'):
+        ''' URL of an operation for a HTTP method, the service URL if the capabilities do not list it '''
+        try:
+            methods = self.get_operation_by_name(name).methods
+        except KeyError:
+            return self.url
+        return next((m['url'] for m in methods if m['type'].lower() == method.lower()), self.url)
+
+    def _result_frame(self, values, template, site, procedure, observedProperty, typed=False):
+        """
+        Observation DataFrame (columns of get_data()) from the decoded values of a GetResult response
+        """
+
+        times = [name for name, field_type in zip(template.names, template.types) if field_type == 'Time']
+        result_times = [name for name, definition in zip(template.names, template.definitions)
+                        if name in times and ('ResultTime' in (definition or '') or name == 'resultTime')]
+        phenomenon_times = [name for name in times if name not in result_times] or result_times
+        # The value is the field defined as the observed property, else the first field which is no time
+        fields = [(name, definition, uom) for name, field_type, definition, uom in zip(template.names, template.types, template.definitions, template.uoms)
+                  if field_type != 'Time']
+        assert (len(fields) > 0),("The result template has no value field!")
+        value, _, unit = next((field for field in fields if field[1] == observedProperty), fields[0])
+
+        df = pd.DataFrame({
+            'site': site, 'procedure': procedure, 'phenomenon': observedProperty,
+            'phenomenon_time': values[phenomenon_times[0]] if len(phenomenon_times) > 0 else None,
+            'result_time': values[(result_times or phenomenon_times)[0]] if len(times) > 0 else None,
+            'value': values[value], 'unit': unit}, index=values.index, columns=OM_COLUMNS)
+        if len(df) == 0:
+            return empty_frame(OM_COLUMNS, typed)
+        return to_typed(df) if typed else df
+
+    def get_data_batch(self, targets, begin=None, end=None, max_series=50, max_url_length=2000, max_workers=4, typed=False):
+        """Gets the observations of many series with as few GetObservation requests as possible
+
+        The targets are packed into requests of at most max_series series each. A request whose GET URL
+        would be longer than max_url_length is sent as XML with HTTP POST if the SOS supports it, otherwise
+        the requests are kept short enough for GET. The merged results are split per target again.
+
+        Parameters
+        ----------
+        targets : list of tuples
+           series as (site, phenomenon) or (site, phenomenon, procedure) tuples
+        begin : str, optional if end is not provided
+           begin of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-01T10:00:00Z'
+        end : str, optional if begin is not provided
+           end of time period in the form 'YYYY-MM-DDThh:mm:ssZ', e.g. '2020-01-02T10:00:00Z'
+        max_series : int, optional
+           maximum number of series per request, limits the size of the responses (default is 50)
+        max_url_length : int, optional
+           maximum length of GET URLs (default is 2000)
+        max_workers : int, optional
+           maximum number of requests sent at the same time (default is 4)
+        typed : boolean, optional
+           whether or not to return compact, typed columns, see get_data()
+
+        Returns
+        -------
+        dict of target tuple -> observations as DataFrame (empty for targets without observations)
+        """
+
+        assert ((begin is not None) and (end is not None) or (begin is None) and (end is None)),("If begin/end is provided, end/begin has to be provided as well!")
+        targets = [tuple(target) for target in targets]
+        normalized = [normalize_target(target) for target in targets]
+        eventTime = event_time(begin, end) if begin is not None else None
+        post_url = next((m['url'] for m in self.get_operation_by_name('GetObservation').methods if m['type'].lower() == 'post'), None)
+
+        def kvp(sites, phenomena, procedure):
+            return self._observation_request(featuresOfInterest=sites, observedProperties=phenomena,
+                                             procedures=[procedure] if procedure is not None else None, eventTime=eventTime)
+
+        def url_length(sites, phenomena, procedure):
+            base_url, request, _ = kvp(sites, phenomena, procedure)
+            return len(requests.Request('GET', base_url, params=request).prepare().url)
+
+        if post_url is not None:
+            fits = lambda sites, phenomena, procedure: True
+        else:
+            fits = lambda sites, phenomena, procedure: url_length(sites, phenomena, procedure) <= max_url_length
+
+        def fetch(batch):
+            base_url, request, _ = kvp(*batch)
+            with self._instrument('GetObservation', request):
+                if post_url is not None and url_length(*batch) > max_url_length:
+                    response = self._fetch('GetObservation', post_url, request, 'Post', body=observation_request_xml(request))
+                else:
+                    response = self._fetch('GetObservation', base_url, request)
+                df = self._parse_observations(response, typed)
+                set_rows(len(df))
+            return df
+
+        frames = self._map(fetch, pack_targets(normalized, fits, max_series), max_workers)
+        df = combine_frames(frames, typed) if len(frames) > 0 else empty_frame(OM_COLUMNS, typed)
+
+        # Split the merged observations per target
+        series = df[['site', 'phenomenon', 'procedure']].astype(object)
+        groups = dict((key, index) for key, index in df.groupby([series['site'], series['phenomenon'], series['procedure']], dropna=False, observed=True).indices.items())
+        by_site_phenomenon = dict((key, index) for key, index in df.groupby([series['site'], series['phenomenon']], dropna=False, observed=True).indices.items())
+        results = OrderedDict()
+        for target, (site, phenomenon, procedure) in zip(targets, normalized):
+            index = by_site_phenomenon.get((site, phenomenon)) if procedure is None else groups.get((site, phenomenon, procedure))
+            results[target] = df.iloc[index].reset_index(drop=True) if index is not None else df.iloc[0:0]
+        return results
+
+    def plan_data(self, sites=None, phenomena=None, procedures=None, begin=None, end=None, chunk_size=None, values_per_chunk=None, sampling_interval=None):
+        """Plans the GetObservation requests of get_data() with a GetDataAvailability request
+
+        Combinations of site, phenomenon and procedure without data between begin and end are left out,
+        the periods of the requests are clipped to the available data and the period is split into windows
+        (chunk_size, or sized by values_per_chunk and sampling_interval). Sites observing the same phenomenon
+        with the same procedure are requested together, in groups of about values_per_chunk values.
+
+        Parameters
+        ----------
+        see get_data()
+
+        Returns
+        -------
+        list of sos4py.planner.PlannedRequest
+        """
+
+        assert ((begin is not None) and (end is not None) or (begin is None) and (end is None)),("If begin/end is provided, end/begin has to be provided as well!")
+        availability = self.get_data_availability(procedures=procedures, observedProperties=phenomena, featuresOfInterest=sites, as_frame=True)
+        return plan_requests(availability_extents(availability), begin, end, chunk_size, values_per_chunk, sampling_interval)
+
+    def _get_data_planned(self, requests, max_workers, typed=False):
+        """
+        Perform the requests of plan_data() on a pool of threads and combine the results
+        """
+
+        if len(requests) == 0:
+            return empty_frame(OM_COLUMNS, typed)
+
+        frames = self._map(lambda request: self._planned_frame(request, typed), requests, max_workers)
+
+        return combine_frames(frames, typed)
+
+    def _planned_frame(self, request, typed=False):
+        ''' Observations of one of the requests of plan_data() '''
+        df = self._observation_frame(typed, featuresOfInterest=request.sites, observedProperties=request.phenomena,
+                                     procedures=request.procedures, eventTime=event_time(request.begin, request.end))
+        if request.keep_before is not None and len(df) > 0:
+            df = df[_time_column(df) < request.keep_before]
+        return df
+
+    def sync(self, state, sites=None, phenomena=None, procedures=None, begin=None, end=None, max_lag=None, typed=False):
+        """Gets only the observations received since the last call (incremental download)
+
+        The high-water marks of state (latest time per site, procedure and phenomenon) are used as start
+        of the temporal filter, so the cost of a call depends on the amount of new data only. Observations
+        at or before the mark of their series (e.g. repeated at the edge of the filter) are dropped.
+        Afterwards the marks are raised and the state is saved.
+
+        Parameters
+        ----------
+        state : sos4py.sync.SyncState
+           high-water marks, e.g. SyncState('state.json')
+        sites : non-empty list of str, optional
+           observation sites/sensor locations
+        phenomena : non-empty list of str, optional
+           phenomena, e.g. water temperature
+        procedures : non-empty list of str, optional
+           measurement procedures of the observation
+        begin : str, optional
+           start of the download of requested series without mark (default is the whole history): requested
+           sites without marks are downloaded from begin in a request of their own, a selection with any other
+           series without mark is downloaded from begin as a whole
+        end : str, optional
+           end of the download (default is now)
+        max_lag : timedelta or str, optional
+           series whose mark is more than max_lag behind the newest mark are requested on their own, so that
+           a series without new data does not widen the request of all others (default is None: one request)
+        typed : boolean, optional
+           whether or not to return compact, typed columns, see get_data()
+
+        Returns
+        -------
+        new observations as DataFrame
+        """
+
+        end = to_timestamp(end) if end is not None else pd.Timestamp.now(tz='UTC')
+        begin = to_timestamp(begin) if begin is not None else None
+        marks = state.marks(sites, phenomena, procedures)
+
+        requests = []
+        # Requested sites without any mark are downloaded from begin on their own
+        if sites is not None:
+            marked_sites = set(series[0] for series in marks)
+            new_sites = [site for site in sites if site not in marked_sites]
+            if len(new_sites) > 0:
+                requests.append((new_sites, phenomena, procedures, begin))
+            sites = [site for site in sites if site in marked_sites]
+            if len(sites) == 0:
+                marks = {}
+
+        # Any other requested series without a mark (e.g. a new phenomenon of a known site) needs the selection from begin
+        selection = [(position, values) for position, values in enumerate((sites, procedures, phenomena)) if values is not None]
+        expected = product(*[values for _, values in selection])
+        complete = set(tuple(series[position] for position, _ in selection) for series in marks).issuperset(expected)
+
+        # Series lagging behind are requested on their own
+        lagging = {}
+        if max_lag is not None and len(marks) > 0 and complete:
+            newest = max(marks.values())
+            lagging = dict((series, mark) for series, mark in marks.items() if newest - mark > pd.Timedelta(max_lag))
+        current = [mark for series, mark in marks.items() if series not in lagging]
+
+        if len(marks) == 0:
+            if sites is None or len(sites) > 0:
+                requests.append((sites, phenomena, procedures, begin))
+        elif not complete:
+            requests.append((sites, phenomena, procedures, begin))
+        elif len(current) > 0:
+            requests.append((sites, phenomena, procedures, min(current)))
+        for (site, procedure, phenomenon), mark in lagging.items():
+            requests.append(([site] if site is not None else None, [phenomenon] if phenomenon is not None else None, [procedure] if procedure is not None else None, mark))
+
+        frames = []
+        for request_sites, request_phenomena, request_procedures, since in requests:
+            eventTime = event_time(since, end) if since is not None else None
+            with self._instrument('GetObservation', {'featureOfInterest': request_sites, 'observedProperty': request_phenomena,
+                                                     'procedure': request_procedures, 'temporalFilter': eventTime}):
+                df = self._parse_observations(self.get_observation(featuresOfInterest=request_sites, observedProperties=request_phenomena,
+                                                                   procedures=request_procedures, eventTime=eventTime), typed)
+                set_rows(len(df))
+            if since is None and len(df) > 0:
+                # Without temporal filter the whole history is returned, later observations are left for the next call
+                df = df[pd.to_datetime(df[time_column(df)], utc=True) <= end]
+            frames.append(df[state.new_rows(df)])
+
+        df = combine_frames(frames, typed)
+        if len(frames) > 1 and len(df) > 0:
+            # The requests of lagging series may overlap with the first request
+            df = df.drop_duplicates(subset=['site', 'procedure', 'phenomenon', time_column(df)], ignore_index=True)
+        state.update(df)
+        state.save()
+        return df.reset_index(drop=True)
+
+    def _observation_frame(self, typed=False, **kwargs):
+        """
+        Perform a GetObservation request (kwargs of get_observation()) and parse its response into a DataFrame
+        """
+
+        base_url, request, url_kwargs = self._observation_request(**kwargs)
+
+        def parse():
+            # Other response formats (e.g. WaterML 2.0) and POST requests use the XML binding
+            if kwargs.get('responseFormat') is None and (kwargs.get('method') or 'Get').lower() == 'get':
+                document = self._fetch_json('GetObservation', request, **url_kwargs)
+                if document is not None:
+                    start = time.perf_counter()
+                    df = decode_observations(document, OM_COLUMNS)
+                    if len(df) == 0:
+                        df = empty_frame(OM_COLUMNS, typed)
+                    elif typed:
+                        df = to_typed(df)
+                    add_time('build_time', start)
+                    return df
+            return self._parse_observations(self.get_observation(**kwargs), typed)
+
+        key = self._cache_key(base_url, kwargs.get('method') or 'Get', request, 'frame', typed)
+        with self._instrument('GetObservation', request):
+            df = self._cached('GetObservation', key, parse)
+            set_rows(len(df))
+        return df
+
+    def _parse_observations(self, response, typed=False):
+        """
+        Parse a GetObservation response into a DataFrame
+        """
+
+        if self.parse_processes is not None:
+            start = time.perf_counter()
+            # Spooled bodies are read by the worker from their file
+            source = response.path if isinstance(response, SpooledResponse) else response
+            columns = self._parse_executor().submit(parse_columns, source).result()
+            add_time('parse_time', start)
+            start = time.perf_counter()
+            df = frame_from_columns(columns, typed)
+            add_time('build_time', start)
+            return df
+
+        start = time.perf_counter()
+        xml_tree = xml_root(response)
+        if is_waterml(xml_tree):
+            add_time('parse_time', start)
+            # Decode the time series straight into columns without building owslib objects per point
+            start = time.perf_counter()
+            df = decode_waterml(xml_tree, columns=WATERML_COLUMNS, typed=typed)
+            add_time('build_time', start)
+            return df
+
         parsed_response = SOSGetObservationResponse(xml_tree)
+        add_time('parse_time', start)
+
+        if len(parsed_response.observations) == 0:
+            # Without observations the format can only be told from the namespaces declared by the response
+            waterml = namespaces['wml2'] in xml_tree.nsmap.values()
+            return empty_frame(WATERML_COLUMNS if waterml else OM_COLUMNS, typed)
 
         # Check response format
         # TODO: Check if different observations can have different response formats. If yes, the format needs to be checked for each observation...
@@ -391,7 +1595,11 @@ class sos_2_0_0(SensorObservationService_2_0_0):
         elif isinstance(parsed_response.observations[0], MeasurementTimeseriesObservation):
             response_format = 'http://www.opengis.net/waterml/2.0'
 
-        return self._create_obs_data_frame(parsed_response, response_format)
+        start = time.perf_counter()
+        df = self._create_obs_data_frame(parsed_response, response_format)
+        df = to_typed(df) if typed else df
+        add_time('build_time', start)
+        return df
 
     def _create_obs_data_frame(self, parsed_response=None, response_format=None):
 
@@ -423,7 +1631,7 @@ class sos_2_0_0(SensorObservationService_2_0_0):
             values.append(mo.get_result().value)
             uoms.append(mo.get_result().uom)
 
-        return pd.DataFrame({'site': fois, 'procedure': procedures, 'phenomenon' : phenomena, 'phenomenon_time': phenomenon_times, 'result_time': result_times, 'value': values, 'unit': uoms})
+        return pd.DataFrame({'site': fois, 'procedure': procedures, 'phenomenon' : phenomena, 'phenomenon_time': phenomenon_times, 'result_time': result_times, 'value': values, 'unit': uoms}, columns=OM_COLUMNS)
 
     def _create_df_waterml(self, parsed_response):
         """
@@ -446,7 +1654,7 @@ class sos_2_0_0(SensorObservationService_2_0_0):
                 values.append(point.value)
                 uoms.append(mo.get_result().defaultTVPMetadata.uom)
 
-        return pd.DataFrame({'site': fois, 'procedure': procedures, 'phenomenon' : phenomena, 'time_stamp': time_stamps, 'value': values, 'unit': uoms})
+        return pd.DataFrame({'site': fois, 'procedure': procedures, 'phenomenon' : phenomena, 'time_stamp': time_stamps, 'value': values, 'unit': uoms}, columns=WATERML_COLUMNS)
 
 class SOSGetFeatureOfInterestResponse(object):
 
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Spooling of large response bodies to temporary files, see sos_2_0_0.set_spooling()
+"""
+
+import mmap
+import os
+import re
+import tempfile
+from io import BytesIO
+from owslib.etree import etree
+
+# First character of a document that is no white space
+_LEAD = re.compile(rb'\s*(\S)')
+
+def read_body(response, threshold, directory=None, chunk_size=1024 * 1024):
+    """
+    Read the body of a streamed requests response. Bodies of at most threshold bytes are returned as bytes,
+    larger ones are written to a temporary file in directory (default: the system's temporary directory)
+    while they are downloaded and returned as SpooledResponse. The response is closed.
+    """
+
+    chunks = []
+    size = 0
+    spool = None
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if spool is not None:
+                spool.write(chunk)
+                continue
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > threshold:
+                spool = tempfile.NamedTemporaryFile(dir=directory, prefix='sos4py-', suffix='.response', delete=False)
+                for part in chunks:
+                    spool.write(part)
+                chunks = None
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+        raise
+    finally:
+        response.close()
+    if spool is None:
+        return b''.join(chunks)
+    spool.close()
+    return SpooledResponse(spool.name)
+
+def xml_root(content):
+    ''' Root element of an XML response body (bytes or SpooledResponse), a spooled body is parsed from its file '''
+    if isinstance(content, SpooledResponse):
+        return etree.parse(content.path).getroot()
+    return etree.fromstring(content)
+
+def xml_source(content):
+    ''' Source for etree.iterparse() of a response body (bytes or SpooledResponse) '''
+    return content.path if isinstance(content, SpooledResponse) else BytesIO(content)
+
+def lead_byte(content):
+    ''' First byte of a response body (bytes or SpooledResponse) that is no white space, b'' for empty bodies '''
+    match = _LEAD.match(content.buffer if isinstance(content, SpooledResponse) else content)
+    return match.group(1) if match is not None else b''
+
+
+class SpooledResponse(object):
+    """
+    Response body held in a temporary file instead of memory, returned by get_observation() and
+    get_feature_of_interest() for responses larger than the spooling threshold.
+
+    The file is memory-mapped: len(), slicing (response[:100] returns bytes) and the buffer
+    (a read-only memoryview of the map, e.g. for re or numpy.frombuffer()) read it without loading it
+    into memory. The parsers of sos4py read the file from path, open() returns a file object and
+    bytes(response) a copy in memory. The file is deleted by close(), at the end of a with block or
+    when the object is garbage collected.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        # Spooled files are never empty, mmap cannot map those
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def buffer(self):
+        ''' Read-only memoryview of the memory-mapped file '''
+        return memoryview(self._map)
+
+    @property
+    def closed(self):
+        return self._map is None
+
+    def open(self):
+        """Returns the body as binary file object"""
+        return open(self.path, 'rb')
+
+    def __len__(self):
+        return len(self._map)
+
+    def __getitem__(self, key):
+        return self._map[key]
+
+    def __bytes__(self):
+        return self._map[:]
+
+    def __repr__(self):
+        return '<SpooledResponse %s %d bytes>' % (self.path, len(self) if not self.closed else 0)
+
+    def close(self):
+        """Unmaps and deletes the file"""
+        if self._map is None:
+            return
+        try:
+            self._map.close()
+        except BufferError:
+            # A memoryview of the map is still in use, the map is released with it
+            pass
+        self._map = None
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # The constructor may have failed before the map existed
+        if getattr(self, '_map', None) is not None:
+            self.close()
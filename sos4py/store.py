@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+Local Parquet store of observations, see get_data(store=...)
+"""
+
+import json
+import os
+import threading
+import uuid
+import pandas as pd
+from dateutil import parser
+from owslib.swe.observation.om import TimePeriod as OMTimePeriod
+from .util import to_timestamp, write_atomic
+from .decoders import to_typed
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+# Stored columns per response format, the time column is used for partitioning and filtering
+FORMATS = {
+    'om': (['site', 'procedure', 'phenomenon', 'phenomenon_time', 'result_time', 'value', 'unit'], 'result_time'),
+    'waterml': (['site', 'procedure', 'phenomenon', 'time_stamp', 'value', 'unit'], 'time_stamp'),
+}
+
+def _datetime(text):
+    ''' datetime of a stored time text, parsed like owslib parses the times of responses '''
+    return parser.parse(text)
+
+def _phenomenon_time(text):
+    ''' Phenomenon time (None, datetime or owslib TimePeriod) of its stored text '''
+    if text is None or text != text:
+        return None
+    if text.startswith('start: '):
+        start, end = text[len('start: '):].split(' end: ')
+        return OMTimePeriod(_datetime(start), _datetime(end))
+    return _datetime(text)
+
+def _untyped(df):
+    ''' Stored observations with the columns of untyped get_data() results '''
+    for column in df.columns:
+        if column == 'phenomenon_time':
+            df[column] = pd.Series([_phenomenon_time(t) for t in df[column]], index=df.index, dtype=object)
+        elif column == 'result_time':
+            # Time zone and resolution of the datetimes owslib decodes (e.g. tzlocal() for UTC on machines running in UTC)
+            tz = _datetime('2000-01-01T00:00:00Z').tzinfo
+            df[column] = pd.Series(list(df[column].dt.tz_convert(tz).dt.to_pydatetime()), index=df.index)
+        elif column not in ('value', 'time_stamp'):
+            df[column] = df[column].astype(object).infer_objects()
+    return df
+
+def _query_key(sites, phenomena, procedures):
+    ''' Key of the requested series in the coverage index '''
+    return json.dumps([sorted(v) if v is not None else None for v in (sites, phenomena, procedures)])
+
+def _subtract(begin, end, intervals):
+    ''' Parts of the period begin/end not covered by the (sorted, merged) intervals '''
+    missing = []
+    for covered_begin, covered_end in intervals:
+        if covered_end < begin or covered_begin > end:
+            continue
+        if covered_begin > begin:
+            missing.append((begin, covered_begin))
+        begin = max(begin, covered_end)
+    if begin < end:
+        missing.append((begin, end))
+    return missing
+
+def _merge(intervals):
+    ''' Sort and merge overlapping or touching intervals '''
+    merged = []
+    for interval_begin, interval_end in sorted(intervals):
+        if merged and interval_begin <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+        else:
+            merged.append((interval_begin, interval_end))
+    return merged
+
+
+class ObservationStore(object):
+    """
+    Local store of observation DataFrames (as returned by get_data()) in Parquet files.
+
+    The files are partitioned by phenomenon, site and date (hive layout phenomenon=.../site=.../date=YYYY-MM-DD,
+    one dataset per response format), so reads only open the files of the requested phenomena, sites and
+    days (predicate pushdown) and only the requested columns (column pruning). The store also records which
+    periods have been downloaded for which request (coverage), so get_data(store=...) only requests the
+    missing periods from the SOS.
+
+    Requires pyarrow (pip install sos4py[store]).
+    """
+
+    def __init__(self, directory):
+        if pa is None:
+            raise ImportError("ObservationStore requires pyarrow, install it with 'pip install sos4py[store]'")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._partitioning = ds.partitioning(pa.schema([('phenomenon', pa.string()), ('site', pa.string()), ('date', pa.string())]),
+                                             flavor='hive')
+
+    def _coverage_path(self):
+        return os.path.join(self.directory, 'coverage.json')
+
+    def _read_coverage(self):
+        try:
+            with open(self._coverage_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def coverage(self, sites=None, phenomena=None, procedures=None):
+        """Returns the downloaded periods of a request as list of (begin, end) UTC Timestamps"""
+        intervals = self._read_coverage().get(_query_key(sites, phenomena, procedures), [])
+        return [(to_timestamp(b), to_timestamp(e)) for b, e in intervals]
+
+    def missing(self, sites=None, phenomena=None, procedures=None, begin=None, end=None):
+        """Returns the periods between begin and end not downloaded yet for a request as list of (begin, end) UTC Timestamps"""
+        return _subtract(to_timestamp(begin), to_timestamp(end), self.coverage(sites, phenomena, procedures))
+
+    def add_coverage(self, sites, phenomena, procedures, begin, end):
+        """Records that the period begin/end of a request has been downloaded"""
+        key = _query_key(sites, phenomena, procedures)
+        with self._lock:
+            coverage = self._read_coverage()
+            intervals = [(to_timestamp(b), to_timestamp(e)) for b, e in coverage.get(key, [])]
+            intervals = _merge(intervals + [(to_timestamp(begin), to_timestamp(end))])
+            coverage[key] = [[b.isoformat(), e.isoformat()] for b, e in intervals]
+            write_atomic(self._coverage_path(), json.dumps(coverage, indent=1).encode('utf-8'))
+
+    def write(self, df):
+        """Adds the observations of a DataFrame from get_data() to the store"""
+        if len(df) == 0:
+            return
+        name = 'waterml' if 'time_stamp' in df.columns else 'om'
+        columns, time_column = FORMATS[name]
+
+        data = {}
+        for column in columns:
+            values = df[column]
+            if column == time_column:
+                data[column] = pd.to_datetime(values, utc=True).astype('datetime64[ns, UTC]')
+            elif column == 'value':
+                data[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+            else:
+                # Identifiers, units and phenomenon times (instants or periods) as text
+                data[column] = values.astype(object).map(lambda v: None if v is None or v is pd.NA or v != v else str(v))
+        data['date'] = data[time_column].dt.strftime('%Y-%m-%d')
+        table = pa.Table.from_pandas(pd.DataFrame(data), preserve_index=False)
+        with self._lock:
+            ds.write_dataset(table, os.path.join(self.directory, name), format='parquet', partitioning=self._partitioning,
+                             existing_data_behavior='overwrite_or_ignore',
+                             basename_template='part-' + uuid.uuid4().hex + '-{i}.parquet')
+
+    def read(self, sites=None, phenomena=None, procedures=None, begin=None, end=None, columns=None, typed=False):
+        """Reads observations from the store
+
+        Parameters
+        ----------
+        sites, phenomena, procedures : non-empty list of str, optional
+           read only these sites, phenomena and procedures
+        begin, end : str, optional
+           read only the observations of this period (both ends included)
+        columns : list of str, optional
+           read only these columns
+        typed : boolean, optional
+           whether or not to return typed columns, see get_data()
+
+        Returns
+        -------
+        observations as DataFrame, None if the store is empty
+        """
+
+        frames = []
+        for name, (format_columns, time_column) in FORMATS.items():
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path):
+                continue
+            dataset = ds.dataset(path, format='parquet', partitioning=self._partitioning)
+
+            expression = None
+            conditions = []
+            if sites is not None:
+                conditions.append(ds.field('site').isin(sites))
+            if phenomena is not None:
+                conditions.append(ds.field('phenomenon').isin(phenomena))
+            if procedures is not None:
+                conditions.append(ds.field('procedure').isin(procedures))
+            if begin is not None:
+                # The date partitions prune the files, the time column the rows
+                conditions.append(ds.field('date') >= to_timestamp(begin).strftime('%Y-%m-%d'))
+                conditions.append(ds.field(time_column) >= pa.scalar(to_timestamp(begin), type=pa.timestamp('ns', tz='UTC')))
+            if end is not None:
+                conditions.append(ds.field('date') <= to_timestamp(end).strftime('%Y-%m-%d'))
+                conditions.append(ds.field(time_column) <= pa.scalar(to_timestamp(end), type=pa.timestamp('ns', tz='UTC')))
+            for condition in conditions:
+                expression = condition if expression is None else expression & condition
+
+            selected = [c for c in format_columns if columns is None or c in columns]
+            df = dataset.to_table(columns=selected, filter=expression).to_pandas()
+            if time_column in df.columns:
+                df[time_column] = df[time_column].astype('datetime64[ns, UTC]')
+            frames.append(df)
+
+        if len(frames) == 0:
+            return None
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        # Periods downloaded for different requests may overlap
+        df = df.drop_duplicates(ignore_index=True)
+        sort = [c for c in ('site', 'procedure', 'phenomenon', 'result_time', 'time_stamp') if c in df.columns]
+        if len(sort) > 0:
+            df = df.sort_values(sort, ignore_index=True)
+        if typed:
+            return to_typed(df)
+        return _untyped(df)
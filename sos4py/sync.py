@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+############################################################################## #
+#                                                                              #
+# Created: 2026-10-18                                                          #
+# Project: sos4py - https://github.com/52North/sos4py                          #
+#                                                                              #
+############################################################################## #
+
+"""
+High-water marks of incremental observation downloads, see sos_2_0_0.sync()
+"""
+
+import json
+import os
+import threading
+from .util import to_timestamp, write_atomic, lazy_import
+
+pd = lazy_import('pandas')
+
+SERIES_COLUMNS = ('site', 'procedure', 'phenomenon')
+
+def time_column(df):
+    ''' Name of the column holding the times of an observation DataFrame '''
+    return 'time_stamp' if 'time_stamp' in df.columns else 'result_time'
+
+
+class SyncState(object):
+    """
+    High-water marks of observation series: the latest time received per site, procedure and phenomenon.
+
+    The marks are kept in a JSON file at path (only in memory if path is None) and written
+    atomically by save(), so an interrupted run never leaves a broken state behind.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._marks = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                for series in json.load(f)['series']:
+                    self._marks[(series['site'], series['procedure'], series['phenomenon'])] = to_timestamp(series['mark'])
+
+    def __len__(self):
+        return len(self._marks)
+
+    def get(self, site, procedure, phenomenon):
+        """Returns the high-water mark of a series as UTC Timestamp or None"""
+        return self._marks.get((site, procedure, phenomenon))
+
+    def marks(self, sites=None, phenomena=None, procedures=None):
+        """Returns the high-water marks of the series matching the given sites, phenomena and procedures
+        (None matches all) as dict (site, procedure, phenomenon) -> UTC Timestamp"""
+        with self._lock:
+            return dict((series, mark) for series, mark in self._marks.items()
+                        if (sites is None or series[0] in sites) and (procedures is None or series[1] in procedures)
+                        and (phenomena is None or series[2] in phenomena))
+
+    def update(self, df):
+        """Raises the high-water marks to the latest times of the series in an observation DataFrame"""
+        if len(df) == 0:
+            return
+        times = pd.to_datetime(df[time_column(df)], utc=True)
+        keys = df[list(SERIES_COLUMNS)].astype(object)
+        latest = times.groupby([keys[name] for name in SERIES_COLUMNS], observed=True, dropna=False).max()
+        with self._lock:
+            for series, mark in latest.items():
+                if series not in self._marks or mark > self._marks[series]:
+                    self._marks[series] = mark
+
+    def reset(self, sites=None, phenomena=None, procedures=None):
+        """Removes the high-water marks of the matching series (None matches all), they are downloaded completely again"""
+        for series in self.marks(sites, phenomena, procedures):
+            with self._lock:
+                del self._marks[series]
+
+    def save(self):
+        """Writes the high-water marks to the file"""
+        if self.path is None:
+            return
+        with self._lock:
+            series = [{'site': site, 'procedure': procedure, 'phenomenon': phenomenon, 'mark': mark.isoformat()}
+                      for (site, procedure, phenomenon), mark in sorted(self._marks.items(), key=lambda item: [str(k) for k in item[0]])]
+        write_atomic(self.path, json.dumps({'series': series}, indent=1).encode('utf-8'))
+
+    def new_rows(self, df):
+        ''' Boolean mask of the rows of an observation DataFrame after the high-water marks of their series '''
+        if len(df) == 0:
+            return pd.Series([], dtype=bool, index=df.index)
+        times = pd.to_datetime(df[time_column(df)], utc=True)
+        with self._lock:
+            marks = [self._marks.get(series) for series in zip(*[df[name].astype(object) for name in SERIES_COLUMNS])]
+        marks = pd.to_datetime(pd.Series(marks, index=df.index, dtype=object), utc=True)
+        return marks.isna() | (times > marks)
@@ -13,7 +13,55 @@ Utility functions
 
 from owslib.util import nspath_eval, testXMLAttribute, extract_time
 from owslib.namespaces import Namespaces
-import pandas as pd
+import importlib
+import math
+import os
+import sys
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module that is imported on the first access to one of its attributes, so that
+    importing sos4py does not import pandas, numpy and the geospatial stack before they are needed
+    """
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(_load_module(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(_load_module(self), name, value)
+        self.__dict__[name] = value
+
+    def __dir__(self):
+        return dir(_load_module(self))
+
+    def __repr__(self):
+        return '<lazy module %r>' % self._lazy_name
+
+def _load_module(lazy):
+    ''' Import the module of a LazyModule, its attributes are copied so that later accesses cost no more than with the module itself '''
+    with lazy.__dict__['_lazy_lock']:
+        module = lazy.__dict__.get('_lazy_module')
+        if module is None:
+            module = importlib.import_module(lazy.__dict__['_lazy_name'])
+            lazy.__dict__.update(module.__dict__)
+            lazy.__dict__['_lazy_module'] = module
+    return module
+
+def lazy_import(name):
+    ''' Module name, imported when it is used first (returns the module itself if it has been imported already) '''
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+pd = lazy_import('pandas')
 
 
 def get_namespaces():
@@ -27,9 +75,12 @@ def get_namespaces():
     ns["sos"] = n.get_namespace("sos20")
     return ns
 
+# Resolved once, building owslib's Namespaces for every path is slow
+namespaces = get_namespaces()
+
 def nspv(path):
     ''' Apply the nspath_eval function to a path '''
-    return nspath_eval(path, get_namespaces())
+    return nspath_eval(path, namespaces)
 
 def TimePeriod(start, end):
     ''' gml TimePeriod construction '''
@@ -59,14 +110,15 @@ def gda_member(gdaMembers):
         "gda:phenomenonTime/gml32:TimeInstant"))
 
     if instant_element is not None:
-        phenomenonTime_gda = extract_time(instant_element)
+        phenomenonTime_gda = extract_time(instant_element.find(nspv("gml32:timePosition")))
+        start = end = phenomenonTime_gda
     else:
         start = extract_time(gdaMembers.find(nspv(
             "gda:phenomenonTime/gml32:TimePeriod/gml32:beginPosition")))
         end = extract_time(gdaMembers.find(nspv(
             "gda:phenomenonTime/gml32:TimePeriod/gml32:endPosition")))
         phenomenonTime_gda = TimePeriod(start, end)
-        resultTime_gda = extract_time(gdaMembers.find(nspv(
+    resultTime_gda = extract_time(gdaMembers.find(nspv(
         "gda:resultTime/gml32:TimeInstant/gml32:timePosition")))
 
     #Constructing the results
@@ -81,3 +133,79 @@ def check_list_param(list_param):
     len(list_param) > 0 and \
     map(lambda x: isinstance(x, str), list_param))
     assert (correctness),("A non-empty list of strings is expected!")
+
+def to_timestamp(value):
+    ''' Convert a time (str, datetime or Timestamp) to a timezone aware pandas Timestamp in UTC '''
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize('UTC')
+    return ts.tz_convert('UTC')
+
+def format_time(value):
+    ''' Format a time as 'YYYY-MM-DDThh:mm:ss(.ffffff)Z' as expected by the temporal filter '''
+    ts = to_timestamp(value)
+    if ts.microsecond or ts.nanosecond:
+        return ts.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return ts.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def event_time(begin, end):
+    ''' Temporal filter on om:resultTime for the period begin/end '''
+    return 'om:resultTime,' + format_time(begin) + '/' + format_time(end)
+
+def window_from_density(values_per_window, sampling_interval, series=1):
+    ''' Size of a time window holding about values_per_window values of series time series sampled every sampling_interval '''
+    assert (values_per_window > 0 and series > 0),("values_per_window and series have to be positive!")
+    interval = pd.Timedelta(sampling_interval)
+    assert (interval > pd.Timedelta(0)),("sampling_interval has to be positive!")
+    window = interval * values_per_window / series
+    # Round up to whole seconds to keep the temporal filters readable
+    return pd.Timedelta(seconds=max(1, math.ceil(window.total_seconds())))
+
+def time_windows(begin, end, window):
+    ''' Split the period begin/end into consecutive windows of the given size (timedelta or str, e.g. '30D').
+    Returns a list of (begin, end) Timestamps. Windows share their boundaries, the last window ends at end.
+    '''
+    begin = to_timestamp(begin)
+    end = to_timestamp(end)
+    window = pd.Timedelta(window)
+    assert (begin <= end),("begin has to be before end!")
+    assert (window > pd.Timedelta(0)),("The window size has to be positive!")
+
+    windows = []
+    window_begin = begin
+    while True:
+        window_end = min(window_begin + window, end)
+        windows.append((window_begin, window_end))
+        if window_end >= end:
+            return windows
+        window_begin = window_end
+
+def create_session(pool_connections=10, pool_maxsize=10, max_retries=0, headers=None):
+    ''' Create a requests Session with a pool of keep-alive connections.
+    :param pool_connections: number of hosts for which connection pools are kept
+    :param pool_maxsize: maximum number of connections kept open per host
+    :param max_retries: number of retries for failed connections
+    :param headers: additional HTTP headers sent with every request
+    :return: a requests.Session
+    '''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+    if headers is not None:
+        session.headers.update(headers)
+    return session
+
+def write_atomic(path, data):
+    ''' Write a file (bytes) so that concurrent readers never see a partial file '''
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -3,9 +3,269 @@
 """Tests for `sos4py` package."""
 
 
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
 
-from sos4py import sos4py
+import aiohttp
+import pandas as pd
+import requests
+
+from sos4py.sos_2_0_0 import sos_2_0_0, iter_observation_elements, OM_COLUMNS
+from sos4py import util, decoders, planner, instrumentation, sinks, parsing, spool, export, cli
+from sos4py.cache import MemoryCache, DiskCache
+from sos4py.main import connection_sos
+from sos4py.async_sos import AsyncSOS
+from sos4py.sync import SyncState
+from sos4py.store import ObservationStore
+from sos4py.scheduler import AdaptiveScheduler, retry_after
+from owslib.etree import etree
+from owslib.util import ServiceException
+from owslib.swe.observation.sos200 import SOSGetObservationResponse
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+OM_RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<sos:GetObservationResponse xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:om="http://www.opengis.net/om/2.0" xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+{observations}
+</sos:GetObservationResponse>'''
+
+OM_OBSERVATION = '''  <sos:observationData>
+    <om:OM_Observation gml:id="o_{i}">
+      <om:type xlink:href="http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement"/>
+      <om:phenomenonTime>
+        <gml:TimeInstant gml:id="phenomenonTime_{i}">
+          <gml:timePosition>{time}</gml:timePosition>
+        </gml:TimeInstant>
+      </om:phenomenonTime>
+      <om:resultTime>
+        <gml:TimeInstant gml:id="resultTime_{i}">
+          <gml:timePosition>{time}</gml:timePosition>
+        </gml:TimeInstant>
+      </om:resultTime>
+      <om:procedure xlink:href="{procedure}"/>
+      <om:observedProperty xlink:href="{phenomenon}"/>
+      <om:featureOfInterest xlink:href="{site}"/>
+      <om:result xsi:type="gml:MeasureType" uom="{unit}">{value}</om:result>
+    </om:OM_Observation>
+  </sos:observationData>'''
+
+WATERML_RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<sos:GetObservationResponse xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:om="http://www.opengis.net/om/2.0" xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:wml2="http://www.opengis.net/waterml/2.0">
+{observations}
+</sos:GetObservationResponse>'''
+
+WATERML_OBSERVATION = '''  <sos:observationData>
+    <om:OM_Observation gml:id="o_{i}">
+      <om:type xlink:href="http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement"/>
+      <om:phenomenonTime>
+        <gml:TimePeriod gml:id="phenomenonTime_{i}">
+          <gml:beginPosition>{begin}</gml:beginPosition>
+          <gml:endPosition>{end}</gml:endPosition>
+        </gml:TimePeriod>
+      </om:phenomenonTime>
+      <om:resultTime>
+        <gml:TimeInstant gml:id="resultTime_{i}">
+          <gml:timePosition>{end}</gml:timePosition>
+        </gml:TimeInstant>
+      </om:resultTime>
+      <om:procedure xlink:href="{procedure}"/>
+      <om:observedProperty xlink:href="{phenomenon}"/>
+      <om:featureOfInterest xlink:href="{site}"/>
+      <om:result>
+        <wml2:MeasurementTimeseries gml:id="timeseries_{i}">
+          <wml2:defaultPointMetadata>
+            <wml2:DefaultTVPMeasurementMetadata>
+              <wml2:uom code="{unit}"/>
+            </wml2:DefaultTVPMeasurementMetadata>
+          </wml2:defaultPointMetadata>
+{points}
+        </wml2:MeasurementTimeseries>
+      </om:result>
+    </om:OM_Observation>
+  </sos:observationData>'''
+
+WATERML_POINT = '''          <wml2:point>
+            <wml2:MeasurementTVP>
+              <wml2:time>{time}</wml2:time>
+              <wml2:value>{value}</wml2:value>
+            </wml2:MeasurementTVP>
+          </wml2:point>'''
+
+GDA_RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<gda:GetDataAvailabilityResponse xmlns:gda="http://www.opengis.net/sosgda/1.0" xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:xlink="http://www.w3.org/1999/xlink">
+{members}
+</gda:GetDataAvailabilityResponse>'''
+
+GDA_MEMBER = '''  <gda:dataAvailabilityMember gml:id="dam_{i}">
+    <gda:procedure xlink:href="{procedure}"/>
+    <gda:observedProperty xlink:href="{phenomenon}"/>
+    <gda:featureOfInterest xlink:href="{site}"/>
+    <gda:phenomenonTime>
+      <gml:TimePeriod gml:id="tp_{i}">
+        <gml:beginPosition>{begin}</gml:beginPosition>
+        <gml:endPosition>{end}</gml:endPosition>
+      </gml:TimePeriod>
+    </gda:phenomenonTime>
+  </gda:dataAvailabilityMember>'''
+
+
+FOI_RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<sos:GetFeatureOfInterestResponse xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:sams="http://www.opengis.net/samplingSpatial/2.0" xmlns:sf="http://www.opengis.net/sampling/2.0">
+{features}
+</sos:GetFeatureOfInterestResponse>'''
+
+FOI_MEMBER = '''  <sos:featureMember>
+    <sams:SF_SpatialSamplingFeature gml:id="foi_{i}">
+      <gml:identifier codeSpace="http://www.opengis.net/def/nil/OGC/0/unknown">{site}</gml:identifier>
+      <gml:name codeSpace="http://www.opengis.net/def/nil/OGC/0/unknown">{name}</gml:name>
+      <sams:shape>
+        <gml:Point gml:id="point_{i}">
+          <gml:pos srsName="http://www.opengis.net/def/crs/EPSG/0/4326">{lat} {lon}</gml:pos>
+        </gml:Point>
+      </sams:shape>
+    </sams:SF_SpatialSamplingFeature>
+  </sos:featureMember>'''
+
+
+def foi_response(features):
+    """Build a GetFeatureOfInterest response from dicts with site, name, lat and lon"""
+    return FOI_RESPONSE.format(features='\n'.join(FOI_MEMBER.format(i=i, **f) for i, f in enumerate(features))).encode('utf-8')
+
+
+def gda_response(members):
+    """Build a GetDataAvailability response from dicts with site, procedure, phenomenon, begin and end"""
+    return GDA_RESPONSE.format(members='\n'.join(GDA_MEMBER.format(i=i, **m) for i, m in enumerate(members))).encode('utf-8')
+
+
+def om_response(rows):
+    """Build an O&M 2.0 GetObservation response from dicts with site, procedure, phenomenon, time, value and unit"""
+    observations = [OM_OBSERVATION.format(i=i, **row) for i, row in enumerate(rows)]
+    return OM_RESPONSE.format(observations='\n'.join(observations)).encode('utf-8')
+
+
+def waterml_response(rows):
+    """Build a WaterML 2.0 GetObservation response with one time series per site, procedure, phenomenon and unit"""
+    series = {}
+    for row in rows:
+        key = (row['site'], row['procedure'], row['phenomenon'], row['unit'])
+        series.setdefault(key, []).append(row)
+    observations = []
+    for i, ((site, procedure, phenomenon, unit), points) in enumerate(series.items()):
+        observations.append(WATERML_OBSERVATION.format(
+            i=i, site=site, procedure=procedure, phenomenon=phenomenon, unit=unit,
+            begin=points[0]['time'], end=points[-1]['time'],
+            points='\n'.join(WATERML_POINT.format(**p) for p in points)))
+    return WATERML_RESPONSE.format(observations='\n'.join(observations)).encode('utf-8')
+
+
+def hourly_rows(begin, periods, site='http://example.org/site/a'):
+    """Hourly temperature values of one site"""
+    times = pd.date_range(begin, periods=periods, freq='h', tz='UTC')
+    return [{'site': site, 'procedure': 'http://example.org/procedure/1',
+             'phenomenon': 'http://example.org/phenomenon/temperature',
+             'time': t.strftime('%Y-%m-%dT%H:%M:%S.000Z'), 'value': float(i), 'unit': 'degC'}
+            for i, t in enumerate(times)]
+
+
+def connect():
+    """sos_2_0_0 object from the test capabilities, no network access needed"""
+    with open(os.path.join(DATA, 'capabilities.xml'), 'rb') as f:
+        xml = f.read()
+    return sos_2_0_0.__new__(sos_2_0_0, 'http://localhost/sos/kvp', '2.0.0', xml)
+
+
+class FakeObservationService(object):
+    """Replaces get_observation with canned responses filtered by the requested temporal filter"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+
+    def __call__(self, eventTime=None, **kwargs):
+        self.requests.append(dict(kwargs, eventTime=eventTime))
+        rows = self.rows
+        if kwargs.get('featuresOfInterest') is not None:
+            rows = [r for r in rows if r['site'] in kwargs['featuresOfInterest']]
+        if eventTime is not None:
+            begin, end = [util.to_timestamp(t) for t in eventTime.split(',', 1)[1].split('/')]
+            rows = [r for r in rows if begin <= util.to_timestamp(r['time']) <= end]
+        return om_response(rows)
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+class LocalSOS(object):
+    """Minimal SOS on localhost answering KVP requests with a handler function.
+    The handler gets the query and header dicts and returns the body or a tuple (status, body, headers).
+    """
+
+    def __init__(self, handler):
+        requests_seen = self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                query = dict((k, v[0]) for k, v in parse_qs(urlparse(self.path).query).items())
+                self.respond(query)
+
+            def do_POST(self):
+                # The handler gets the request document as query['body']
+                self.respond({'body': self.rfile.read(int(self.headers['Content-Length']))})
+
+            def respond(self, query):
+                requests_seen.append({'query': query, 'headers': dict(self.headers), 'client': self.client_address})
+                result = handler(query, dict(self.headers))
+                status, body, headers = result if isinstance(result, tuple) else (200, result, {})
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/xml')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/sos/kvp' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self, json_binding=False):
+        """sos_2_0_0 object sending its requests to this server, with json_binding the POST methods accept JSON"""
+        with open(os.path.join(DATA, 'capabilities.xml'), 'rb') as f:
+            xml = f.read().replace(b'http://localhost/sos/kvp', self.url.encode('utf-8'))
+            if json_binding:
+                xml = xml.replace(b'<ows:Post xlink:href="http://localhost/sos/pox"/>',
+                                  b'<ows:Post xlink:href="http://localhost/sos/pox"><ows:Constraint name="Content-Type">'
+                                  b'<ows:AllowedValues><ows:Value>application/json</ows:Value></ows:AllowedValues>'
+                                  b'</ows:Constraint></ows:Post>')
+            xml = xml.replace(b'http://localhost/sos/pox', self.url.encode('utf-8'))
+        return sos_2_0_0.__new__(sos_2_0_0, self.url, '2.0.0', xml)
 
 
 class TestSos4py(unittest.TestCase):
@@ -13,9 +273,973 @@ class TestSos4py(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures, if any."""
+        self.sos = connect()
 
     def tearDown(self):
         """Tear down test fixtures, if any."""
+        self.sos.close()
 
     def test_000_something(self):
         """Test something."""
+        self.assertEqual(self.sos.offerings[0].id, 'http://example.org/offering/1')
+
+    def test_time_windows(self):
+        windows = util.time_windows('2020-01-01T00:00:00Z', '2020-01-03T12:00:00Z', '1D')
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0][1], windows[1][0])
+        self.assertEqual(windows[-1][1], util.to_timestamp('2020-01-03T12:00:00Z'))
+        self.assertEqual(util.window_from_density(24, '1h'), pd.Timedelta('1D'))
+
+    def test_get_data_chunked(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 72)
+        self.sos.get_observation = FakeObservationService(rows)
+        whole = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z')
+        chunked = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='6h', max_workers=3)
+
+        self.assertEqual(len(self.sos.get_observation.requests), 13)
+        self.assertEqual(list(chunked.columns), list(whole.columns))
+        self.assertEqual(len(chunked), 72)
+        self.assertListEqual(list(chunked['value']), list(whole['value']))
+
+    def test_iter_observation_elements(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 5)
+        observations = list(iter_observation_elements(BytesIO(om_response(rows))))
+        self.assertEqual(len(observations), 5)
+        self.assertEqual([o.get_result().value for o in observations], [0.0, 1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(observations[0].featureOfInterest, 'http://example.org/site/a')
+
+    def test_iter_observation_elements_waterml(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 25) + hourly_rows('2020-01-01T00:00:00Z', 10, site='http://example.org/site/b')
+        observations = list(iter_observation_elements(BytesIO(waterml_response(rows)), points_per_chunk=10))
+
+        self.assertEqual([len(o.get_result().points) for o in observations], [10, 10, 5, 10])
+        self.assertEqual([o.featureOfInterest for o in observations],
+                         ['http://example.org/site/a'] * 3 + ['http://example.org/site/b'])
+        self.assertEqual(observations[2].get_result().defaultTVPMetadata.uom, 'degC')
+        values = [p.value for o in observations[:3] for p in o.get_result().points]
+        self.assertEqual(values, [float(i) for i in range(25)])
+
+    def test_decode_waterml(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 24) + hourly_rows('2020-01-01T00:00:00Z', 12, site='http://example.org/site/b')
+        rows[3]['value'] = ''
+        xml_tree = etree.fromstring(waterml_response(rows))
+
+        decoded = decoders.decode_waterml(xml_tree)
+        expected = self.sos._create_df_waterml(SOSGetObservationResponse(xml_tree))
+
+        self.assertTrue(decoders.is_waterml(xml_tree))
+        self.assertEqual(list(decoded.columns), list(expected.columns))
+        self.assertEqual(len(decoded), 36)
+        self.assertListEqual(list(decoded['site']), list(expected['site']))
+        self.assertListEqual(list(decoded['unit']), list(expected['unit']))
+        pd.testing.assert_series_equal(decoded['value'], expected['value'].astype('float64'))
+        self.assertTrue((decoded['time_stamp'] == pd.to_datetime(expected['time_stamp'], utc=True)).all())
+
+    def test_get_data_typed(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 48) + hourly_rows('2020-01-01T00:00:00Z', 48, site='http://example.org/site/b')
+        self.sos.get_observation = FakeObservationService(rows)
+        df = self.sos.get_data(typed=True)
+
+        self.assertEqual(df['site'].dtype, 'category')
+        self.assertEqual(list(df['site'].cat.categories), ['http://example.org/site/a', 'http://example.org/site/b'])
+        self.assertEqual(str(df['result_time'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(df['value'].dtype, 'float64')
+
+        chunked = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z', chunk_size='1D', typed=True)
+        self.assertEqual(chunked['phenomenon'].dtype, 'category')
+        self.assertEqual(len(chunked), 96)
+
+        rows[0]['value'] = ''
+        typed = decoders.decode_waterml(etree.fromstring(waterml_response(rows)), typed=True)
+        self.assertEqual(typed['unit'].dtype, 'category')
+        self.assertEqual(typed['value'].dtype, 'Float64')
+        self.assertTrue(pd.isna(typed['value'][0]))
+
+        empty = self.sos.get_data(begin='2021-01-01T00:00:00Z', end='2021-01-03T00:00:00Z', chunk_size='1D', typed=True)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty['site'].dtype, 'category')
+        self.assertEqual(str(empty['result_time'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(empty['value'].dtype, 'float64')
+
+        empty_waterml = self.sos._parse_observations(waterml_response([]), typed=True)
+        self.assertIn('time_stamp', empty_waterml.columns)
+        self.assertEqual(str(empty_waterml['time_stamp'].dtype), 'datetime64[ns, UTC]')
+
+    def test_session_keep_alive(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 3)
+        with LocalSOS(lambda query, headers: om_response(rows)) as server:
+            with server.connect() as sos:
+                sos.open_session(pool_maxsize=2)
+                for _ in range(3):
+                    self.assertEqual(len(sos.get_data()), 3)
+                self.assertEqual(len(list(sos.iter_observations())), 3)
+
+        self.assertEqual(len(server.requests), 4)
+        self.assertIn('gzip', server.requests[0]['headers']['Accept-Encoding'])
+        # All requests used the same keep-alive connection
+        self.assertEqual(len(set(r['client'] for r in server.requests)), 1)
+        self.assertIsNone(sos._session)
+
+    def test_capabilities_cache(self):
+        with open(os.path.join(DATA, 'capabilities.xml'), 'rb') as f:
+            capabilities = f.read()
+
+        def handler(query, headers):
+            if headers.get('If-None-Match') == '"v1"':
+                return (304, b'', {})
+            return (200, capabilities, {'ETag': '"v1"'})
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with LocalSOS(handler) as server:
+                cold = connection_sos(server.url, cache_dir=cache_dir)
+                warm = connection_sos(server.url, cache_dir=cache_dir)
+                self.assertEqual(len(server.requests), 1)
+                self.assertEqual(server.requests[0]['query']['request'], 'GetCapabilities')
+
+                revalidated = connection_sos(server.url, cache_dir=cache_dir, cache_ttl=0)
+                self.assertEqual(len(server.requests), 2)
+                self.assertEqual(server.requests[1]['headers']['If-None-Match'], '"v1"')
+
+            with LocalSOS(handler) as server:
+                connection_sos(server.url, username='alice', password='s3cret', cache_dir=cache_dir)
+                authenticated = connection_sos(server.url, username='alice', password='s3cret', cache_dir=cache_dir)
+                connection_sos(server.url, username='bob', password='other', cache_dir=cache_dir)
+                # One download per user
+                self.assertEqual(len(server.requests), 2)
+            for name in os.listdir(cache_dir):
+                with open(os.path.join(cache_dir, name), 'rb') as f:
+                    self.assertNotIn(b's3cret', f.read())
+            self.assertEqual(authenticated.password, 's3cret')
+        finally:
+            shutil.rmtree(cache_dir)
+
+        for sos in (warm, revalidated):
+            self.assertNotIn('_capabilities', sos.__dict__)
+            self.assertEqual([o.id for o in sos.offerings], [o.id for o in cold.offerings])
+            self.assertEqual(sos.get_operation_by_name('GetObservation').methods, cold.get_operation_by_name('GetObservation').methods)
+            self.assertEqual(sos.sosPhenomena(), cold.sosPhenomena())
+
+    def test_response_cache(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 3)
+        with LocalSOS(lambda query, headers: om_response(rows)) as server:
+            sos = self.sos = server.connect()
+            cache = MemoryCache(max_entries=10, ttls={'GetObservation': 60})
+            sos.set_response_cache(cache)
+            first = sos.get_data(sites=['http://example.org/site/a', 'http://example.org/site/b'])
+            first['value'] = 0
+            second = sos.get_data(sites=['http://example.org/site/b', 'http://example.org/site/a'])
+            sos.get_observation(featuresOfInterest=['http://example.org/site/a'])
+            sos.get_observation(featuresOfInterest=['http://example.org/site/a'])
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertListEqual(list(second['value']), [0.0, 1.0, 2.0])
+        # One entry for the frame of get_data, one for the response of get_observation
+        self.assertEqual(cache.stats()['operations']['GetObservation'], {'hits': 2, 'misses': 2})
+        self.assertEqual(len(cache), 2)
+
+    def test_disk_cache_eviction(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = DiskCache(directory, max_entries=2, ttls={'GetDataAvailability': -1})
+            for key in ('a', 'b', 'c'):
+                cache.set(key, key.encode('utf-8'), 'GetObservation')
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(cache.get('b'), b'b')
+            cache.set('d', b'd', 'GetDataAvailability')
+            self.assertIsNone(cache.get('d'))
+            self.assertEqual(cache.evictions, 2)
+            self.assertEqual(len(DiskCache(directory)), 1)
+
+            with self.assertRaises(Exception):
+                cache.set('e', threading.Lock(), 'GetObservation')
+            self.assertEqual([name for name in os.listdir(directory) if name.startswith('.tmp')], [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_async_sos(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 48) + hourly_rows('2020-01-01T00:00:00Z', 48, site='http://example.org/site/b')
+        fake = FakeObservationService(rows)
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def handler(query, headers):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            if query['request'] == 'GetCapabilities':
+                with open(os.path.join(DATA, 'capabilities.xml'), 'rb') as f:
+                    return f.read().replace(b'http://localhost/sos/kvp', server.url.encode('utf-8'))
+            return fake(query.get('temporalFilter'))
+
+        async def run():
+            async with await AsyncSOS.connect(server.url, max_concurrency=2) as client:
+                whole = await client.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z')
+                chunked, typed = await asyncio.gather(
+                    client.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z', chunk_size='6h'),
+                    client.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z', chunk_size='1D', typed=True))
+                return whole, chunked, typed
+
+        with LocalSOS(handler) as server:
+            whole, chunked, typed = asyncio.run(run())
+
+        self.assertEqual(len(server.requests), 1 + 1 + 8 + 2)
+        self.assertLessEqual(in_flight[1], 2)
+        self.assertEqual(len(whole), 96)
+        order = ['site', 'result_time']
+        pd.testing.assert_frame_equal(chunked.sort_values(order, ignore_index=True), whole.sort_values(order, ignore_index=True))
+        self.assertEqual(typed['site'].dtype, 'category')
+        self.assertEqual(len(typed), 96)
+
+        # Too many requests fail like with sos_2_0_0
+        async def overloaded():
+            client = AsyncSOS(server.connect())
+            try:
+                await client.get_observation(featuresOfInterest=['http://example.org/site/a'])
+            finally:
+                await client.close()
+
+        with LocalSOS(lambda query, headers: (429, b'Slow down', {'Retry-After': '1'})) as server:
+            with self.assertRaises(aiohttp.ClientResponseError) as raised:
+                asyncio.run(overloaded())
+        self.assertEqual(raised.exception.status, 429)
+
+    def test_get_data_planned(self):
+        procedure = 'http://example.org/procedure/1'
+        temperature = 'http://example.org/phenomenon/temperature'
+        rows = hourly_rows('2020-01-01T00:00:00Z', 48) + hourly_rows('2020-01-02T00:00:00Z', 24, site='http://example.org/site/b')
+        members = [
+            {'site': 'http://example.org/site/a', 'procedure': procedure, 'phenomenon': temperature,
+             'begin': '2020-01-01T00:00:00Z', 'end': '2020-01-02T23:00:00Z'},
+            {'site': 'http://example.org/site/b', 'procedure': procedure, 'phenomenon': temperature,
+             'begin': '2020-01-02T00:00:00Z', 'end': '2020-01-02T23:00:00Z'},
+            {'site': 'http://example.org/site/b', 'procedure': procedure, 'phenomenon': 'http://example.org/phenomenon/salinity',
+             'begin': '2019-01-01T00:00:00Z', 'end': '2019-01-02T00:00:00Z'}]
+
+        with LocalSOS(lambda query, headers: gda_response(members)) as server:
+            sos = self.sos = server.connect()
+            sos.get_observation = FakeObservationService(rows)
+            plan = sos.plan_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T00:00:00Z', chunk_size='1D')
+            df = sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T00:00:00Z', chunk_size='1D', plan=True)
+
+        # The salinity series has no data in the period, the last day has no data at all
+        self.assertEqual([(len(r.sites), r.begin.day, r.end.day) for r in plan], [(1, 1, 2), (2, 2, 2)])
+        self.assertEqual(plan[1].end, pd.Timestamp('2020-01-02T23:00:00Z'))
+        self.assertEqual(len(df), 72)
+        self.assertEqual(sorted(df['site'].unique()), ['http://example.org/site/a', 'http://example.org/site/b'])
+        self.assertFalse(df.duplicated(['site', 'result_time']).any())
+
+        # Grouping by the number of values: site a alone, site b fills a request of its own
+        extents = planner.availability_extents(sos._parse_data_availability(gda_response(members)))
+        plan = planner.plan_requests(extents, '2020-01-02T00:00:00Z', '2020-01-02T23:00:00Z', values_per_request=30, sampling_interval='1h')
+        self.assertEqual([r.sites for r in plan], [['http://example.org/site/a'], ['http://example.org/site/b']])
+
+    def test_decode_data_availability(self):
+        members = [{'site': 'http://example.org/site/%s' % s, 'procedure': 'http://example.org/procedure/1',
+                    'phenomenon': 'http://example.org/phenomenon/temperature',
+                    'begin': '2020-01-01T00:00:00+01:00', 'end': '2020-01-02T00:00:00Z'} for s in 'ab']
+        response = gda_response(members).replace(b'</gda:GetDataAvailabilityResponse>', b'''
+  <gda:dataAvailabilityMember gml:id="dam_2">
+    <gda:procedure xlink:href="http://example.org/procedure/2"/>
+    <gda:observedProperty xlink:href="http://example.org/phenomenon/salinity"/>
+    <gda:featureOfInterest xlink:href="http://example.org/site/a"/>
+    <gda:phenomenonTime xlink:href="#tp_1"/>
+  </gda:dataAvailabilityMember>
+</gda:GetDataAvailabilityResponse>''')
+
+        df = self.sos._parse_data_availability(response, as_frame=True)
+        listed = self.sos._parse_data_availability(response)
+
+        self.assertEqual(list(df.columns), decoders.AVAILABILITY_COLUMNS)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(str(df['StartTime'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(df['StartTime'][0], pd.Timestamp('2019-12-31T23:00:00Z'))
+        self.assertListEqual(list(df['FeatureOfInterest']), [m['FeatureOfInterest'] for m in listed])
+        self.assertEqual(df['EndTime'][2], pd.Timestamp('2020-01-02T00:00:00Z'))
+        lookup = df.set_index(['FeatureOfInterest', 'ObservedProperty', 'Procedure'])
+        self.assertEqual(lookup.loc[('http://example.org/site/b', 'http://example.org/phenomenon/temperature',
+                                     'http://example.org/procedure/1'), 'EndTime'], pd.Timestamp('2020-01-02T00:00:00Z'))
+
+    def test_sync(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 24) + hourly_rows('2020-01-01T00:00:00Z', 12, site='http://example.org/site/b')
+        self.sos.get_observation = FakeObservationService(rows)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'state.json')
+            first = self.sos.sync(SyncState(path), begin='2020-01-01T00:00:00Z', end='2020-01-01T23:00:00Z')
+            self.assertEqual(len(first), 36)
+
+            # The next poll starts at the oldest mark, repeated observations at the edge are dropped
+            rows.extend(hourly_rows('2020-01-02T00:00:00Z', 3))
+            state = SyncState(path)
+            second = self.sos.sync(state, end='2020-01-02T23:00:00Z')
+            self.assertEqual(self.sos.get_observation.requests[-1]['eventTime'],
+                             'om:resultTime,2020-01-01T11:00:00Z/2020-01-02T23:00:00Z')
+            self.assertEqual(list(second['value']), [0.0, 1.0, 2.0])
+            self.assertEqual(state.get('http://example.org/site/a', 'http://example.org/procedure/1', 'http://example.org/phenomenon/temperature'),
+                             pd.Timestamp('2020-01-02T02:00:00Z'))
+
+            # Site b lags behind and is requested on its own
+            third = SyncState(path)
+            self.assertEqual(len(self.sos.sync(third, end='2020-01-02T23:00:00Z', max_lag='6h')), 0)
+            self.assertEqual([r['eventTime'].split(',')[1][:20] for r in self.sos.get_observation.requests[-2:]],
+                             ['2020-01-02T02:00:00Z', '2020-01-01T11:00:00Z'])
+            self.assertEqual(self.sos.get_observation.requests[-1]['featuresOfInterest'], ['http://example.org/site/b'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sync_new_series(self):
+        site_a, site_b = 'http://example.org/site/a', 'http://example.org/site/b'
+        rows = hourly_rows('2020-01-01T00:00:00Z', 48) + hourly_rows('2020-01-01T00:00:00Z', 48, site=site_b)
+        self.sos.get_observation = FakeObservationService(rows)
+        state = SyncState()
+        self.assertEqual(len(self.sos.sync(state, sites=[site_a], begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z')), 48)
+
+        # Site b has no mark yet, it is downloaded from begin
+        df = self.sos.sync(state, sites=[site_a, site_b], begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z')
+        self.assertEqual(len(df), 48)
+        self.assertEqual(set(df['site']), {site_b})
+        self.assertEqual(self.sos.get_observation.requests[-2]['featuresOfInterest'], [site_b])
+
+        # A new phenomenon of a known site
+        phenomenon = 'http://example.org/phenomenon/temperature'
+        state = SyncState()
+        self.sos.sync(state, sites=[site_a], phenomena=[phenomenon], begin='2020-01-01T00:00:00Z', end='2020-01-02T00:00:00Z')
+        for row in hourly_rows('2020-01-01T00:00:00Z', 3):
+            rows.append(dict(row, phenomenon='http://example.org/phenomenon/level'))
+        df = self.sos.sync(state, sites=[site_a], phenomena=[phenomenon, 'http://example.org/phenomenon/level'],
+                           begin='2020-01-01T00:00:00Z', end='2020-01-02T23:00:00Z')
+        self.assertEqual(len(df), 23 + 3)
+
+        # Without begin and marks the end is still respected
+        state = SyncState()
+        df = self.sos.sync(state, sites=[site_b], end='2020-01-01T05:00:00Z')
+        self.assertEqual(len(df), 6)
+        self.assertEqual(state.get(site_b, 'http://example.org/procedure/1', phenomenon), pd.Timestamp('2020-01-01T05:00:00Z'))
+
+    def test_observation_store(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 72) + hourly_rows('2020-01-01T00:00:00Z', 72, site='http://example.org/site/b')
+        self.sos.get_observation = FakeObservationService(rows)
+        directory = tempfile.mkdtemp()
+        try:
+            store = ObservationStore(directory)
+            first = self.sos.get_data(sites=['http://example.org/site/a'], begin='2020-01-01T00:00:00Z', end='2020-01-02T00:00:00Z', store=store)
+            self.assertEqual(len(first), 25)
+            self.assertTrue(os.path.isdir(os.path.join(directory, 'om', 'phenomenon=http%3A%2F%2Fexample.org%2Fphenomenon%2Ftemperature')))
+
+            # Only the missing period is requested, the rest is read from the store
+            second = self.sos.get_data(sites=['http://example.org/site/a'], begin='2020-01-01T12:00:00Z', end='2020-01-02T12:00:00Z',
+                                       store=store, typed=True)
+            self.assertEqual(self.sos.get_observation.requests[-1]['eventTime'], 'om:resultTime,2020-01-02T00:00:00Z/2020-01-02T12:00:00Z')
+            self.assertEqual(len(self.sos.get_observation.requests), 2)
+            self.assertEqual(list(second['value']), [float(v) for v in range(12, 37)])
+            self.assertEqual(second['site'].dtype, 'category')
+
+            self.sos.get_data(sites=['http://example.org/site/a'], begin='2020-01-01T06:00:00Z', end='2020-01-02T06:00:00Z', store=store)
+            self.assertEqual(len(self.sos.get_observation.requests), 2)
+
+            values = store.read(sites=['http://example.org/site/a'], begin='2020-01-02T00:00:00Z', end='2020-01-02T01:00:00Z', columns=['result_time', 'value'])
+            self.assertEqual(list(values.columns), ['result_time', 'value'])
+            self.assertEqual(list(values['value']), [24.0, 25.0])
+            pd.testing.assert_frame_equal(first, self.sos.get_data(sites=['http://example.org/site/a'], begin='2020-01-01T00:00:00Z',
+                                                                   end='2020-01-02T00:00:00Z', store=store))
+
+            # Read from the store like from the service, with phenomenon periods
+            response = om_response(rows[:3]).replace(
+                b'<gml:TimeInstant gml:id="phenomenonTime_1">\n          <gml:timePosition>2020-01-01T01:00:00.000Z</gml:timePosition>\n        </gml:TimeInstant>',
+                b'<gml:TimePeriod gml:id="phenomenonTime_1"><gml:beginPosition>2020-01-01T00:00:00Z</gml:beginPosition>'
+                b'<gml:endPosition>2020-01-01T01:00:00Z</gml:endPosition></gml:TimePeriod>')
+            self.sos.get_observation = lambda **kwargs: response
+            period_store = ObservationStore(os.path.join(directory, 'periods'))
+            cached = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-01T02:00:00Z', store=period_store)
+            direct = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-01T02:00:00Z')
+            self.assertEqual(cached.dtypes.to_dict(), direct.dtypes.to_dict())
+            pd.testing.assert_frame_equal(cached.drop(columns='phenomenon_time'), direct.drop(columns='phenomenon_time'))
+            self.assertIsInstance(cached['phenomenon_time'][1], type(direct['phenomenon_time'][1]))
+            self.assertEqual([str(t) for t in cached['phenomenon_time']], [str(t) for t in direct['phenomenon_time']])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_get_data_batch(self):
+        sites = ['http://example.org/site/%d' % i for i in range(30)]
+        rows = []
+        for site in sites:
+            rows.extend(hourly_rows('2020-01-01T00:00:00Z', 2, site=site))
+
+        def handler(query, headers):
+            if 'body' in query:
+                document = etree.fromstring(query['body'])
+                requested = [e.text for e in document.findall('{http://www.opengis.net/sos/2.0}featureOfInterest')]
+            else:
+                requested = query['featureOfInterest'].split(',')
+            return om_response([r for r in rows if r['site'] in requested])
+
+        targets = [(site, 'http://example.org/phenomenon/temperature') for site in sites]
+        targets.append((sites[0], 'http://example.org/phenomenon/salinity', 'http://example.org/procedure/1'))
+        with LocalSOS(handler) as server:
+            sos = self.sos = server.connect()
+            results = sos.get_data_batch(targets, max_series=20, max_url_length=600)
+            posted = [r for r in server.requests if 'body' in r['query']]
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(len(posted), 1)
+            self.assertEqual(posted[0]['headers']['Content-Type'], 'application/xml')
+
+            # Without POST the requests stay below the URL length
+            sos.get_operation_by_name('GetObservation').methods[:] = [m for m in sos.get_operation_by_name('GetObservation').methods if m['type'] == 'Get']
+            server.requests[:] = []
+            short = sos.get_data_batch(targets, max_series=20, max_url_length=600)
+            self.assertFalse(any('body' in r['query'] for r in server.requests))
+            self.assertGreater(len(server.requests), 3)
+
+        self.assertEqual(len(results), 31)
+        self.assertEqual(list(results[targets[5]]['value']), [0.0, 1.0])
+        self.assertTrue((results[targets[5]]['site'] == sites[5]).all())
+        self.assertEqual(len(results[targets[-1]]), 0)
+        self.assertEqual(list(short[targets[29]]['site']), [sites[29]] * 2)
+
+    def test_get_result(self):
+        template = b'''<?xml version="1.0" encoding="UTF-8"?>
+<sos:GetResultTemplateResponse xmlns:sos="http://www.opengis.net/sos/2.0" xmlns:swe="http://www.opengis.net/swe/2.0">
+  <sos:resultStructure>
+    <swe:DataRecord>
+      <swe:field name="phenomenonTime"><swe:Time definition="http://www.opengis.net/def/property/OGC/0/PhenomenonTime"/></swe:field>
+      <swe:field name="temperature"><swe:Quantity definition="http://example.org/phenomenon/temperature"><swe:uom code="degC"/></swe:Quantity></swe:field>
+    </swe:DataRecord>
+  </sos:resultStructure>
+  <sos:resultEncoding>
+    <swe:TextEncoding tokenSeparator="," blockSeparator="@@" decimalSeparator="."/>
+  </sos:resultEncoding>
+</sos:GetResultTemplateResponse>'''
+
+        def handler(query, headers):
+            if query['request'] == 'GetResultTemplate':
+                return template
+            rows = hourly_rows('2020-01-01T00:00:00Z', 3, site=query['featureOfInterest'])
+            rows[1]['value'] = ''
+            values = '@@'.join('%s,%s' % (r['time'], r['value']) for r in rows)
+            return ('<sos:GetResultResponse xmlns:sos="http://www.opengis.net/sos/2.0"><sos:resultValues>%d@@%s</sos:resultValues>'
+                    '</sos:GetResultResponse>' % (len(rows), values)).encode('utf-8')
+
+        with LocalSOS(handler) as server:
+            sos = self.sos = server.connect()
+            sites = ['http://example.org/site/a', 'http://example.org/site/b']
+            df = sos.get_result('http://example.org/offering/1', 'http://example.org/phenomenon/temperature', featuresOfInterest=sites,
+                                begin='2020-01-01T00:00:00Z', end='2020-01-02T00:00:00Z', typed=True)
+            sos.get_result('http://example.org/offering/1', 'http://example.org/phenomenon/temperature', featuresOfInterest=sites[:1])
+
+        # One template request, one GetResult request per site and call
+        self.assertEqual([r['query']['request'] for r in server.requests].count('GetResultTemplate'), 1)
+        self.assertEqual(len(server.requests), 4)
+        self.assertEqual(list(df.columns), OM_COLUMNS)
+        self.assertEqual(len(df), 6)
+        self.assertEqual(df['site'].dtype, 'category')
+        self.assertEqual(str(df['phenomenon_time'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(df['value'].dtype, 'Float64')
+        self.assertEqual(list(df['value'][:3].fillna(-1)), [0.0, -1.0, 2.0])
+        self.assertEqual(set(df['unit']), {'degC'})
+        self.assertEqual(df['procedure'][0], 'http://example.org/procedure/1')
+
+    def test_json_binding(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 3) + hourly_rows('2020-01-01T00:00:00Z', 2, site='http://example.org/site/b')
+        features = [{'site': 'http://example.org/site/a', 'name': 'Site A', 'lat': 54.1, 'lon': 7.5},
+                    {'site': 'http://example.org/site/b', 'name': 'Site B', 'lat': 53.9, 'lon': 8.2}]
+        members = [{'site': 'http://example.org/site/a', 'procedure': 'http://example.org/procedure/1',
+                    'phenomenon': 'http://example.org/phenomenon/temperature', 'begin': '2020-01-01T00:00:00Z', 'end': '2020-01-01T02:00:00Z'}]
+
+        def handler(query, headers):
+            if 'body' not in query:
+                return {'GetObservation': om_response, 'GetFeatureOfInterest': lambda _: foi_response(features),
+                        'GetDataAvailability': lambda _: gda_response(members)}[query['request']](rows)
+            request = json.loads(query['body'])
+            if request['request'] == 'GetObservation':
+                document = {'observations': [
+                    {'type': 'http://www.opengis.net/def/observationType/OGC-OM/2.0/OM_Measurement', 'procedure': r['procedure'],
+                     'observableProperty': r['phenomenon'],
+                     'featureOfInterest': {'identifier': {'codespace': 'http://www.opengis.net/def/nil/OGC/0/unknown', 'value': r['site']}},
+                     'phenomenonTime': r['time'], 'resultTime': r['time'], 'result': {'uom': r['unit'], 'value': r['value']}}
+                    for r in rows]}
+            elif request['request'] == 'GetFeatureOfInterest':
+                document = {'featureOfInterest': [
+                    {'identifier': {'value': f['site']}, 'name': [{'value': f['name']}],
+                     'geometry': {'type': 'Point', 'coordinates': [f['lat'], f['lon']],
+                                  'crs': {'type': 'link', 'properties': {'href': 'http://www.opengis.net/def/crs/EPSG/0/4326'}}}}
+                    for f in features]}
+            elif request['request'] == 'GetDataAvailability':
+                document = {'dataAvailability': [
+                    {'procedure': {'href': m['procedure']}, 'observedProperty': {'href': m['phenomenon']},
+                     'featureOfInterest': {'href': m['site']}, 'phenomenonTime': [m['begin'], m['end']]} for m in members]}
+            else:
+                return 400, json.dumps({'exceptions': [{'code': 'OperationNotSupported', 'text': 'not supported'}]}).encode('utf-8'), {}
+            return 200, json.dumps(document).encode('utf-8'), {'Content-Type': 'application/json'}
+
+        with LocalSOS(handler) as server:
+            xml_sos = server.connect()
+            json_sos = self.sos = server.connect(json_binding=True)
+            # owslib leaves the phenomenon times of O&M instants empty, the JSON decoder keeps them
+            pd.testing.assert_frame_equal(json_sos.get_data().drop(columns='phenomenon_time'), xml_sos.get_data().drop(columns='phenomenon_time'))
+            self.assertEqual(json_sos.get_data(typed=True).dtypes.to_dict(), xml_sos.get_data(typed=True).dtypes.to_dict())
+            self.assertEqual(json_sos.get_data()['phenomenon_time'].dtype, object)
+            pd.testing.assert_frame_equal(json_sos.get_sites(), xml_sos.get_sites())
+            pd.testing.assert_frame_equal(json_sos.get_data_availability(as_frame=True), xml_sos.get_data_availability(as_frame=True))
+            self.assertEqual(json_sos.get_data_availability()[0]['StartTime'], xml_sos.get_data_availability()[0]['StartTime'])
+            self.assertEqual(len([r for r in server.requests if 'body' in r['query']]), 6)
+            self.assertTrue(all(r['headers']['Content-Type'] == 'application/json' for r in server.requests if 'body' in r['query']))
+
+            # XML is used if switched off
+            json_sos.set_encoding('xml')
+            server.requests[:] = []
+            json_sos.get_data()
+            self.assertNotIn('body', server.requests[0]['query'])
+
+
+    def test_get_sites_bbox_and_index(self):
+        from shapely.geometry import Point, Polygon
+        features = [{'site': 'http://example.org/site/%d' % i, 'name': 'Site %d' % i, 'lat': 50.0 + i, 'lon': 5.0 + i} for i in range(6)]
+
+        def handler(query, headers):
+            selected = features
+            if 'spatialFilter' in query:
+                _, min_lat, min_lon, max_lat, max_lon, _ = query['spatialFilter'].split(',')
+                selected = [f for f in features if float(min_lat) <= f['lat'] <= float(max_lat) and float(min_lon) <= f['lon'] <= float(max_lon)]
+            return foi_response(selected)
+
+        with LocalSOS(handler) as server:
+            sos = self.sos = server.connect()
+            sites = sos.get_sites()
+            self.assertEqual(list(sites['site_name']), ['Site %d' % i for i in range(6)])
+            self.assertEqual(sites.crs.to_epsg(), 4326)
+            self.assertEqual((sites.geometry.x[2], sites.geometry.y[2]), (7.0, 52.0))
+
+            # The bounding box is given as (lon, lat) and sent in the axis order of EPSG:4326
+            inside = sos.get_sites(bbox=(6.5, 51.5, 9.5, 54.5))
+            self.assertEqual(server.requests[-1]['query']['spatialFilter'],
+                             'om:featureOfInterest/*/sams:shape,51.5,6.5,54.5,9.5,http://www.opengis.net/def/crs/EPSG/0/4326')
+            self.assertEqual(list(inside['site_name']), ['Site 2', 'Site 3', 'Site 4'])
+
+            # Geometries are refined locally
+            triangle = Polygon([(6.5, 51.5), (9.5, 51.5), (6.5, 54.5)])
+            self.assertEqual(list(sos.get_sites(bbox=triangle)['site_name']), ['Site 2', 'Site 3'])
+
+            index = sos.get_site_index()
+            nearest = index.nearest([Point(7.1, 52.2), Point(100.0, 0.0)], max_distance=1.0)
+            self.assertEqual(list(nearest.index), [0])
+            self.assertEqual(nearest['site_name'].iloc[0], 'Site 2')
+            near = index.within_distance((7.4, 52.4), 1.5)
+            self.assertEqual(list(near['site_name']), ['Site 2', 'Site 3'])
+            self.assertTrue(near['distance'].is_monotonic_increasing)
+
+    def test_get_sites_phenomena(self):
+        features = [{'site': 'http://example.org/site/%d' % i, 'name': 'Site %d' % i, 'lat': 50.0 + i, 'lon': 5.0 + i} for i in range(4)]
+        observed = {'http://example.org/phenomenon/temperature': [0, 2], 'http://example.org/phenomenon/salinity': [1, 2, 3]}
+        # Number of requests in progress, seen by every request
+        active = []
+        concurrent = []
+        lock = threading.Lock()
+
+        def handler(query, headers):
+            with lock:
+                active.append(1)
+                concurrent.append(len(active))
+            time.sleep(0.2)
+            with lock:
+                active.pop()
+            if 'observedProperty' in query:
+                return foi_response([features[i] for i in observed[query['observedProperty']]])
+            return foi_response(features)
+
+        with LocalSOS(handler) as server:
+            self.sos = server.connect()
+            sites = self.sos.get_sites(include_phenomena=True)
+
+        self.assertGreater(max(concurrent), 1)
+        self.assertEqual(list(sites.columns), ['site_name', 'geometry', 'http://example.org/phenomenon/salinity', 'http://example.org/phenomenon/temperature'])
+        self.assertEqual(sites['http://example.org/phenomenon/temperature'].dtype, bool)
+        self.assertEqual(list(sites['http://example.org/phenomenon/temperature']), [True, False, True, False])
+        self.assertEqual(list(sites['http://example.org/phenomenon/salinity']), [False, True, True, True])
+
+        # JSON binding answering the filtered requests with XML, they are requested with the XML binding again
+        def json_handler(query, headers):
+            if 'body' not in query:
+                return handler(query, headers)
+            request = json.loads(query['body'])
+            if 'observedProperty' in request:
+                return foi_response([features[i] for i in observed[request['observedProperty'][0]]])
+            document = {'featureOfInterest': [
+                {'identifier': {'value': f['site']}, 'name': [{'value': f['name']}],
+                 'geometry': {'type': 'Point', 'coordinates': [f['lat'], f['lon']],
+                              'crs': {'type': 'link', 'properties': {'href': 'http://www.opengis.net/def/crs/EPSG/0/4326'}}}}
+                for f in features]}
+            return 200, json.dumps(document).encode('utf-8'), {'Content-Type': 'application/json'}
+
+        with LocalSOS(json_handler) as server:
+            self.sos = server.connect(json_binding=True)
+            pd.testing.assert_frame_equal(self.sos.get_sites(include_phenomena=True), sites)
+        self.assertEqual(sum(1 for r in server.requests if 'body' not in r['query']), 2)
+
+    def test_instrumentation(self):
+        class Tracer(object):
+            def __init__(self):
+                self.spans = []
+
+            def start_span(self, name, start_time=None, attributes=None):
+                span = {'name': name, 'start': start_time, 'attributes': dict(attributes), 'events': []}
+                self.spans.append(span)
+                return Span(span)
+
+        class Span(object):
+            def __init__(self, span):
+                self.span = span
+
+            def add_event(self, name, timestamp=None):
+                self.span['events'].append(name)
+
+            def set_attribute(self, name, value):
+                self.span['attributes'][name] = value
+
+            def end(self, end_time=None):
+                self.span['end'] = end_time
+
+        rows = hourly_rows('2020-01-01T00:00:00Z', 3)
+        with LocalSOS(lambda query, headers: om_response(rows)) as server:
+            sos = self.sos = server.connect()
+            sos.get_data()
+            stats = sos.add_hook(instrumentation.Stats())
+            tracer = Tracer()
+            sos.add_hook(instrumentation.SpanAdapter(tracer))
+            sos.set_response_cache(MemoryCache(max_entries=10))
+            sos.get_data(sites=['http://example.org/site/a'])
+            sos.get_data(sites=['http://example.org/site/a'])
+            response = sos.get_observation(featuresOfInterest=['http://example.org/site/b'])
+            sos.remove_hook(stats)
+            sos.get_data()
+
+        records = stats.to_frame()
+        self.assertEqual(len(records), 3)
+        self.assertEqual(list(records['operation']), ['GetObservation'] * 3)
+        self.assertEqual(list(records['cached']), [False, True, False])
+        self.assertEqual(list(records['rows'][:2]), [3, 3])
+        self.assertTrue(pd.isna(records['rows'][2]))
+        self.assertEqual(records['bytes'][0], len(response))
+        self.assertEqual(records['bytes'][1], 0)
+        self.assertEqual(records['parameters'][0]['featureOfInterest'], 'http://example.org/site/a')
+        self.assertEqual(records['status'][0], 200)
+        for stage in ('ttfb', 'download_time', 'parse_time', 'build_time'):
+            self.assertGreater(records[stage][0], 0)
+        self.assertTrue((records['total_time'] >= records['ttfb'] + records['download_time'] + records['parse_time'] + records['build_time']).all())
+        summary = stats.summary()
+        self.assertEqual(summary.loc['GetObservation', 'requests'], 3)
+        self.assertEqual(summary.loc['GetObservation', 'cached'], 1)
+
+        self.assertEqual(len(tracer.spans), 4)
+        span = tracer.spans[0]
+        self.assertEqual(span['name'], 'sos4py GetObservation')
+        self.assertEqual(span['events'], ['first_byte', 'downloaded', 'parsed', 'built'])
+        self.assertEqual(span['attributes']['sos4py.rows'], 3)
+        self.assertEqual(span['attributes']['http.status_code'], 200)
+        self.assertGreaterEqual(span['end'], span['start'])
+
+    def test_adaptive_scheduler(self):
+        service = FakeObservationService(hourly_rows('2020-01-01T00:00:00Z', 72))
+        active = []
+        lock = threading.Lock()
+        failures = []
+
+        def handler(query, headers):
+            # Overloaded above two parallel requests, the first request fails without Retry-After
+            with lock:
+                active.append(1)
+                overloaded = len(active) > 2
+                first = len(failures) == 0
+                if first:
+                    failures.append(1)
+            try:
+                if first:
+                    return (503, b'', {})
+                if overloaded:
+                    return (503, b'', {'Retry-After': '0.05'})
+                time.sleep(0.05)
+                return service(eventTime=query.get('temporalFilter'))
+            finally:
+                with lock:
+                    active.pop()
+
+        scheduler = AdaptiveScheduler(max_workers=8, initial_workers=2, latency_factor=None, backoff=0.01)
+        with LocalSOS(handler) as server:
+            self.sos = server.connect()
+            self.sos.set_scheduler(scheduler)
+            df = self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='6h')
+
+        self.assertListEqual(list(df['value']), [float(i) for i in range(72)])
+        report = scheduler.report()
+        self.assertEqual(report['requests'], 12)
+        self.assertEqual(report['values'], 72)
+        self.assertEqual(report['failures'], 0)
+        self.assertGreaterEqual(report['retries'], 1)
+        self.assertGreaterEqual(report['decreases'], 1)
+        self.assertLessEqual(report['max_concurrency'], 8)
+        self.assertGreater(report['requests_per_s'], 0)
+        self.assertEqual(len(server.requests), 12 + report['retries'])
+
+        # Retries are limited, other errors are not retried
+        scheduler = AdaptiveScheduler(retries=1, backoff=0.01)
+        with LocalSOS(lambda query, headers: (503, b'', {'Retry-After': '0'})) as server:
+            self.sos = server.connect()
+            self.sos.set_scheduler(scheduler)
+            with self.assertRaises(requests.HTTPError):
+                self.sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-01T12:00:00Z', chunk_size='6h')
+        self.assertEqual(scheduler.report()['failures'], 2)
+        self.assertEqual(len(server.requests), 4)
+        self.assertAlmostEqual(retry_after(requests.HTTPError(response=type('Response', (), {'headers': {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}})())), 0.0)
+
+    def test_get_data_iter(self):
+        service = FakeObservationService(hourly_rows('2020-01-01T00:00:00Z', 72))
+
+        with LocalSOS(lambda query, headers: service(eventTime=query.get('temporalFilter'))) as server:
+            self.sos = server.connect()
+            # One DataFrame per window, requested at most max_workers windows ahead
+            frames = self.sos.get_data_iter(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='6h', max_workers=2)
+            first = next(frames)
+            self.assertLessEqual(len(server.requests), 3)
+            windows = [first] + list(frames)
+            self.assertEqual(len(server.requests), 12)
+            self.assertEqual([len(df) for df in windows], [6] * 12)
+            self.assertListEqual(list(pd.concat(windows)['value']), [float(i) for i in range(72)])
+
+            # Regrouped by rows
+            frames = list(self.sos.get_data_iter(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='6h', rows_per_frame=20, typed=True))
+            self.assertEqual([len(df) for df in frames], [20, 20, 20, 12])
+            self.assertEqual(frames[0]['value'].dtype, 'float64')
+            self.assertEqual(list(frames[-1].index), list(range(12)))
+
+            # One response handed out in parts
+            frames = list(self.sos.get_data_iter(rows_per_frame=25))
+            self.assertEqual([len(df) for df in frames], [25, 25, 22])
+            self.assertListEqual(list(pd.concat(frames)['value']), [float(i) for i in range(72)])
+
+            directory = tempfile.mkdtemp()
+            try:
+                rows = sinks.write_frames(self.sos.get_data_iter(rows_per_frame=30), sinks.CsvSink(os.path.join(directory, 'obs.csv')))
+                self.assertEqual(rows, 72)
+                csv = pd.read_csv(os.path.join(directory, 'obs.csv'))
+                self.assertEqual(list(csv.columns), OM_COLUMNS)
+                self.assertListEqual(list(csv['value']), [float(i) for i in range(72)])
+
+                sink = sinks.ParquetSink(os.path.join(directory, 'obs.parquet'))
+                sinks.write_frames(self.sos.get_data_iter(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='1D', typed=True), sink)
+                self.assertEqual((sink.rows, sink.frames), (72, 3))
+                parquet = pd.read_parquet(os.path.join(directory, 'obs.parquet'))
+                self.assertEqual(list(parquet.columns), OM_COLUMNS)
+                self.assertEqual(str(parquet['result_time'].dtype), 'datetime64[ns, UTC]')
+                self.assertListEqual(list(parquet['value']), [float(i) for i in range(72)])
+            finally:
+                shutil.rmtree(directory)
+
+    def test_get_data_iter_same_as_get_data(self):
+        # Times with an offset are converted to UTC like by get_data()
+        rows = [dict(row, time=row['time'].replace('.000Z', '+01:00')) for row in hourly_rows('2020-01-01T00:00:00Z', 30)]
+        for response in (waterml_response(rows), om_response(rows)):
+            with LocalSOS(lambda query, headers: response) as server:
+                sos = server.connect()
+                for typed in (False, True):
+                    expected = sos.get_data(typed=typed)
+                    frames = list(sos.get_data_iter(rows_per_frame=12, typed=typed))
+                    self.assertEqual([len(df) for df in frames], [12, 12, 6])
+                    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), expected)
+                    for df in frames:
+                        self.assertEqual(list(df.dtypes), list(expected.dtypes))
+                sos.close()
+
+    def test_lazy_imports(self):
+        # Requesting and checking raw responses must not import the DataFrame and geospatial stack
+        script = '''
+import json, sys
+from sos4py.main import connection_sos
+with open(sys.argv[2], 'rb') as f:
+    xml = f.read().replace(b'http://localhost/sos/kvp', sys.argv[1].encode('utf-8'))
+sos = connection_sos(sys.argv[1], xml=xml)
+response = sos.get_observation(featuresOfInterest=['http://example.org/site/a'], eventTime='om:resultTime,2020-01-01T00:00:00Z/2020-01-02T00:00:00Z')
+print(json.dumps([len(response), sos.sosPhenomena(), [m for m in ('pandas', 'numpy', 'geopandas', 'shapely', 'pyproj') if m in sys.modules]]))
+'''
+        rows = hourly_rows('2020-01-01T00:00:00Z', 3)
+        with LocalSOS(lambda query, headers: om_response(rows)) as server:
+            output = subprocess.run([sys.executable, '-c', script, server.url, os.path.join(DATA, 'capabilities.xml')], check=True,
+                                    stdout=subprocess.PIPE, universal_newlines=True, cwd=os.path.dirname(os.path.dirname(DATA))).stdout
+        size, phenomena, imported = json.loads(output)
+        self.assertEqual(size, len(om_response(rows)))
+        self.assertEqual(phenomena, self.sos.sosPhenomena())
+        self.assertEqual(imported, [])
+
+        # The lazy modules behave like the modules once they are used
+        lazy = util.LazyModule('json')
+        self.assertEqual(lazy.dumps([1]), '[1]')
+        self.assertIs(lazy.loads, json.loads)
+        self.assertIs(util.lazy_import('json'), json)
+
+    def test_parse_processes(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 30) + hourly_rows('2020-01-01T00:00:00Z', 30, site='http://example.org/site/b')
+        rows[3]['unit'] = 'K'
+        period = om_response(rows[:2]).replace(b'<gml:TimeInstant gml:id="phenomenonTime_1">\n          <gml:timePosition>2020-01-01T01:00:00.000Z</gml:timePosition>\n        </gml:TimeInstant>',
+                                              b'<gml:TimePeriod gml:id="phenomenonTime_1"><gml:beginPosition>2020-01-01T00:00:00Z</gml:beginPosition>'
+                                              b'<gml:endPosition>2020-01-01T01:00:00Z</gml:endPosition></gml:TimePeriod>')
+        responses = [om_response(rows), period, waterml_response(rows), om_response([]), waterml_response([])]
+
+        # Compact columns instead of owslib objects
+        columns = parsing.parse_columns(om_response(rows))
+        self.assertEqual(columns['site'][0], ['http://example.org/site/a', 'http://example.org/site/b'])
+        self.assertEqual(columns['site'][1].dtype, 'int32')
+        self.assertEqual(columns['result_time'].dtype, 'datetime64[ns]')
+
+        self.sos.set_parse_processes(2)
+        try:
+            for typed in (False, True):
+                pooled = [self.sos._parse_observations(response, typed) for response in responses]
+                self.sos.parse_processes = None
+                serial = [self.sos._parse_observations(response, typed) for response in responses]
+                self.sos.parse_processes = 2
+                for df, expected in zip(pooled, serial):
+                    self.assertEqual(list(df.columns), list(expected.columns))
+                    if typed:
+                        self.assertEqual(list(df.dtypes), list(expected.dtypes))
+                    # Untyped times are in UTC, owslib's may be in an equal local time zone
+                    self.assertEqual(decoders.to_typed(df).astype(str).values.tolist(), decoders.to_typed(expected).astype(str).values.tolist())
+            self.assertIsNone(serial[1]['phenomenon_time'][0])
+            self.assertEqual(str(pooled[1]['phenomenon_time'][1]), str(serial[1]['phenomenon_time'][1]))
+
+            service = FakeObservationService(hourly_rows('2020-01-01T00:00:00Z', 72))
+            with LocalSOS(lambda query, headers: service(eventTime=query.get('temporalFilter'))) as server:
+                sos = server.connect()
+                sos.set_parse_processes(2)
+                df = sos.get_data(begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z', chunk_size='6h', typed=True)
+                sos.close()
+            self.assertListEqual(list(df['value']), [float(i) for i in range(72)])
+            self.assertEqual(str(df['result_time'].dtype), 'datetime64[ns, UTC]')
+        finally:
+            self.sos.close()
+
+    def test_spooling(self):
+        rows = hourly_rows('2020-01-01T00:00:00Z', 48)
+        report = (b'<?xml version="1.0" encoding="UTF-8"?>\n<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows/1.1" version="2.0.0">'
+                  b'<ows:Exception exceptionCode="InvalidParameterValue"><ows:ExceptionText>Unknown site</ows:ExceptionText></ows:Exception>'
+                  b'</ows:ExceptionReport>' + b' ' * 2000)
+        handler = lambda query, headers: report if query.get('featureOfInterest') == 'unknown' else om_response(rows)
+        directory = tempfile.mkdtemp()
+        try:
+            with LocalSOS(handler) as server:
+                sos = server.connect()
+                expected = sos.get_data(typed=True)
+                sos.set_response_cache(MemoryCache())
+                stats = sos.add_hook(instrumentation.Stats())
+                sos.set_spooling(1024, directory)
+                response = sos.get_observation(featuresOfInterest=['http://example.org/site/a'])
+                self.assertIsInstance(response, spool.SpooledResponse)
+                self.assertEqual(len(response), len(om_response(rows)))
+                self.assertEqual(response[:5], b'<?xml')
+                self.assertEqual(bytes(response), om_response(rows))
+                self.assertEqual(os.listdir(directory), [os.path.basename(response.path)])
+                response.close()
+                self.assertEqual(os.listdir(directory), [])
+
+                # Parsed from the file, in this process and in the parse processes
+                df = sos.get_data(typed=True)
+                sos.set_response_cache(None)
+                sos.set_parse_processes(1)
+                pooled = sos.get_data(typed=True)
+                sos.close()
+                for frame in (df, pooled):
+                    self.assertEqual(frame.astype(str).values.tolist(), expected.astype(str).values.tolist())
+                with self.assertRaises(ServiceException):
+                    sos.get_observation(featuresOfInterest=['unknown'])
+
+                sos.set_spooling(None)
+                self.assertIsInstance(sos.get_observation(featuresOfInterest=['http://example.org/site/a']), bytes)
+            self.assertEqual(os.listdir(directory), [])
+            # Spooled responses are not cached, the frames parsed from them are
+            self.assertEqual(len(server.requests), 6)
+            self.assertEqual(list(stats.to_frame()['bytes'][:2]), [len(om_response(rows))] * 2)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_export_cli(self):
+        service = FakeObservationService(hourly_rows('2020-01-01T00:00:00Z', 72))
+        failing = []
+
+        def handler(query, headers):
+            if query.get('request') == 'GetCapabilities':
+                with open(os.path.join(DATA, 'capabilities.xml'), 'rb') as f:
+                    return f.read().replace(b'http://localhost/sos/kvp', server.url.encode('utf-8'))
+            if query.get('temporalFilter', '').endswith(tuple(failing)):
+                return (503, b'', {})
+            return service(eventTime=query.get('temporalFilter'))
+
+        directory = tempfile.mkdtemp()
+        arguments = ['export', None, os.path.join(directory, 'csv'), '--begin', '2020-01-01T00:00:00Z', '--end', '2020-01-03T23:00:00Z',
+                     '--chunk-size', '6h', '--format', 'csv', '--workers', '2', '--quiet']
+        try:
+            with LocalSOS(handler) as server:
+                arguments[1] = server.url
+                # Interrupted by a failing request, the windows before it are kept
+                failing.append('2020-01-02T06:00:00Z')
+                self.assertEqual(cli.main(arguments), 1)
+                job, done = export.read_checkpoint(arguments[2])
+                self.assertEqual(len(job['units']), 12)
+                self.assertEqual(sorted(done), [0, 1, 2, 3])
+
+                failing.clear()
+                sent = len(service.requests)
+                stdout = sys.stdout
+                sys.stdout = output = StringIO()
+                try:
+                    self.assertEqual(cli.main(arguments), 0)
+                finally:
+                    sys.stdout = stdout
+                self.assertEqual(len(service.requests) - sent, 8)
+                self.assertIn('Exported 48 rows of 8 requests', output.getvalue())
+                self.assertIn('4 requests finished before, 72 rows in total', output.getvalue())
+                parts = sorted(f for f in os.listdir(arguments[2]) if f.startswith('part-'))
+                df = pd.concat([pd.read_csv(os.path.join(arguments[2], f)) for f in parts], ignore_index=True)
+                self.assertListEqual(list(df['value']), [float(i) for i in range(72)])
+
+                # Another export in the same directory
+                self.assertEqual(cli.main(arguments[:3] + ['--format', 'csv', '--quiet']), 1)
+
+                sos = server.connect()
+                progress = []
+                summary = export.export(sos, os.path.join(directory, 'parquet'), begin='2020-01-01T00:00:00Z', end='2020-01-03T23:00:00Z',
+                                        values_per_chunk=24, sampling_interval='1h', scheduler=AdaptiveScheduler(max_workers=4),
+                                        progress=lambda *args: progress.append(args))
+                sos.close()
+            self.assertEqual((summary['requests'], summary['fetched'], summary['rows']), (3, 3, 72))
+            self.assertGreater(summary['bytes'], 0)
+            self.assertEqual([(p[0], p[1], p[3]) for p in progress], [(1, 3, 24), (2, 3, 24), (3, 3, 24)])
+            df = pd.read_parquet(os.path.join(directory, 'parquet', 'part-000002.parquet'))
+            self.assertEqual(str(df['result_time'].dtype), 'datetime64[ns, UTC]')
+            self.assertListEqual(list(df['value']), [float(i) for i in range(48, 72)])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_cli_module(self):
+        output = subprocess.run([sys.executable, '-m', 'sos4py', 'export', '--help'], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True, cwd=os.path.dirname(os.path.dirname(DATA))).stdout
+        self.assertTrue(output.startswith('usage: sos4py export'))
+        self.assertIn('--chunk-size', output)
+
+    def test_benchmarks(self):
+        from benchmarks import run, generators
+        directory = tempfile.mkdtemp()
+        try:
+            report = run.run(['waterml_decode', 'get_sites'], [50], repeat=1, directory=directory)
+            with open(generators.generate('om', 20, directory), 'rb') as f:
+                self.assertEqual(len(self.sos._parse_observations(f.read())), 20)
+        finally:
+            shutil.rmtree(directory)
+
+        result = report['results']['get_sites']['50']
+        self.assertEqual(result['values'], 50)
+        self.assertGreater(result['values_per_s'], 0)
+        self.assertEqual(report['results']['waterml_decode']['50']['values'], 50)
+        slower = json.loads(json.dumps(report))
+        slower['results']['get_sites']['50']['median_s'] *= 2
+        self.assertEqual([row[-1] for row in run.compare(slower, report)], [False, True])